@@ -2,88 +2,253 @@ import requests
 import re
 import time
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from config import Config
 from logger import Logger
+from rate_limiter import RateLimiter
+from category_cache import CategoryCache
+from response_archive import ResponseArchive
+from token_manager import TokenManager
+from retry_policy import RetryPolicy, CircuitBreaker, TRANSIENT_STATUSES
+from metrics import metrics
 
 api_config = Config.API_CONFIG
+perf_config = Config.API_PERF_CONFIG
+rate_config = Config.RATE_LIMIT_CONFIG
+cache_config = Config.CACHE_CONFIG
+archive_config = Config.ARCHIVE_CONFIG
+sync_config = Config.SYNC_CONFIG
+token_config = Config.TOKEN_CONFIG
+retry_config = Config.RETRY_CONFIG
 log = Logger.write_log
 
+# Limiteur de débit partagé par tous les appels (un seau par route)
+rate_limiter = RateLimiter(rate_config["ROUTES"], rate_config["DEFAULT"], rate_config["BURST"])
+
+# Politique de nouvelles tentatives par route et disjoncteur (les suspensions passent par le limiteur de débit)
+retry_policies = {route: RetryPolicy(max_retries, retry_config["BASE_DELAY"], retry_config["MAX_DELAY"]) for route, max_retries in retry_config["ROUTES"].items()}
+default_retry_policy = RetryPolicy(retry_config["DEFAULT"], retry_config["BASE_DELAY"], retry_config["MAX_DELAY"])
+circuit_breaker = CircuitBreaker(rate_limiter, retry_config["CIRCUIT_FAILURE_THRESHOLD"], retry_config["CIRCUIT_RESET_TIMEOUT"], retry_config["CIRCUIT_MAX_RESET_TIMEOUT"])
+
+# Erreurs réseau passagères, retentées comme les réponses 5xx
+TRANSIENT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError)
+
+# Session HTTP partagée : connexions keep-alive réutilisées et réponses compressées
+def build_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return session
+
+session = build_session(perf_config["POOL_SIZE"])
+
+# Cache des catégories partagé par les threads du run
+category_cache = CategoryCache(cache_config["CATEGORY_CACHE_FILE"], cache_config["CATEGORY_CACHE_TTL"])
+
+# Archive des réponses brutes du run (inactive tant qu'elle n'est pas ouverte)
+response_archive = ResponseArchive(archive_config["DIR"])
+
+# Token API partagé par tous les appels (renouvelé avant expiration, relu depuis le cache entre deux runs)
+token_manager = TokenManager(lambda: RequestsAPI.request_token(), token_config["CACHE_FILE"], token_config["REFRESH_MARGIN"],
+                             TokenManager.build_cache_key(api_config["TOKEN_URL"], api_config["CLIENT_ID"], api_config["GRANT_TYPE"]))
+
 class RequestsAPI:
 
-    # Génération du token
+    # Statistiques de réutilisation des connexions de la session pour le run en cours
+    def get_connection_stats():
+        stats = {"requests": 0, "connections": 0, "reused": 0}
+
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                if pool is None:
+                    continue
+                stats["requests"] += pool.num_requests
+                stats["connections"] += pool.num_connections
+
+        stats["reused"] = max(0, stats["requests"] - stats["connections"])
+        return stats
+
+    # Envoi d'une requête GET authentifiée avec le token courant ; après un 401, le token est renouvelé
+    # et la requête renvoyée une seule fois
+    def send_request(route, url, headers=None):
+        access_token = token_manager.get()
+        response = RequestsAPI.send_throttled_request(route, url, {**(headers or {}), 'Authorization': f'Bearer {access_token}'})
+
+        if response.status_code == 401:
+            log(f"🔑 Erreur 401 sur {route}, nouvelle tentative avec un token renouvelé")
+            access_token = token_manager.refresh(access_token)
+            if access_token:
+                response = RequestsAPI.send_throttled_request(route, url, {**(headers or {}), 'Authorization': f'Bearer {access_token}'})
+
+        return response
+
+    # Envoi d'une requête GET soumise au quota de la route :
+    # - 429 (ou 503 avec Retry-After) : attente imposée par l'API, jusqu'à THROTTLE_MAX_RETRIES fois
+    # - panne passagère (5xx, délai dépassé, connexion coupée) : nouvelles tentatives selon la politique de la route,
+    #   avec backoff exponentiel et gigue ; les pannes consécutives ouvrent le disjoncteur de la route
+    def send_throttled_request(route, url, headers):
+        retry_policy = retry_policies.get(route, default_retry_policy)
+        throttle_retries = 0
+        retries = 0
+
+        while True:
+            rate_limiter.acquire(route)
+            started_at = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=retry_config["TIMEOUT"])
+            except TRANSIENT_ERRORS as e:
+                metrics.observe_api(route, "error", time.perf_counter() - started_at)
+                circuit_breaker.record_failure(route)
+                if retries >= retry_policy.max_retries:
+                    raise
+                failure = type(e).__name__
+            except requests.exceptions.RequestException:
+                metrics.observe_api(route, "error", time.perf_counter() - started_at)
+                raise
+            else:
+                metrics.observe_api(route, response.status_code, time.perf_counter() - started_at)
+
+                if response.status_code == 429 or (response.status_code == 503 and "Retry-After" in response.headers):
+                    if throttle_retries >= perf_config["THROTTLE_MAX_RETRIES"]:
+                        return response
+
+                    throttle_retries += 1
+                    delay = RateLimiter.parse_retry_after(response.headers.get("Retry-After"), perf_config["THROTTLE_DEFAULT_DELAY"])
+                    log(f"⏳ Erreur {response.status_code} sur {route}, nouvelle tentative dans {delay:.1f}s ({throttle_retries}/{perf_config['THROTTLE_MAX_RETRIES']})")
+                    rate_limiter.penalize(route, delay)
+                    continue
+
+                if response.status_code not in TRANSIENT_STATUSES:
+                    circuit_breaker.record_success(route)
+                    return response
+
+                circuit_breaker.record_failure(route)
+                if retries >= retry_policy.max_retries:
+                    return response
+                failure = f"Erreur {response.status_code}"
+
+            delay = retry_policy.delay(retries)
+            retries += 1
+            log(f"🔁 {failure} sur {route}, nouvelle tentative dans {delay:.1f}s ({retries}/{retry_policy.max_retries})")
+            time.sleep(delay)
+
+    # Token valide pour le run (cache, token courant ou nouveau token) ; None si l'authentification échoue.
+    # Les requêtes utilisent toujours le token courant du gestionnaire : le token renvoyé ici ne sert qu'à valider l'accès au démarrage
     def get_access_token():
+        return token_manager.get()
+
+    # Génération d'un token depuis /token : (token, durée de validité en secondes) ou (None, None)
+    def request_token():
         url = api_config["TOKEN_URL"]
         payload = f'client_id={api_config["CLIENT_ID"]}&client_secret={api_config["CLIENT_SECRET"]}&grant_type={api_config["GRANT_TYPE"]}'
         headers = {'Content-Type': 'application/x-www-form-urlencoded'}
 
         try:
-            response = requests.post(url, headers=headers, data=payload)
-            time.sleep(1)
+            started_at = time.perf_counter()
+            response = session.post(url, headers=headers, data=payload, timeout=retry_config["TIMEOUT"])
+            metrics.observe_api("/token", response.status_code, time.perf_counter() - started_at)
 
             if response.status_code == 200:
-                access_token = response.json().get('access_token')
+                token_data = response.json()
+                access_token = token_data.get('access_token')
                 if access_token:
                     log("✅ Token généré avec succès\n")
-                    return access_token
+                    return access_token, token_data.get('expires_in')
                 else:
                     log("❌ Le token d'accès n'a pas été trouvé dans la réponse")
-                    return None
+                    return None, None
             else:
                 token_error = response.json().get('error', 'Erreur inconnue')
                 log(f"❌ Erreur {response.status_code} lors de l'obtention du token : {token_error}")
                 Logger.separator()
-                return None
+                return None, None
 
         except requests.exceptions.RequestException as e:
             log(f"❌ Erreur lors de la requête pour obtenir le token : {str(e)}")
             Logger.separator()
-            return None
+            return None, None
     
     ### SECTION ORDERS ###
     # Récupération les informations commandes par page depuis la route /orders
-    def get_orders_info(access_token):
-    
-        url = f"{api_config['CALL_URL']}/orders"
-        headers = {'Authorization': f'Bearer {access_token}'}
-        page_index = 1
-        page_size = 100
-        createdAtMin = "2025-01-01T01:00:00.00"
+    # (commandes créées depuis CREATED_AT_MIN, ou modifiées depuis updated_at_min en synchro incrémentale)
+    # start_page : reprise de la pagination après un checkpoint
+    # Les pages sont demandées par anticipation (page_workers pages en cours, sous le quota partagé de /orders)
+    # et rendues dans l'ordre ; page_workers=1 : une page à la fois
+    # created_at_window : fenêtre (createdAtMin, createdAtMax) d'un run réparti entre processus
+    def get_orders_info(access_token, updated_at_min=None, start_page=1, page_size=None, page_workers=None, created_at_window=None):
+        page_size = page_size or perf_config["ORDERS_PAGE_SIZE"]
+        page_workers = max(1, page_workers or perf_config["ORDERS_PAGE_WORKERS"])
+
+        if updated_at_min:
+            date_filter = f"updatedAtMin={updated_at_min}"
+        elif created_at_window:
+            date_filter = f"createdAtMin={created_at_window[0]}&createdAtMax={created_at_window[1]}"
+        else:
+            date_filter = f"createdAtMin={sync_config['CREATED_AT_MIN']}"
+
+        url = f"{api_config['CALL_URL']}/orders?pageSize={page_size}&{date_filter}"
+
+        with ThreadPoolExecutor(max_workers=page_workers) as executor:
+            pending = deque()   # [(pageIndex, future)] dans l'ordre des pages
+            next_page = start_page
 
-        while True:
-            paginated_url = f"{url}?pageIndex={page_index}&pageSize={page_size}&createdAtMin={createdAtMin}"
-            
             try:
-                log(f"📜 Récupération des commandes - Page {page_index}")
-                response = requests.get(paginated_url, headers=headers)
-                time.sleep(1)
+                while True:
+                    while len(pending) < page_workers:
+                        pending.append((next_page, executor.submit(RequestsAPI.get_orders_page, url, next_page)))
+                        next_page += 1
+
+                    page_index, future = pending.popleft()
+                    orders = future.result()
 
-                if response.status_code == 200:
-                    data = response.json()
-                    orders = data.get('items', [])
+                    # Page irrécupérable après les nouvelles tentatives : le run s'arrête (sans avancer le watermark)
+                    # plutôt que d'ignorer les pages suivantes ; le checkpoint permet de reprendre à cette page
+                    if orders is None:
+                        raise RuntimeError(f"page {page_index} de /orders irrécupérable")
 
-                    if isinstance(orders, list) and orders:
+                    if orders:
+                        response_archive.record("orders_page", page_index, orders)
                         yield orders
-                        page_index += 1
-                        log(f"➡️ Passage à la page suivante : Page {page_index}")
+                        log(f"➡️ Passage à la page suivante : Page {page_index + 1}")
                     else:
                         log(f"🟡 Aucune commande trouvée sur la page {page_index}")
                         log("🔚 Fin de la récupération des commandes.\n")
                         break
-                else:
-                    log(f"❌ Erreur {response.status_code} : {response.text}")
-                    break
-            
-            except requests.exceptions.RequestException as e:
-                log(f"❌ Erreur lors de la requête API : {str(e)}")
-                break
+
+            finally:
+                # Pages demandées au-delà de la dernière : abandonnées si elles ne sont pas encore parties
+                for _, future in pending:
+                    future.cancel()
+
+    # Récupération d'une page de /orders : liste des commandes (vide après la dernière page), None en cas d'erreur
+    def get_orders_page(url, page_index):
+        try:
+            log(f"📜 Récupération des commandes - Page {page_index}")
+            response = RequestsAPI.send_request("/orders", f"{url}&pageIndex={page_index}")
+
+            if response.status_code == 200:
+                orders = response.json().get('items', [])
+                return orders if isinstance(orders, list) else []
+
+            log(f"❌ Erreur {response.status_code} : {response.text}")
+
+        except requests.exceptions.RequestException as e:
+            log(f"❌ Erreur lors de la requête API : {str(e)}")
+
+        return None
 
     # Récupération de l'orderId et customer_reference depuis la route /order/{order_id}
     def get_order_id_cust_ref(access_token, order_id):
         url = f"{api_config['CALL_URL']}/orders/{order_id}"
-        headers = {'Authorization': f'Bearer {access_token}'}
 
         try:
-            response = requests.get(url, headers=headers)
+            response = RequestsAPI.send_request("/orders", url)
             if response.status_code == 200:
                 data = response.json()
 
@@ -91,20 +256,22 @@ class RequestsAPI:
                 customer_reference = data.get("customer", {}).get("reference")
 
                 # Récupération du ou des productId par order
+                product_id = None
                 lines = data.get("lines", [])
                 for line in lines:
                     product_id = line.get("offer", {}).get("productId")
 
                 if customer_reference:
-                    log(f"✅ Référence client trouvée : {customer_reference}")
+                    log(f"✅ Référence client trouvée : {customer_reference}", level="DEBUG")
                 else:
-                    log("⚠️ Aucune référence client trouvée")
+                    log("⚠️ Aucune référence client trouvée", level="DEBUG")
 
                 if product_id:
-                    log(f"✅ productId trouvé : {product_id}")
+                    log(f"✅ productId trouvé : {product_id}", level="DEBUG")
                 else:
-                    log("⚠️ Aucune référence client trouvée")
+                    log("⚠️ Aucune référence client trouvée", level="DEBUG")
 
+                response_archive.record("order", order_id, data)
                 return data
             
             else:
@@ -116,18 +283,62 @@ class RequestsAPI:
             log(f"❌ Erreur lors de la requête pour obtenir les informations de la commande {str(e)}")
             Logger.separator()
             return None   
+
+    # Récupération des détails de toutes les commandes d'une page en parallèle (résultats dans l'ordre de la page)
+    def get_orders_details(access_token, order_ids, max_workers=None):
+        max_workers = max_workers or perf_config["MAX_WORKERS"]
+        if not order_ids:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(order_ids))) as executor:
+            return list(executor.map(lambda order_id: RequestsAPI.get_order_id_cust_ref(access_token, order_id), order_ids))
     
+    # Commande de la liste /orders à laquelle manque un champ utilisé par le chargement (référence client, lignes, productId)
+    def needs_order_detail(order):
+        lines = order.get("lines") or []
+        if not order.get("customer", {}).get("reference") or not lines:
+            return True
+        return any(not line.get("offer", {}).get("productId") for line in lines)
+
+    # Détails des commandes d'une page selon la politique d'appel de /orders/{id} ; renvoie (commandes, détails) :
+    # "always" : toutes les commandes sont appelées, la liste est conservée telle quelle
+    # "never" : la liste suffit, chaque commande sert de détail
+    # "missing" : seules les commandes incomplètes sont appelées et complétées par leur détail
+    def get_orders_details_by_policy(access_token, orders, policy=None):
+        policy = policy or perf_config["ORDER_DETAIL_POLICY"]
+
+        if policy == "always":
+            return orders, RequestsAPI.get_orders_details(access_token, [order.get('orderId', None) for order in orders])
+
+        if policy == "never":
+            return orders, list(orders)
+
+        orders = list(orders)
+        details = list(orders)
+        missing = [index for index, order in enumerate(orders) if RequestsAPI.needs_order_detail(order)]
+        if missing:
+            log(f"🔎 {len(missing)} commandes incomplètes dans la liste, récupération de leur détail", level="DEBUG")
+
+        fetched = RequestsAPI.get_orders_details(access_token, [orders[index].get('orderId', None) for index in missing])
+        for index, detail in zip(missing, fetched):
+            if detail:
+                orders[index] = {**orders[index], **detail}
+                details[index] = orders[index]
+            else:
+                details[index] = None
+
+        return orders, details
+
     # Récupération de toutes les informations par produit depuis la route /products/{productId}
     def get_product_info(access_token, product_id):
         url = f"{api_config['CALL_URL']}/products/{product_id}"
-        headers = {'Authorization': f'Bearer {access_token}'}
 
         try:
-            response = requests.get(url, headers=headers)
-            time.sleep(1)
+            response = RequestsAPI.send_request("/products", url)
 
             if response.status_code == 200:
                 data = response.json()
+                response_archive.record("product", product_id, data)
                 return data
             else:
                 log(f"❌ Erreur {response.status_code} : {response.text}")
@@ -142,15 +353,21 @@ class RequestsAPI:
     ### SECTION CATEGORY ###
     # Récupération des informations catégorie par produit depuis la route /categories/{categoryReference}
     def get_categories_info(access_token, category_reference):
+        # Les catégories lues en cache sont aussi archivées (une fois par run) : l'archive suffit au rejeu
+        cached_data = category_cache.get(category_reference)
+        if cached_data:
+            response_archive.record("category", category_reference, cached_data, once=True)
+            return cached_data
+
         url = f"{api_config['CALL_URL']}/categories/{category_reference}"
-        headers = {'Authorization': f'Bearer {access_token}'}
 
         try:
-            response = requests.get(url, headers=headers)
-            time.sleep(1)
+            response = RequestsAPI.send_request("/categories", url)
 
             if response.status_code == 200:
                 data = response.json()
+                category_cache.set(category_reference, data)
+                response_archive.record("category", category_reference, data, once=True)
                 return data
             else:
                 log(f"❌ Erreur {response.status_code} : {response.text}")
@@ -160,4 +377,30 @@ class RequestsAPI:
         except requests.exceptions.RequestException as e:
             log(f"❌ Erreur lors de la requête pour obtenir les informations de la commande {str(e)}")
             Logger.separator()
-            return None
\ No newline at end of file
+            return None
+
+    # Sauvegarde du cache des catégories pour les prochains runs
+    def save_category_cache():
+        category_cache.save()
+
+    # Quotas partagés avec les processus workers d'un run réparti (seaux en mémoire partagée)
+    def share_rate_limits(context):
+        return rate_limiter.share(context, ["/token"])
+
+    def attach_rate_limits(buckets):
+        rate_limiter.attach(buckets)
+
+    # Catégories récupérées par un worker, regroupées dans le cache du processus principal
+    def export_category_cache():
+        return category_cache.export()
+
+    def merge_category_cache(entries):
+        category_cache.merge(entries)
+
+    # Archivage des réponses brutes du run (header : description du run, pour le rejeu)
+    def open_archive(run_id, header):
+        if archive_config["ENABLED"]:
+            response_archive.open(run_id, header)
+
+    def close_archive(completed=False):
+        response_archive.close(completed)
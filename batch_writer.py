@@ -0,0 +1,122 @@
+import threading
+import time
+
+from logger import Logger
+
+log = Logger.write_log
+
+
+class BatchWriter:
+
+    def __init__(self, db, conn, batch_size, commit_interval, on_flush=None, writers=None):
+        self.db = db
+        self.conn = conn
+        self.batch_size = max(1, batch_size)    # Nombre d'unités (produits) par transaction
+        self.commit_interval = commit_interval  # Délai maximal (s) entre deux écritures, 0 = uniquement à la taille du lot
+        self.on_flush = on_flush                # Appelée avec la clé de chaque unité écrite (checkpoint)
+        self.writers = writers                  # TableWriters : chaque table du lot est écrite par son writer, sinon tout passe par conn
+        self.units = []                         # [(clé, suppressions, insertions)]
+        self.totals = {}                        # Lignes insérées par table
+        self.tables = set()                     # Tables confiées aux writers (attendues par close)
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()            # Totaux et on_flush mis à jour depuis les threads des writers
+
+    # Mise en attente d'une unité : suppressions [(table, colonne, clés)] puis insertions {table: lignes}
+    def add(self, key, deletes, inserts):
+        self.units.append((key, deletes, inserts))
+
+        if len(self.units) >= self.batch_size or (self.commit_interval and time.monotonic() - self.last_flush >= self.commit_interval):
+            self.flush()
+
+    # Regroupement des unités dans l'ordre : une suppression retire aussi les lignes des unités précédentes du lot,
+    # le résultat est identique à l'écriture des unités une par une
+    @staticmethod
+    def merge(units):
+        deletes = []
+        inserts = {}
+
+        for _, unit_deletes, unit_inserts in units:
+            for table, column, keys in unit_deletes:
+                deleted_keys = set(keys)
+                if table in inserts:
+                    inserts[table] = [row for row in inserts[table] if row[column] not in deleted_keys]
+                deletes.append((table, column, keys))
+
+            for table, rows in unit_inserts.items():
+                inserts.setdefault(table, []).extend(rows)
+
+        return deletes, inserts
+
+    # Écriture des unités en attente : en une transaction sur conn, ou une transaction par table sur le writer de chaque table
+    def flush(self):
+        units, self.units = self.units, []
+        self.last_flush = time.monotonic()
+        if not units:
+            return
+
+        keys = [key for key, _, _ in units]
+        if self.writers is None:
+            self._done(keys, self._write(self.conn, units))
+            return
+
+        tables = sorted({table for _, deletes, inserts in units for table in [delete[0] for delete in deletes] + list(inserts)})
+        if not tables:
+            self._done(keys, set())
+            return
+
+        # L'unité n'est signalée écrite (on_flush) qu'une fois toutes ses tables écrites
+        pending = {"tables": len(tables), "failed": set()}
+        for table in tables:
+            table_units = [(key, [delete for delete in deletes if delete[0] == table], {table: inserts[table]} if table in inserts else {})
+                           for key, deletes, inserts in units]
+            self.tables.add(table)
+            self.writers.submit(table, lambda conn, table_units=table_units: self._write_part(conn, keys, table_units, pending))
+
+    # Fin des écritures : lot en attente écrit, et attente des writers concernés
+    def close(self):
+        self.flush()
+        if self.writers is not None and self.tables:
+            self.writers.wait(self.tables)
+
+    # Écriture d'unités en une transaction ; si le lot échoue, les unités sont réécrites une par une. Renvoie les clés en échec
+    def _write(self, conn, units):
+        inserted = self.db.write_batch(conn, *self.merge(units))
+        if inserted is not None:
+            self._count(inserted)
+            return set()
+
+        if len(units) == 1:
+            return {units[0][0]}
+
+        log(f"⚠️ Lot de {len(units)} produits en échec, écriture produit par produit")
+        failed = set()
+        for unit in units:
+            inserted = self.db.write_batch(conn, *self.merge([unit]))
+            if inserted is None:
+                failed.add(unit[0])
+            else:
+                self._count(inserted)
+        return failed
+
+    # Écriture de la part d'une table (thread du writer) ; la dernière table écrite signale les unités du lot
+    def _write_part(self, conn, keys, table_units, pending):
+        failed = self._write(conn, table_units)
+
+        with self.lock:
+            pending["failed"] |= failed
+            pending["tables"] -= 1
+            if pending["tables"]:
+                return
+        self._done(keys, pending["failed"])
+
+    def _count(self, inserted):
+        with self.lock:
+            for table, count in inserted.items():
+                self.totals[table] = self.totals.get(table, 0) + count
+
+    def _done(self, keys, failed):
+        if self.on_flush:
+            with self.lock:
+                for key in keys:
+                    if key not in failed:
+                        self.on_flush(key)
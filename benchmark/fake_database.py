@@ -0,0 +1,143 @@
+import threading
+import time
+
+from database import DatabaseSQL
+from sink_base import TABLES, SHADOW_SUFFIX, BATCH_COLUMNS
+from metrics import metrics
+
+
+class FakeConnection:
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# Remplaçant en mémoire de DatabaseSQL : même surface que celle utilisée par main.py, sans SQL Server.
+# La mise à plat des commandes (build_order_rows) et la résolution des siteID sont celles de DatabaseSQL.
+class FakeDatabaseSQL(DatabaseSQL):
+
+    def __init__(self, site_ids=None, write_latency=0.0):
+        super().__init__()
+        self.fake_site_ids = site_ids or {}
+        self.write_latency = write_latency      # Latence simulée par écriture (secondes)
+        self.tables = {name: [] for table in TABLES for name in (table, f"{table}{SHADOW_SUFFIX}")}  # Par table physique (publiée ou fantôme)
+        self.order_keys = set()
+        self.lock = threading.Lock()
+        self.round_trips = 0
+
+    def _round_trip(self, count=1):
+        with self.lock:
+            self.round_trips += count
+        if self.write_latency:
+            time.sleep(self.write_latency * count)
+
+    def get_db_connection(self):
+        return FakeConnection(), True
+
+    def check_connection(self, conn):
+        self._round_trip()
+        return True
+
+    def load_site_ids(self, conn, refresh=False):
+        if self.site_ids is None or refresh:
+            self._round_trip()
+            self.site_ids = dict(self.fake_site_ids)
+        return self.site_ids
+
+    def _index_order_keys(self):
+        self.order_keys = {(row["orderId"], row["productId"], row["siteId"]) for row in self.tables[self.table_names["TM_MAD_DROPFR_ventes"]]}
+
+    # TRUNCATE : lecture du nombre de lignes puis vidage
+    def truncate_table(self, conn, table):
+        self._round_trip(2)
+        with self.lock:
+            deleted_rows = len(self.tables.get(table, []))
+            self.tables[table] = []
+            if table == self.table_names["TM_MAD_DROPFR_ventes"]:
+                self.order_keys = set()
+            return deleted_rows
+
+    def prepare_shadow_tables(self, conn, truncate=True):
+        self._round_trip(2 * len(TABLES))
+        with self.lock:
+            for table in TABLES:
+                shadow_table = f"{table}{SHADOW_SUFFIX}"
+                if truncate:
+                    self.tables[shadow_table] = []
+                self.table_names[table] = shadow_table
+            self._index_order_keys()
+        return True
+
+    def swap_shadow_tables(self, conn):
+        self._round_trip(3 * len(TABLES))
+        with self.lock:
+            for table in TABLES:
+                shadow_table = f"{table}{SHADOW_SUFFIX}"
+                self.tables[table], self.tables[shadow_table] = self.tables[shadow_table], self.tables.get(table, [])
+                self.table_names[table] = table
+            self._index_order_keys()
+        return True
+
+    def _insert_order_rows(self, rows, replace=False):
+        insert_count = 0
+        with self.lock:
+            if replace:
+                order_ids = set(order_line.orderId for order_line in rows)
+                ventes = self.table_names["TM_MAD_DROPFR_ventes"]
+                self.tables[ventes] = [row for row in self.tables[ventes] if row["orderId"] not in order_ids]
+                self._index_order_keys()
+            for order_line in rows:
+                key = order_line.key
+                if order_line.productId is not None and key in self.order_keys:
+                    continue
+                self.order_keys.add(key)
+                self.tables[self.table_names["TM_MAD_DROPFR_ventes"]].append(order_line._asdict())
+                insert_count += 1
+        return insert_count
+
+    # Ligne à ligne : un aller-retour pour le contrôle de doublon et un pour l'insertion
+    @metrics.track_rows("TM_MAD_DROPFR_ventes")
+    def insert_orders_data(self, conn, orders, replace=False):
+        rows = list(self.build_order_rows(conn, orders))
+        self._round_trip(2 * len(rows) + (1 if replace else 0))
+        return self._insert_order_rows(rows, replace)
+
+    # En masse : chargement de la table temporaire par lots puis une requête ensembliste
+    @metrics.track_rows("TM_MAD_DROPFR_ventes")
+    def insert_orders_data_bulk(self, conn, orders, replace=False):
+        rows = list(self.build_order_rows(conn, orders))
+        if not rows:
+            return 0
+        self._round_trip(4 + len(rows) // 86 + 1 + (1 if replace else 0))
+        return self._insert_order_rows(rows, replace)
+
+    # Un lot : un aller-retour par suppression et par requête d'insertion multi-lignes, puis le commit
+    def write_batch(self, conn, deletes, inserts):
+        statements = len(deletes) + sum(len(rows) // max(1, 2000 // len(BATCH_COLUMNS[table])) + 1 for table, rows in inserts.items() if rows)
+        self._round_trip(statements + 1)
+
+        inserted = {}
+        with self.lock:
+            for table, column, keys in deletes:
+                keys = set(keys)
+                physical_table = self.table_names[table]
+                self.tables[physical_table] = [row for row in self.tables[physical_table] if row.get(column) not in keys]
+
+            for table, rows in inserts.items():
+                self.tables[self.table_names[table]].extend(rows)
+                inserted[table] = len(rows)
+
+        for table, count in inserted.items():
+            metrics.observe_rows(table, count, 0.0)
+        return inserted
+
+    # Nombre de lignes par table publiée (pour le rapport de benchmark)
+    def row_counts(self):
+        with self.lock:
+            return {table: len(self.tables[table]) for table in TABLES}
@@ -0,0 +1,240 @@
+import json
+import random
+import re
+import threading
+import time
+
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ORDER_DETAIL_ROUTE = re.compile(r"^/orders/(?P<order_id>[^/]+)$")
+PRODUCT_ROUTE = re.compile(r"^/products/(?P<product_id>[^/]+)$")
+CATEGORY_ROUTE = re.compile(r"^/categories/(?P<category_reference>[^/]+)$")
+
+# Date de création de la première commande ; les suivantes sont espacées de MockAPIConfig.created_every_minutes
+FIRST_CREATED_AT = datetime(2025, 1, 1, 2, 0, tzinfo=timezone.utc)
+
+
+class MockAPIConfig:
+
+    def __init__(self, orders=1000, products=200, categories=40, customers=20, max_lines=3,
+                 latency=0.02, error_rate=0.0, error_status=500, incomplete_rate=0.0, created_every_minutes=60, token_ttl=3600, seed=42):
+        self.orders = orders                # Nombre total de commandes exposées par /orders
+        self.products = products            # Taille du catalogue de productId
+        self.categories = categories        # Nombre de catégories N3 (6 chiffres)
+        self.customers = customers          # Nombre de références client (ID_CDS) distinctes
+        self.max_lines = max_lines          # Lignes par commande (1 à max_lines)
+        self.latency = latency              # Latence ajoutée à chaque réponse (secondes)
+        self.error_rate = error_rate        # Proportion de réponses en erreur
+        self.error_status = error_status    # Code HTTP des réponses en erreur (500, 503...)
+        self.incomplete_rate = incomplete_rate  # Proportion de commandes sans référence client dans la liste /orders (complètes dans /orders/{id})
+        self.created_every_minutes = created_every_minutes  # Écart entre les dates de création de deux commandes successives
+        self.token_ttl = token_ttl          # Durée de validité des tokens (expires_in) ; un token expiré ou inconnu reçoit un 401
+        self.seed = seed
+
+
+# Jeu de données déterministe généré à partir de la configuration
+class MockDataset:
+
+    def __init__(self, config):
+        self.config = config
+
+    def customer_reference(self, index):
+        return f"CUST{index % self.config.customers:04d}"
+
+    def category_reference(self, product_index):
+        category_index = product_index % self.config.categories
+        return f"{10 + category_index % 9:02d}{10 + category_index % 7:02d}{10 + category_index:02d}"
+
+    def order(self, index):
+        rng = random.Random(self.config.seed + index)
+        lines = []
+        for line_index in range(rng.randint(1, self.config.max_lines)):
+            product_index = rng.randrange(self.config.products)
+            lines.append({
+                "offer": {"id": f"OFF{index:07d}{line_index}", "productId": f"PRD{product_index:06d}"},
+                "offerPrice": {"unitSalesPrice": round(rng.uniform(5, 500), 2), "shippingCost": 4.99, "commission": {"amountWithoutVat": 1.5, "rate": 0.12}},
+                "delivery": {"promisedAtMin": "2025-06-01T00:00:00Z", "promisedAtMax": "2025-06-05T00:00:00Z"},
+                "parcels": [{"parcelNumber": f"PCL{index:07d}{line_index}", "carrierName": "Colissimo", "trackingUrl": f"https://tracking.example/{index}"}]
+            })
+
+        return {
+            "orderId": f"ORD{index:07d}",
+            "reference": f"REF{index:07d}",
+            "seller": {"id": "SELLER1"},
+            "customer": {"reference": self.customer_reference(index)},
+            "billingAddress": {"companyName": "Client Démo"},
+            "purchasedAt": "2025-05-30T10:00:00Z",
+            "updatedAt": "2025-05-31T10:00:00Z",
+            "createdAt": self.created_at(index).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "shippedAtMax": "2025-06-02T10:00:00Z",
+            "status": "Shipped",
+            "lines": lines
+        }
+
+    def created_at(self, index):
+        return FIRST_CREATED_AT + timedelta(minutes=index * self.config.created_every_minutes)
+
+    # Indices des commandes créées dans [created_at_min, created_at_max[ (dates au format des filtres /orders)
+    def created_range(self, created_at_min=None, created_at_max=None):
+        def first_index(value):
+            elapsed = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f").replace(tzinfo=timezone.utc) - FIRST_CREATED_AT
+            return min(self.config.orders, max(0, -(-int(elapsed.total_seconds()) // (self.config.created_every_minutes * 60))))
+
+        start = first_index(created_at_min) if created_at_min else 0
+        end = first_index(created_at_max) if created_at_max else self.config.orders
+        return start, max(start, end)
+
+    # Commande telle que renvoyée par la liste /orders
+    def listing_order(self, index):
+        order = self.order(index)
+        if self.config.incomplete_rate and random.Random(self.config.seed - index - 1).random() < self.config.incomplete_rate:
+            del order["customer"]
+        return order
+
+    def product(self, product_id):
+        product_index = int(product_id[3:])
+        return {
+            "productId": product_id,
+            "gtin": f"{3000000000000 + product_index}",
+            "title": f"Produit {product_index}",
+            "description": "Produit de démonstration " * 10,
+            "brand": {"label": f"Marque {product_index % 15}"},
+            "createdAt": "2024-01-01T00:00:00Z",
+            "updatedAt": "2025-01-01T00:00:00Z",
+            "category": self.category_reference(product_index),
+            "images": [{"url": f"https://images.example/{product_id}/{i}.jpg"} for i in range(3)],
+            "attributes": [{"code": f"ATTR{i}", "label": f"Attribut {i}", "values": [f"valeur {i}"]} for i in range(8)]
+        }
+
+    def category(self, category_reference):
+        return {"categoryReference": category_reference, "label": f"Catégorie {category_reference}", "isActive": True}
+
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # TCP_NODELAY : en-têtes et corps partent sans attendre l'ACK différé du client
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Latence simulée, comptage des appels, contrôle du token et injection d'erreurs ; renvoie False si une erreur a été envoyée
+    def _before(self, route):
+        server = self.server
+        server.count_call(route)
+        time.sleep(server.config.latency)
+
+        if route != "/token" and not server.token_valid(self.headers.get("Authorization", "")[len("Bearer "):]):
+            self._send_json(401, {"error": "invalid_token"})
+            return False
+
+        if server.config.error_rate and server.rng.random() < server.config.error_rate:
+            self._send_json(server.config.error_status, {"error": "mock error"}, {"Retry-After": "0"})
+            return False
+        return True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+
+        if urlparse(self.path).path != "/token":
+            return self._send_json(404, {"error": "not found"})
+        if self._before("/token"):
+            self._send_json(200, {"access_token": self.server.issue_token(), "token_type": "Bearer", "expires_in": self.server.config.token_ttl})
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        dataset = self.server.dataset
+
+        if path == "/orders":
+            if not self._before("/orders"):
+                return
+            query = parse_qs(parsed.query)
+            page_index = int(query.get("pageIndex", ["1"])[0])
+            page_size = int(query.get("pageSize", ["100"])[0])
+            first, last = dataset.created_range(query.get("createdAtMin", [None])[0], query.get("createdAtMax", [None])[0])
+            start = first + (page_index - 1) * page_size
+            end = min(start + page_size, last)
+            return self._send_json(200, {"items": [dataset.listing_order(i) for i in range(start, end)]})
+
+        match = ORDER_DETAIL_ROUTE.match(path)
+        if match:
+            if not self._before("/orders/{id}"):
+                return
+            return self._send_json(200, dataset.order(int(match["order_id"][3:])))
+
+        match = PRODUCT_ROUTE.match(path)
+        if match:
+            if not self._before("/products/{id}"):
+                return
+            return self._send_json(200, dataset.product(match["product_id"]))
+
+        match = CATEGORY_ROUTE.match(path)
+        if match:
+            if not self._before("/categories/{ref}"):
+                return
+            return self._send_json(200, dataset.category(match["category_reference"]))
+
+        self._send_json(404, {"error": "not found"})
+
+
+class MockAPIServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, config, host="127.0.0.1", port=0):
+        super().__init__((host, port), MockAPIHandler)
+        self.config = config
+        self.dataset = MockDataset(config)
+        self.rng = random.Random(config.seed)
+        self.calls = {}
+        self.calls_lock = threading.Lock()
+        self.tokens = {}    # {token: expiration (epoch)}
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def issue_token(self):
+        with self.calls_lock:
+            token = f"mock-token-{len(self.tokens) + 1}"
+            self.tokens[token] = time.time() + self.config.token_ttl
+            return token
+
+    def token_valid(self, token):
+        with self.calls_lock:
+            return time.time() < self.tokens.get(token, 0)
+
+    def count_call(self, route):
+        with self.calls_lock:
+            self.calls[route] = self.calls.get(route, 0) + 1
+
+    # Nombre d'appels par route depuis la dernière remise à zéro
+    def reset_calls(self):
+        with self.calls_lock:
+            calls, self.calls = self.calls, {}
+        return calls
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name="mock-api", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
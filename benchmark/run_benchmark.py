@@ -0,0 +1,277 @@
+# Benchmark hors ligne de main.main : API simulée (benchmark.mock_api) et base en mémoire (benchmark.fake_database)
+#
+#   python -m benchmark.run_benchmark                          # tous les scénarios
+#   python -m benchmark.run_benchmark -s baseline -s pipeline  # scénarios choisis
+#   python -m benchmark.run_benchmark --output bench.json --compare previous.json
+#
+# Chaque scénario tourne dans un sous-processus (caches, sessions et métriques repartent de zéro),
+# dans un dossier temporaire : Logs, Cache, State et Reports ne touchent pas au dépôt.
+
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# api : paramètres de MockAPIConfig / argv : options de main.py / env : variables d'environnement / db_write_latency : latence par écriture
+# sink : chargement réel dans une base SQLite ou des fichiers Parquet du dossier temporaire (au lieu de la base en mémoire)
+SCENARIOS = {
+    "baseline": {
+        "api": {"orders": 2000, "products": 300, "latency": 0.01},
+        "argv": ["--full"]
+    },
+    "truncate-reload": {
+        "api": {"orders": 2000, "products": 300, "latency": 0.01},
+        "argv": ["--full", "--reload-mode", "truncate"]
+    },
+    "details-always": {
+        "api": {"orders": 2000, "products": 300, "latency": 0.01, "incomplete_rate": 0.05},
+        "argv": ["--full"],
+        "env": {"API_ORDER_DETAIL_POLICY": "always"}
+    },
+    "details-missing": {
+        "api": {"orders": 2000, "products": 300, "latency": 0.01, "incomplete_rate": 0.05},
+        "argv": ["--full"]
+    },
+    "row-load": {
+        "api": {"orders": 2000, "products": 300, "latency": 0.01},
+        "argv": ["--full", "--load-mode", "row"],
+        "db_write_latency": 0.0005
+    },
+    "single-writer": {
+        "api": {"orders": 2000, "products": 300, "latency": 0.01},
+        "argv": ["--full", "--load-mode", "row"],
+        "env": {"DB_TABLE_WRITERS": "0"},
+        "db_write_latency": 0.0005
+    },
+    "pipeline": {
+        "api": {"orders": 2000, "products": 300, "latency": 0.01},
+        "argv": ["--full", "--pipeline"]
+    },
+    "slow-api": {
+        "api": {"orders": 500, "products": 100, "latency": 0.1},
+        "argv": ["--full"]
+    },
+    "flaky-api": {
+        "api": {"orders": 1000, "products": 200, "latency": 0.01, "error_rate": 0.05, "error_status": 503},
+        "argv": ["--full"]
+    },
+    "failing-api": {
+        "api": {"orders": 1000, "products": 200, "latency": 0.01, "error_rate": 0.05, "error_status": 500},
+        "argv": ["--full"],
+        "env": {"RETRY_BASE_DELAY": "0.05"}
+    },
+    "short-token": {
+        "api": {"orders": 1000, "products": 200, "latency": 0.01, "token_ttl": 2},
+        "argv": ["--full"],
+        "env": {"TOKEN_REFRESH_MARGIN": "0"}
+    },
+    "sqlite-sink": {
+        "api": {"orders": 2000, "products": 300, "latency": 0.01},
+        "argv": ["--full", "--sink", "sqlite"],
+        "sink": "sqlite"
+    },
+    "parquet-sink": {
+        "api": {"orders": 2000, "products": 300, "latency": 0.01},
+        "argv": ["--full", "--sink", "parquet"],
+        "sink": "parquet"
+    },
+    "rate-limited": {
+        "api": {"orders": 500, "products": 100, "latency": 0.01},
+        "argv": ["--full"],
+        "env": {"RATE_LIMIT_ORDERS": "20", "RATE_LIMIT_PRODUCTS": "20", "RATE_LIMIT_CATEGORIES": "20"}
+    }
+}
+
+# Quotas élevés par défaut : le benchmark mesure le code, pas le quota de production
+DEFAULT_ENV = {
+    "API_CLIENT_ID": "benchmark",
+    "API_CLIENT_SECRET": "benchmark",
+    "API_GRANT_TYPE": "client_credentials",
+    "RATE_LIMIT_ORDERS": "10000",
+    "RATE_LIMIT_PRODUCTS": "10000",
+    "RATE_LIMIT_CATEGORIES": "10000",
+    "RATE_LIMIT_DEFAULT": "10000",
+    "API_THROTTLE_DEFAULT_DELAY": "0"
+}
+
+
+# Exécution d'un scénario dans le sous-processus courant (API simulée déjà démarrée par le parent)
+def run_child(scenario_name, workdir):
+    scenario = SCENARIOS[scenario_name]
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+
+    import main
+    from benchmark.fake_database import FakeDatabaseSQL
+    from benchmark.mock_api import MockAPIConfig, MockDataset
+    from metrics import metrics
+
+    api_config = MockAPIConfig(**scenario["api"])
+    dataset = MockDataset(api_config)
+    site_ids = {dataset.customer_reference(i): 100 + i for i in range(api_config.customers)}
+
+    if "sink" in scenario:
+        seed_sink_site_ids(scenario["sink"], site_ids)
+    else:
+        main.db = FakeDatabaseSQL(site_ids, scenario.get("db_write_latency", 0.0))
+    sys.argv = ["main.py"] + scenario["argv"]
+
+    started_at = time.perf_counter()
+    main.main()
+    duration = time.perf_counter() - started_at
+
+    # main.main journalise ses erreurs sans les relancer : un run qui n'a pas abouti met le scénario en échec
+    run_reports = sorted(glob.glob(os.path.join(main.metrics_config["REPORT_DIR"], "run_*.json")))
+    status = None
+    if run_reports:
+        with open(run_reports[-1], "r", encoding="utf-8") as f:
+            status = json.load(f).get("status")
+    if status != "success":
+        raise RuntimeError(f"run terminé avec le statut {status}, résultat non mesuré")
+
+    report = metrics.report()
+    return {
+        "durationSeconds": round(duration, 3),
+        "peakMemoryMB": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "dbRoundTrips": getattr(main.db, "round_trips", 0),
+        "rows": sink_row_counts(scenario["sink"]) if "sink" in scenario else main.db.row_counts(),
+        "status": status,
+        "stages": report["stages"],
+        "tables": report["tables"]
+    }
+
+
+# siteID des clients simulés écrits dans la table TM_MAD_SiteID du sink (base SQLite ou TM_MAD_SiteID.parquet)
+def seed_sink_site_ids(sink_name, site_ids):
+    from sinks import build_sink
+
+    sink = build_sink(sink_name)
+    if sink_name == "sqlite":
+        conn, connected = sink.get_db_connection()
+        conn.executemany("INSERT INTO TM_MAD_SiteID (ID_CDS, siteID) VALUES (?, ?)", list(site_ids.items()))
+        conn.commit()
+        conn.close()
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(sink.output_dir, exist_ok=True)
+        pq.write_table(pa.table({"ID_CDS": list(site_ids), "siteID": list(site_ids.values())}), sink.table_file("TM_MAD_SiteID"))
+
+
+# Nombre de lignes par table publiée, relu dans la base SQLite ou les fichiers Parquet
+def sink_row_counts(sink_name):
+    from sink_base import TABLES
+    from sinks import build_sink
+
+    sink = build_sink(sink_name)
+    if sink_name == "sqlite":
+        conn, connected = sink.get_db_connection()
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in TABLES}
+        conn.close()
+        return counts
+
+    import pyarrow.parquet as pq
+    return {table: pq.read_metadata(sink.table_file(table)).num_rows for table in TABLES}
+
+
+# Lancement d'un scénario : API simulée dans ce processus, main.main dans un sous-processus
+def run_scenario(scenario_name):
+    from benchmark.mock_api import MockAPIConfig, MockAPIServer
+
+    scenario = SCENARIOS[scenario_name]
+    api_config = MockAPIConfig(**scenario["api"])
+    server = MockAPIServer(api_config).start()
+
+    try:
+        with tempfile.TemporaryDirectory(prefix=f"drop3p_bench_{scenario_name}_") as workdir:
+            env = {**os.environ, **DEFAULT_ENV, **scenario.get("env", {}), "API_TOKEN_URL": f"{server.url}/token", "API_CALL_URL": server.url}
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmark.run_benchmark", "--child", scenario_name, "--workdir", workdir],
+                cwd=REPO_DIR, env=env, capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                raise RuntimeError(f"Scénario {scenario_name} en échec :\n{completed.stderr}")
+
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        server.stop()
+
+    calls = server.reset_calls()
+    api_calls = sum(calls.values())
+    orders = api_config.orders
+    return {
+        "scenario": scenario_name,
+        "orders": orders,
+        "ordersPerSecond": round(orders / result["durationSeconds"], 1) if result["durationSeconds"] else 0.0,
+        "apiCalls": api_calls,
+        "apiCallsPerOrder": round(api_calls / orders, 2) if orders else 0.0,
+        "apiCallsByRoute": calls,
+        **result
+    }
+
+
+# Comparaison avec un précédent résultat : régression si le débit baisse de plus de `tolerance`
+def compare(results, previous_file, tolerance):
+    with open(previous_file, "r", encoding="utf-8") as f:
+        previous = {result["scenario"]: result for result in json.load(f)}
+
+    regressions = []
+    for result in results:
+        before = previous.get(result["scenario"])
+        if not before or not before["ordersPerSecond"]:
+            continue
+        change = result["ordersPerSecond"] / before["ordersPerSecond"] - 1
+        print(f"{result['scenario']:<14} {before['ordersPerSecond']:>10.1f} -> {result['ordersPerSecond']:>10.1f} commandes/s ({change:+.1%})")
+        if change < -tolerance:
+            regressions.append(result["scenario"])
+
+    return regressions
+
+
+def print_results(results):
+    print(f"{'scénario':<14} {'commandes/s':>12} {'appels/cmd':>11} {'durée (s)':>10} {'mémoire (Mo)':>13} {'allers-retours BDD':>19}")
+    for result in results:
+        print(f"{result['scenario']:<14} {result['ordersPerSecond']:>12.1f} {result['apiCallsPerOrder']:>11.2f} {result['durationSeconds']:>10.2f} {result['peakMemoryMB']:>13.1f} {result['dbRoundTrips']:>19}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne du chargement DROP3P")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="Scénario à exécuter (tous par défaut)")
+    parser.add_argument("--output", help="Fichier JSON des résultats")
+    parser.add_argument("--compare", help="Fichier JSON d'un précédent benchmark à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Baisse de débit tolérée avant de signaler une régression (0.2 = 20 %%)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_child(args.child, args.workdir)
+        print(json.dumps(result))
+        return 0
+
+    results = [run_scenario(name) for name in (args.scenario or SCENARIOS)]
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"❌ Régression de débit : {', '.join(regressions)}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import json
+import os
+import threading
+import time
+
+from logger import Logger
+
+log = Logger.write_log
+
+
+class CategoryCache:
+
+    def __init__(self, cache_file, ttl):
+        self.cache_file = cache_file
+        self.ttl = ttl              # Durée de validité d'une catégorie (secondes)
+        self.entries = None         # {categoryReference: {"fetched_at": timestamp, "data": {...}}}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Chargement du cache depuis le disque (une seule fois par run)
+    def _load(self):
+        if self.entries is not None:
+            return
+
+        self.entries = {}
+        if not os.path.exists(self.cache_file):
+            return
+
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as cache_file:
+                self.entries = json.load(cache_file)
+            log(f"🗂️ Cache catégories chargé : {len(self.entries)} catégories")
+        except (OSError, ValueError) as e:
+            log(f"⚠️ Cache catégories illisible, il sera reconstruit : {e}")
+
+    # Renvoie la catégorie si elle est en cache et encore valide, sinon None
+    def get(self, category_reference):
+        with self.lock:
+            self._load()
+            entry = self.entries.get(category_reference)
+
+            if entry and time.time() - entry["fetched_at"] < self.ttl:
+                self.hits += 1
+                return entry["data"]
+
+            self.misses += 1
+            return None
+
+    def set(self, category_reference, data):
+        with self.lock:
+            self._load()
+            self.entries[category_reference] = {"fetched_at": time.time(), "data": data}
+
+    # Entrées du cache (transmises d'un processus worker au processus principal)
+    def export(self):
+        with self.lock:
+            self._load()
+            return dict(self.entries)
+
+    # Ajout d'entrées récupérées par un autre processus (la plus récente est conservée)
+    def merge(self, entries):
+        with self.lock:
+            self._load()
+            for category_reference, entry in entries.items():
+                current = self.entries.get(category_reference)
+                if current is None or entry["fetched_at"] > current["fetched_at"]:
+                    self.entries[category_reference] = entry
+
+    # Sauvegarde du cache sur disque (écriture atomique), les entrées expirées sont purgées
+    def save(self):
+        with self.lock:
+            if self.entries is None:
+                return
+
+            now = time.time()
+            entries = {ref: entry for ref, entry in self.entries.items() if now - entry["fetched_at"] < self.ttl}
+
+            try:
+                cache_dir = os.path.dirname(self.cache_file)
+                if cache_dir:
+                    os.makedirs(cache_dir, exist_ok=True)
+
+                tmp_file = f"{self.cache_file}.tmp"
+                with open(tmp_file, "w", encoding="utf-8") as cache_file:
+                    json.dump(entries, cache_file, ensure_ascii=False)
+                os.replace(tmp_file, self.cache_file)
+                log(f"🗂️ Cache catégories sauvegardé : {len(entries)} catégories ({self.hits} lectures en cache, {self.misses} appels API)")
+            except OSError as e:
+                log(f"⚠️ Erreur lors de la sauvegarde du cache catégories : {e}")
@@ -0,0 +1,59 @@
+from logger import Logger
+
+log = Logger.write_log
+
+# Longueur des références N1, N2 et N3
+CATEGORY_LEVELS = (2, 4, 6)
+
+
+# Arbre des catégories d'un run : références N3 distinctes des produits, libellés N1/N2/N3 résolus une seule fois par nœud
+class CategoryTree:
+
+    def __init__(self, references=()):
+        self.references = set()     # Références N3 (6 chiffres) vues pendant le run
+        self.nodes = {}             # {référence N1/N2/N3: données /categories/{ref} (None si introuvable)}
+        self.update(references)
+
+    # Ajout de la catégorie d'un produit ; renvoie la référence N3 retenue, None si elle est invalide
+    def add(self, category_reference):
+        reference = (category_reference or "").strip()[:CATEGORY_LEVELS[-1]]
+        if len(reference) < CATEGORY_LEVELS[-1]:
+            return None
+
+        self.references.add(reference)
+        return reference
+
+    def update(self, references):
+        for reference in references:
+            self.add(reference)
+
+    # Récupération des nœuds distincts de l'arbre (N1 et N2 partagés par plusieurs N3) : un appel ou une lecture du cache par nœud
+    def resolve(self, api, access_tk):
+        levels = sorted({reference[:length] for reference in self.references for length in CATEGORY_LEVELS} - set(self.nodes))
+
+        for level in levels:
+            self.nodes[level] = api.get_categories_info(access_tk, level)
+            if not self.nodes[level]:
+                log(f"⚠️ Aucune information trouvée pour la catégorie {level}")
+
+        log(f"🌳 Arbre des catégories : {len(self.references)} catégories N3, {len(levels)} nœuds résolus")
+
+    # Lignes TM_MAD_DROPFR_Categories : une par catégorie N3 distincte trouvée, avec les libellés N1/N2/N3
+    def build_rows(self):
+        for reference in sorted(self.references):
+            category = self.nodes.get(reference)
+            if not category:
+                continue
+
+            category_levels = [reference[:length] for length in CATEGORY_LEVELS]
+            labels = [(self.nodes.get(level) or {}).get("label") for level in category_levels]
+
+            yield {
+                "categoryId1": category_levels[0], # 2 chiffres (Niveau bas)
+                "label1": labels[0],
+                "categoryId2": category_levels[1], # 4 chiffres (Niveau intermédiaire)
+                "label2": labels[1],
+                "categoryId3": category_levels[2], # 6 chiffres (Niveau haut)
+                "label3": labels[2],
+                "isActive": category.get("isActive", False)
+            }
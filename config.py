@@ -14,6 +14,43 @@ class Config:
         "PASSWORD": os.getenv("DB_PASSWORD")
     }
 
+    # Paramètres de chargement des données dans le Data Warehouse
+    DB_LOAD_CONFIG = {
+        "ORDERS_LOAD_MODE": os.getenv("DB_ORDERS_LOAD_MODE", "bulk"),  # "bulk" (table temporaire + requête ensembliste) ou "row" (ligne à ligne)
+        "BULK_BATCH_SIZE": int(os.getenv("DB_BULK_BATCH_SIZE", 1000)),  # Lignes par requête d'insertion (plafonné par la limite de paramètres SQL Server)
+        "SITE_ID_REFRESH_INTERVAL": int(os.getenv("DB_SITE_ID_REFRESH_INTERVAL", 0)),  # Rechargement de TM_MAD_SiteID sur référence inconnue (s, 0 = désactivé)
+        "RELOAD_MODE": os.getenv("DB_RELOAD_MODE", "swap"),  # Rechargement complet : "swap" (tables fantômes échangées en fin de run) ou "truncate"
+        "PRODUCT_BATCH_SIZE": int(os.getenv("DB_PRODUCT_BATCH_SIZE", 50)),  # Produits (avec catégories et attributs) écrits par transaction
+        "COMMIT_INTERVAL": float(os.getenv("DB_COMMIT_INTERVAL", 10)),  # Délai maximal (s) avant l'écriture d'un lot incomplet (0 = désactivé)
+        "POOL_SIZE": int(os.getenv("DB_POOL_SIZE", 6)),  # Connexions ouvertes au maximum (une par writer de table + la connexion principale)
+        "POOL_HEALTH_CHECK_INTERVAL": float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", 30)),  # Inactivité (s) au-delà de laquelle une connexion est vérifiée (SELECT 1)
+        "TABLE_WRITERS": os.getenv("DB_TABLE_WRITERS", "1") == "1",  # Un thread d'écriture et une connexion par table (0 = écritures sur la connexion principale)
+        "WRITER_QUEUE_SIZE": int(os.getenv("DB_WRITER_QUEUE_SIZE", 10))  # Écritures en attente par writer avant de bloquer le producteur
+    }
+
+    # Destination du chargement (--sink) : Data Warehouse SQL Server, base SQLite locale ou fichiers Parquet
+    SINK_CONFIG = {
+        "TYPE": os.getenv("SINK", "mssql"),  # "mssql", "sqlite" ou "parquet"
+        "SQLITE_FILE": os.getenv("SINK_SQLITE_FILE", os.path.join("Output", "drop3p.sqlite")),
+        "SQLITE_BUSY_TIMEOUT": float(os.getenv("SINK_SQLITE_BUSY_TIMEOUT", 60)),  # Attente maximale (s) d'un verrou d'écriture tenu par une autre connexion
+        "PARQUET_DIR": os.getenv("SINK_PARQUET_DIR", os.path.join("Output", "parquet"))  # Un fichier <table>.parquet par table, TM_MAD_SiteID.parquet lu s'il existe
+    }
+
+    # Paramètres des logs (Logs/log.txt)
+    LOG_CONFIG = {
+        "LEVEL": os.getenv("LOG_LEVEL", "INFO"),  # DEBUG pour tracer chaque ligne insérée
+        "ROTATION": os.getenv("LOG_ROTATION", "size"),  # "size" (taille) ou "time" (date)
+        "MAX_BYTES": int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+        "ROTATE_WHEN": os.getenv("LOG_ROTATE_WHEN", "midnight"),
+        "BACKUP_COUNT": int(os.getenv("LOG_BACKUP_COUNT", 10))
+    }
+
+    # Rapport de performance par run (JSON) et export Prometheus optionnel
+    METRICS_CONFIG = {
+        "REPORT_DIR": os.getenv("METRICS_REPORT_DIR", "Reports"),
+        "PROMETHEUS_FILE": os.getenv("METRICS_PROMETHEUS_FILE")  # Ex. /var/lib/node_exporter/drop3p.prom (désactivé si absent)
+    }
+
     # Paramètres de connexion à l'API CV Order REST V2 (PRODUCTION)
     API_CONFIG = {
         "TOKEN_URL": os.getenv("API_TOKEN_URL"),
@@ -23,6 +60,81 @@ class Config:
         "GRANT_TYPE": os.getenv("API_GRANT_TYPE")
     }
 
+    # Paramètres de performance des appels API
+    API_PERF_CONFIG = {
+        "MAX_WORKERS": int(os.getenv("API_MAX_WORKERS", 8)),  # Nombre d'appels /orders/{id} simultanés
+        "ORDER_DETAIL_POLICY": os.getenv("API_ORDER_DETAIL_POLICY", "missing"),  # Appels /orders/{id} : "always", "never" ou "missing" (champs absents de la liste)
+        "ORDERS_PAGE_WORKERS": int(os.getenv("API_ORDERS_PAGE_WORKERS", 4)),  # Pages /orders demandées par anticipation (1 = une page à la fois)
+        "ORDERS_PAGE_SIZE": int(os.getenv("API_ORDERS_PAGE_SIZE", 100)),  # Commandes par page /orders
+        "POOL_SIZE": int(os.getenv("API_POOL_SIZE", 10)),  # Connexions HTTP keep-alive conservées par hôte
+        "THROTTLE_MAX_RETRIES": int(os.getenv("API_THROTTLE_MAX_RETRIES", 5)),  # Nouvelles tentatives après un 429/503
+        "THROTTLE_DEFAULT_DELAY": float(os.getenv("API_THROTTLE_DEFAULT_DELAY", 5))  # Pause (s) si Retry-After est absent
+    }
+
+    # Quotas d'appels par route (requêtes par seconde et taille de rafale)
+    RATE_LIMIT_CONFIG = {
+        "ROUTES": {
+            "/orders": float(os.getenv("RATE_LIMIT_ORDERS", 5)),
+            "/products": float(os.getenv("RATE_LIMIT_PRODUCTS", 5)),
+            "/categories": float(os.getenv("RATE_LIMIT_CATEGORIES", 5))
+        },
+        "DEFAULT": float(os.getenv("RATE_LIMIT_DEFAULT", 1)),
+        "BURST": float(os.getenv("RATE_LIMIT_BURST", 0)) or None  # Par défaut : une seconde de quota
+    }
+
+    # Nouvelles tentatives sur panne passagère (5xx, délai dépassé, connexion coupée) et disjoncteur par route
+    RETRY_CONFIG = {
+        "ROUTES": {
+            "/orders": int(os.getenv("RETRY_MAX_RETRIES_ORDERS", 6)),  # Une page /orders perdue arrête le run : davantage de tentatives
+            "/products": int(os.getenv("RETRY_MAX_RETRIES_PRODUCTS", 3)),
+            "/categories": int(os.getenv("RETRY_MAX_RETRIES_CATEGORIES", 3))
+        },
+        "DEFAULT": int(os.getenv("RETRY_MAX_RETRIES_DEFAULT", 3)),
+        "BASE_DELAY": float(os.getenv("RETRY_BASE_DELAY", 1)),  # Attente avant la première nouvelle tentative (s), doublée à chaque échec
+        "MAX_DELAY": float(os.getenv("RETRY_MAX_DELAY", 30)),
+        "TIMEOUT": float(os.getenv("API_REQUEST_TIMEOUT", 60)),  # Délai maximal d'une requête (s)
+        "CIRCUIT_FAILURE_THRESHOLD": int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 10)),  # Pannes consécutives avant la suspension d'une route
+        "CIRCUIT_RESET_TIMEOUT": float(os.getenv("CIRCUIT_RESET_TIMEOUT", 30)),  # Première suspension (s), doublée si la reprise échoue
+        "CIRCUIT_MAX_RESET_TIMEOUT": float(os.getenv("CIRCUIT_MAX_RESET_TIMEOUT", 300))
+    }
+
+    # Cache local des catégories (/categories/{categoryReference}) conservé entre les runs
+    CACHE_CONFIG = {
+        "CATEGORY_CACHE_FILE": os.getenv("CATEGORY_CACHE_FILE", os.path.join("Cache", "categories.json")),
+        "CATEGORY_CACHE_TTL": int(os.getenv("CATEGORY_CACHE_TTL", 86400))  # 1 jour
+    }
+
+    # Token API : relu depuis un fichier cache (droits 0600) tant qu'il est valide, renouvelé avant son expiration
+    TOKEN_CONFIG = {
+        "CACHE_FILE": os.getenv("TOKEN_CACHE_FILE", os.path.join("State", "token.json")) or None,  # TOKEN_CACHE_FILE vide : pas de cache
+        "REFRESH_MARGIN": int(os.getenv("TOKEN_REFRESH_MARGIN", 60))  # Renouvellement (s) avant l'expiration annoncée (expires_in)
+    }
+
+    # Archive des réponses API brutes (gzip JSONL, une archive par run, rejouable avec --replay)
+    ARCHIVE_CONFIG = {
+        "ENABLED": os.getenv("ARCHIVE_ENABLED", "1") == "1",
+        "DIR": os.getenv("ARCHIVE_DIR", "Archive")
+    }
+
+    # Traitement en flux (--pipeline)
+    PIPELINE_CONFIG = {
+        "QUEUE_SIZE": int(os.getenv("PIPELINE_QUEUE_SIZE", 20))  # Éléments en attente maximum entre deux étages
+    }
+
+    # Paramètres de synchronisation (rechargement complet ou incrémental)
+    SYNC_CONFIG = {
+        "CREATED_AT_MIN": os.getenv("SYNC_CREATED_AT_MIN", "2025-01-01T01:00:00.00"),  # Début de l'historique en rechargement complet
+        "STATE_FILE": os.getenv("SYNC_STATE_FILE", os.path.join("State", "sync_state.json")),
+        "OVERLAP_MINUTES": int(os.getenv("SYNC_OVERLAP_MINUTES", 10)),  # Recouvrement entre deux runs incrémentaux
+        "CHECKPOINT_FILE": os.getenv("SYNC_CHECKPOINT_FILE", os.path.join("State", "checkpoint.json")),
+        "CHECKPOINT_EVERY_PAGES": int(os.getenv("SYNC_CHECKPOINT_EVERY_PAGES", 1)),
+        "CHECKPOINT_EVERY_PRODUCTS": int(os.getenv("SYNC_CHECKPOINT_EVERY_PRODUCTS", 25)),
+        "SHARD_WORKERS": int(os.getenv("SYNC_SHARD_WORKERS", 0)),  # Processus du rechargement complet réparti (0 ou 1 = un seul processus)
+        "SHARD_WINDOW_DAYS": float(os.getenv("SYNC_SHARD_WINDOW_DAYS", 7)),  # Largeur des fenêtres createdAtMin/createdAtMax (jours)
+        "PRODUCT_HASH_FILE": os.getenv("SYNC_PRODUCT_HASH_FILE", os.path.join("State", "product_hashes.json")),  # Empreinte du dernier contenu écrit de chaque produit
+        "SKIP_UNCHANGED_PRODUCTS": os.getenv("SYNC_SKIP_UNCHANGED_PRODUCTS", "1") == "1"  # Synchro incrémentale : produits inchangés non réécrits
+    }
+
     # Paramètres de connexion à l'API CV Order REST V2 (PREPRODUCTION)
     # API_CONFIG = {
     #     "TOKEN_URL": os.getenv("API_TOKEN_URL_PP"),
@@ -1,25 +1,60 @@
-import pymssql
+import time
 
 from typing import Optional, Tuple
 from config import Config
 from logger import Logger
-from api_requests import RequestsAPI
-from datetime import datetime
+from metrics import metrics
+from sink_base import SQLOutputSink, ORDERS_COLUMNS, TABLES, SHADOW_SUFFIX
+
+# Pilote SQL Server importé seulement s'il est installé : les sinks locaux (--sink sqlite / parquet) s'en passent
+try:
+    import pymssql
+except ImportError:
+    pymssql = None
 
 # Charger les variables d'environnement depuis un fichier .env
 db_config = Config.DB_CONFIG
+load_config = Config.DB_LOAD_CONFIG
 log = Logger.write_log
-api = RequestsAPI
-
-class DatabaseSQL:
 
-    def __init__(self):
-        pass
+# Table temporaire de l'insertion en masse des commandes
+ORDERS_STAGING_TABLE = "#TM_MAD_DROPFR_ventes_staging"
+
+# Structure d'une table recopiée sur sa table fantôme et comparée avant l'échange : index, valeurs par défaut et droits
+QUERY_TABLE_INDEXES = """
+    SELECT i.index_id, i.name, i.type_desc, i.is_primary_key, i.is_unique, i.is_unique_constraint, i.filter_definition,
+           c.name, ic.is_descending_key, ic.is_included_column
+    FROM sys.indexes i
+    JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+    JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+    WHERE i.object_id = OBJECT_ID(%s) AND i.type > 0
+    ORDER BY i.index_id, ic.key_ordinal, ic.index_column_id
+"""
+QUERY_TABLE_DEFAULTS = """
+    SELECT d.name, c.name, d.definition
+    FROM sys.default_constraints d
+    JOIN sys.columns c ON c.object_id = d.parent_object_id AND c.column_id = d.parent_column_id
+    WHERE d.parent_object_id = OBJECT_ID(%s)
+"""
+QUERY_TABLE_PERMISSIONS = """
+    SELECT pr.name, p.permission_name, p.state_desc, COL_NAME(p.major_id, p.minor_id)
+    FROM sys.database_permissions p
+    JOIN sys.database_principals pr ON pr.principal_id = p.grantee_principal_id
+    WHERE p.class = 1 AND p.major_id = OBJECT_ID(%s)
+"""
+
+
+# Chargement dans le Data Warehouse SQL Server (--sink mssql, pymssql)
+class DatabaseSQL(SQLOutputSink):
 
     # Connexion à la BDD
-    def get_db_connection(self) -> Tuple[Optional[pymssql.Connection], bool]:
+    def get_db_connection(self) -> Tuple[Optional["pymssql.Connection"], bool]:
         conn = None
         connected = False
+        if pymssql is None:
+            log("⛔️ pymssql est requis pour --sink mssql (pip install pymssql)")
+            return conn, connected
+
         try:
             # Récupérer les valeurs du dictionnaire sans paramètres interdits et connexion à la base de données
             conn = pymssql.connect(
@@ -47,457 +82,342 @@ class DatabaseSQL:
 
         finally:
             return conn, connected
-    
-    ### SECTION ORDERS ###
-    # Suppression des données de la table TM_MAD_DROPFR_ventes
-    def delete_orders_data(self, conn):
+
+    # Vérification d'une connexion avant sa réutilisation par le pool (SELECT 1)
+    def check_connection(self, conn):
         try:
             cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
 
-            # Vérifier si la table contient des données
-            query_count_orders = "SELECT COUNT(*) FROM TM_MAD_DROPFR_ventes"
-            cursor.execute(query_count_orders)
-            order_count = cursor.fetchone()[0]
+        except Exception as e:
+            log(f"⚠️ Connexion au Data Warehouse invalide : {e}")
+            return False
 
-            deleted_rows = 0
+    # Vidage d'une table par TRUNCATE (journalisation minimale) ; renvoie le nombre de lignes supprimées, None en cas d'erreur
+    def truncate_table(self, conn, table):
+        try:
+            cursor = conn.cursor()
 
-            if order_count> 0:
-                query_delete_orders = "DELETE FROM TM_MAD_DROPFR_ventes"
-                cursor.execute(query_delete_orders)
-                deleted_rows = cursor.rowcount
-                conn.commit() # Valider la suppression
-                log(f"✅ {deleted_rows} commandes supprimées de TM_MAD_DROPFR_ventes")
-            else:
-                log("ℹ️ Aucune commande à supprimer dans TM_MAD_DROPFR_ventes")
+            # Nombre de lignes lu dans les métadonnées, sans parcourir la table
+            query_row_count = "SELECT COALESCE(SUM(rows), 0) FROM sys.partitions WHERE object_id = OBJECT_ID(%s) AND index_id IN (0, 1)"
+            cursor.execute(query_row_count, (table,))
+            row_count = cursor.fetchone()[0]
 
-            return deleted_rows
+            if row_count > 0:
+                cursor.execute(f"TRUNCATE TABLE {table}")
+                conn.commit()
+
+            return row_count
 
         except Exception as e:
-            log(f"❌ Erreur lors de la suppression des commandes : {e}")
+            log(f"❌ Erreur lors du vidage de {table} : {e}")
             conn.rollback()
-            return 0
+            return None
 
         finally:
             cursor.close()
 
-    # Récupération du siteId pour l'insérer dans la table TM_MAD_DROPFR_ventes
-    def get_site_id(self, conn, customer_reference):
-        try:
-            cursor = conn.cursor()
-            query_site_id = "SELECT siteID FROM TM_MAD_SiteID (nolock) WHERE ID_CDS = %s"
-            cursor.execute(query_site_id, (customer_reference),)
-            row = cursor.fetchone()
-            site_id = row[0] if row else 0
-            if site_id:
-                log(f"📍 SiteID récupéré pour cette commande : {site_id}")
+    # Index (clé primaire et contraintes UNIQUE comprises), valeurs par défaut et droits d'une table
+    def get_table_structure(self, cursor, table):
+        indexes = {}
+        cursor.execute(QUERY_TABLE_INDEXES, (table,))
+        for index_id, name, type_desc, is_primary_key, is_unique, is_unique_constraint, filter_definition, column, is_descending, is_included in cursor.fetchall():
+            index = indexes.setdefault(index_id, {
+                "name": name, "type": type_desc, "primary_key": bool(is_primary_key), "unique": bool(is_unique),
+                "unique_constraint": bool(is_unique_constraint), "filter": filter_definition, "keys": [], "included": []
+            })
+            if is_included:
+                index["included"].append(f"[{column}]")
             else:
-                log(f"⚠️ Aucun siteID trouvé pour cette commande")
-            return site_id
-        
-        except Exception as e:
-            log(f"❌ Erreur lors de l'insertion des commandes : {e}")
-            conn.rollback()
-            return 0
+                index["keys"].append(f"[{column}] {'DESC' if is_descending else 'ASC'}")
+
+        cursor.execute(QUERY_TABLE_DEFAULTS, (table,))
+        defaults = cursor.fetchall()
+        cursor.execute(QUERY_TABLE_PERMISSIONS, (table,))
+        permissions = cursor.fetchall()
+        return list(indexes.values()), defaults, permissions
+
+    # Empreinte comparable d'une structure : les noms d'index et de contraintes diffèrent d'une table à sa table fantôme
+    @staticmethod
+    def structure_signature(structure):
+        indexes, defaults, permissions = structure
+        return (
+            sorted((index["type"], index["primary_key"], index["unique"], index["unique_constraint"], tuple(index["keys"]), tuple(sorted(index["included"])), index["filter"] or "") for index in indexes),
+            sorted((column, definition) for name, column, definition in defaults),
+            sorted((grantee, permission, state, column or "") for grantee, permission, state, column in permissions)
+        )
+
+    def same_structure(self, cursor, table, other_table):
+        return self.structure_signature(self.get_table_structure(cursor, table)) == self.structure_signature(self.get_table_structure(cursor, other_table))
+
+    # Nom d'une contrainte de la table fantôme (les noms de contraintes sont uniques dans le schéma), inversé à chaque échange
+    @staticmethod
+    def shadow_constraint_name(name):
+        return name[:-len(SHADOW_SUFFIX)] if name.endswith(SHADOW_SUFFIX) else f"{name}{SHADOW_SUFFIX}"
+
+    # Recopie sur la table fantôme (créée par SELECT INTO, sans index ni contraintes) des index, valeurs par défaut et droits
+    def copy_table_structure(self, cursor, table, shadow_table):
+        indexes, defaults, permissions = self.get_table_structure(cursor, table)
+
+        # Index cluster en premier : créé après les autres, il les reconstruirait
+        for index in sorted(indexes, key=lambda index: not index["type"].startswith("CLUSTERED")):
+            keys = ", ".join(index["keys"])
+            if index["primary_key"] or index["unique_constraint"]:
+                constraint = "PRIMARY KEY" if index["primary_key"] else "UNIQUE"
+                cursor.execute(f"ALTER TABLE {shadow_table} ADD CONSTRAINT [{self.shadow_constraint_name(index['name'])}] {constraint} {index['type']} ({keys})")
+            elif index["type"] == "CLUSTERED COLUMNSTORE":
+                cursor.execute(f"CREATE CLUSTERED COLUMNSTORE INDEX [{index['name']}] ON {shadow_table}")
+            elif index["type"] == "NONCLUSTERED COLUMNSTORE":
+                cursor.execute(f"CREATE NONCLUSTERED COLUMNSTORE INDEX [{index['name']}] ON {shadow_table} ({', '.join(index['included'])})")
+            elif index["type"] in ("CLUSTERED", "NONCLUSTERED"):
+                statement = f"CREATE {'UNIQUE ' if index['unique'] else ''}{index['type']} INDEX [{index['name']}] ON {shadow_table} ({keys})"
+                if index["included"]:
+                    statement += f" INCLUDE ({', '.join(index['included'])})"
+                if index["filter"]:
+                    statement += f" WHERE {index['filter']}"
+                cursor.execute(statement)
+            else:
+                raise RuntimeError(f"index {index['name']} de {table} de type {index['type']} non recopiable sur {shadow_table}")
 
-        finally:
-            cursor.close()
+        for name, column, definition in defaults:
+            cursor.execute(f"ALTER TABLE {shadow_table} ADD CONSTRAINT [{self.shadow_constraint_name(name)}] DEFAULT {definition} FOR [{column}]")
 
-    # Insérer les informations commandes dans la table TM_MAD_DROPFR_ventes
-    def insert_orders_data(self, conn, orders, site_id):
+        for grantee, permission, state, column in permissions:
+            target = f"{shadow_table} ([{column}])" if column else shadow_table
+            grantee = grantee.replace("]", "]]")
+            if state == "GRANT_WITH_GRANT_OPTION":
+                cursor.execute(f"GRANT {permission} ON {target} TO [{grantee}] WITH GRANT OPTION")
+            else:
+                cursor.execute(f"{state} {permission} ON {target} TO [{grantee}]")
+
+    # Rechargement complet par tables fantômes : les insertions visent <table>_shadow, vidée au préalable.
+    # La table fantôme est créée par SELECT INTO puis reçoit les index, valeurs par défaut et droits de la table publiée ;
+    # une table fantôme existante dont la structure diffère est recréée (elle allait être vidée), ou refusée en reprise
+    # (truncate=False, ses lignes déjà chargées sont conservées)
+    def prepare_shadow_tables(self, conn, truncate=True):
         try:
             cursor = conn.cursor()
 
-            query_check_exists = """
-                SELECT 1 FROM TM_MAD_DROPFR_ventes
-                WHERE orderId = %(orderId)s
-                AND productId = %(productId)s
-                AND siteId = %(siteId)s
-            """
-            
-            query_insert_orders = """
-                INSERT INTO TM_MAD_DROPFR_ventes (
-                    orderId, reference, sellerid, customerReference, siteId, companyName, purchasedAt, updatedAt, createdAt, shippedAtMax, Status,
-                    offerid, productId, unitSalesPrice, shippingCost, comm_amountWithoutVat, comm_rate, promisedAtMin, promisedAtMax,
-                    parcelNumber, carrierName, trackingUrl
-                )
-                VALUES (
-                    %(orderId)s, %(reference)s, %(sellerid)s, %(customerReference)s, %(siteId)s, %(companyName)s, %(purchasedAt)s, %(updatedAt)s, %(createdAt)s, %(shippedAtMax)s, %(status)s,
-                    %(offerid)s, %(productId)s, %(unitSalesPrice)s, %(shippingCost)s, %(comm_amountWithoutVat)s, %(comm_rate)s, %(promisedAtMin)s, %(promisedAtMax)s,
-                    %(parcelNumber)s, %(carrierName)s, %(trackingUrl)s
-                )
-            """
+            for table in TABLES:
+                shadow_table = f"{table}{SHADOW_SUFFIX}"
+                cursor.execute("SELECT OBJECT_ID(%s, 'U')", (shadow_table,))
+                exists = cursor.fetchone()[0] is not None
 
-            insert_count = 0
-
-            for order in orders:
-                order_id = order.get("orderId", None)
-                if not order_id:
-                    log("⚠️ orderId manquant, insertion ignorée")
-                    continue                
-
-                common_data = {
-                    "orderId": order_id,
-                    "reference": order.get("reference", None),
-                    "sellerid": order.get("seller", {}).get("id", None),
-                    "customerReference": order.get("customer", {}).get("reference", None),
-                    "siteId": site_id,
-                    "companyName": order.get("billingAddress", {}).get("companyName", None),
-                    "purchasedAt": order.get("purchasedAt", None),
-                    "updatedAt": order.get("updatedAt", None),
-                    "createdAt": order.get("createdAt", None),
-                    "shippedAtMax": order.get("shippedAtMax", None),
-                    "status": order.get("status", None)
-                }
-
-                lines = order.get("lines", [])
-                if not lines:
-                    lines = [{}]
-
-                for line in lines:
-                    line_data = {
-                        "offerid": line.get("offer", {}).get("id", None),
-                        "productId": line.get("offer", {}).get("productId", None),
-                        "unitSalesPrice": line.get("offerPrice", {}).get("unitSalesPrice", 0.0),
-                        "shippingCost": line.get("offerPrice", {}).get("shippingCost", 0.0),
-                        "comm_amountWithoutVat": line.get("offerPrice", {}).get("commission", {}).get("amountWithoutVat", 0.0),
-                        "comm_rate": line.get("offerPrice", {}).get("commission", {}).get("rate", 0.0),
-                        "promisedAtMin": line.get("delivery", {}).get("promisedAtMin", None),
-                        "promisedAtMax": line.get("delivery", {}).get("promisedAtMax", None),
-                    }
-
-                    parcels = line.get("parcels", [])
-                    if not parcels:
-                        parcels = [{}]
-
-                    # Savoir s'il y a au moins une ou deux informations parcels par commande
-                    if len(parcels) > 1:
-                        parcel_number = ";".join(p.get("parcelNumber", None) for p in parcels)
-                        carrier_name = ";".join(p.get("carrierName", None) for p in parcels)
-                        tracking_url = ";".join(p.get("trackingUrl", None) for p in parcels)
-                        
-                        parcel_data = {
-                            "parcelNumber": parcel_number,
-                            "carrierName": carrier_name,
-                            "trackingUrl": tracking_url
-                        }
-
-                        full_data = {**common_data, **line_data, **parcel_data}
-
-                        # Vérification doublon
-                        cursor.execute(query_check_exists, full_data)
-                        if cursor.fetchone():
-                            log(f"⚠️ Doublon ignoré pour orderId={order_id}, productId={full_data['productId']}, status={full_data['status']}, siteId={full_data['siteId']}")
-                            continue
-
-                        log(f"📝 Insertion de la commande {order_id} dans TM_MAD_DROPFR_ventes")
-                        cursor.execute(query_insert_orders, full_data)
-                        insert_count += 1
-                    else:
-                        for parcel in parcels:
-                            parcel_data = {
-                                "parcelNumber": parcel.get("parcelNumber", None),
-                                "carrierName": parcel.get("carrierName", None),
-                                "trackingUrl": parcel.get("trackingUrl", None),
-                            }
-
-                            full_data = {**common_data, **line_data, **parcel_data}
-
-                            cursor.execute(query_check_exists, full_data)
-                            if cursor.fetchone():
-                                log(f"⚠️ Doublon ignoré pour orderId={order_id}, productId={full_data['productId']}, status={full_data['status']}, siteId={full_data['siteId']}")
-                                continue
-
-                            log(f"📝 Insertion de la commande {order_id} dans TM_MAD_DROPFR_ventes")                    
-                            cursor.execute(query_insert_orders, full_data)
-                            insert_count += 1                
-
-            conn.commit()
+                if exists and truncate and not self.same_structure(cursor, table, shadow_table):
+                    cursor.execute(f"DROP TABLE {shadow_table}")
+                    log(f"♻️ Table fantôme {shadow_table} recréée : index ou droits différents de {table}")
+                    exists = False
 
-            return insert_count
+                if not exists:
+                    cursor.execute(f"SELECT TOP 0 * INTO {shadow_table} FROM {table}")
+                    self.copy_table_structure(cursor, table, shadow_table)
+                    log(f"🆕 Table fantôme {shadow_table} créée avec les index et droits de {table}")
+                elif truncate:
+                    cursor.execute(f"TRUNCATE TABLE {shadow_table}")
 
-        except Exception as e:
-            log(f"❌ Erreur lors de l'insertion des commandes : {e}")
-            conn.rollback()
-            return 0
-
-        finally:
-            cursor.close()
-
-    ### SECTION PRODUCTS ###
-    # Suppression des données de la table TM_MAD_DROPFR_Products
-    def delete_products_data(self, conn):
-        try:
-            cursor = conn.cursor()
+                if not self.same_structure(cursor, table, shadow_table):
+                    raise RuntimeError(f"index ou droits de {shadow_table} différents de ceux de {table}")
 
-            # Vérifier si la table contient des données
-            query_count_products = "SELECT COUNT(*) FROM TM_MAD_DROPFR_Products"
-            cursor.execute(query_count_products)
-            product_count = cursor.fetchone()[0]
+                self.table_names[table] = shadow_table
 
-            deleted_rows = 0
-
-            if product_count > 0:
-                query_delete_products = "DELETE FROM TM_MAD_DROPFR_Products"
-                cursor.execute(query_delete_products)
-                deleted_rows = cursor.rowcount
-                conn.commit()
-                log(f"✅ {deleted_rows} produits supprimés de TM_MAD_DROPFR_Products")
-            else :
-                log("ℹ️ Aucun produit à supprimer dans TM_MAD_DROPFR_Products")
-            
-            return deleted_rows
+            conn.commit()
+            log("🪞 Chargement dans les tables fantômes, échange avec les tables publiées en fin de run\n")
+            return True
 
         except Exception as e:
-            log(f"❌ Erreur lors de la suppression des commandes : {e}")
+            log(f"❌ Erreur lors de la préparation des tables fantômes : {e}")
             conn.rollback()
-            return 0
+            self.table_names = {table: table for table in TABLES}
+            return False
 
         finally:
             cursor.close()
-    
-    # Insertion des informations produits dans la table TM_MAD_DROPFR_Products
-    def insert_products_data(self, conn, products):
+
+    # Échange atomique (une transaction, sp_rename) des tables fantômes chargées avec les tables publiées ;
+    # les anciennes données deviennent la table fantôme du prochain run (retour arrière possible d'ici là).
+    # Refusé si une table fantôme manque ou n'a pas les index et droits de la table publiée
+    def swap_shadow_tables(self, conn):
         try:
             cursor = conn.cursor()
 
-            query_insert_products = """
-                INSERT INTO TM_MAD_DROPFR_Products (
-                    ProductId, GENCOD, title, description, brand,
-                    image1, image2, image3, image4, image5, image6,
-                    dateCreation, dateUpdate, category
-                )
-                VALUES (
-                    %(ProductId)s, %(GENCOD)s, %(title)s, %(description)s, %(brand)s,
-                    %(image1)s, %(image2)s, %(image3)s, %(image4)s, %(image5)s, %(image6)s,
-                    %(dateCreation)s, %(dateUpdate)s, %(category)s
-                )
-            """
-
-            insert_count = 0
-
-            for product in products:
-                product_id = product.get("productId", None)
-                if product_id == None:
-                    log("⚠️ ProductId manquant, insertion ignorée")
-                    continue
-                
-                common_data = {
-                    "ProductId": product_id,
-                    "GENCOD": product.get("gtin", None),
-                    "title": product.get("title", None),
-                    "description": product.get("description", None),
-                    "brand": product.get("brand", {}).get("label", None),
-                    "dateCreation": product.get("createdAt", None),
-                    "dateUpdate": product.get("updatedAt", None),
-                    "category": product.get("category", None)
-                }
-
-                 # Récupération des images (max 6, compléter avec None si besoin)
-                images = [img.get("url", None) for img in product.get("images", [])][:6]
-                images += [None] * (6 - len(images))  # Remplissage avec None si moins de 6 images
-
-                full_data = {**common_data, **dict(zip(["image1", "image2", "image3", "image4", "image5", "image6"], images))}
-
-                log(f"📝 Insertion du produit dans TM_MAD_DROPFR_Products")
-
-                cursor.execute(query_insert_products, full_data)
-                insert_count += 1                
+            for table in TABLES:
+                shadow_table = f"{table}{SHADOW_SUFFIX}"
+                cursor.execute("SELECT OBJECT_ID(%s, 'U')", (shadow_table,))
+                if cursor.fetchone()[0] is None:
+                    raise RuntimeError(f"table fantôme {shadow_table} absente")
+                if not self.same_structure(cursor, table, shadow_table):
+                    raise RuntimeError(f"index ou droits de {shadow_table} différents de ceux de {table}")
+
+            for table in TABLES:
+                shadow_table = f"{table}{SHADOW_SUFFIX}"
+                swap_table = f"{table}_swap"
+                cursor.execute("EXEC sp_rename %s, %s", (table, swap_table))
+                cursor.execute("EXEC sp_rename %s, %s", (shadow_table, table))
+                cursor.execute("EXEC sp_rename %s, %s", (swap_table, shadow_table))
 
             conn.commit()
-
-            return insert_count
+            self.table_names = {table: table for table in TABLES}
+            log("🔀 Tables fantômes publiées : TM_MAD_DROPFR_ventes / Products / Categories / Attributes")
+            return True
 
         except Exception as e:
-            log(f"❌ Erreur lors de l'insertion des produits : {e}")
+            log(f"❌ Erreur lors de l'échange des tables fantômes, les tables publiées sont inchangées : {e}")
             conn.rollback()
-            return 0
+            return False
 
         finally:
             cursor.close()
 
-    ### SECTION CATEGORIES ###
-    # Suppression des données de la table TM_MAD_DROPFR_Categories
-    def delete_categories_data(self, conn):
+    ### SECTION ORDERS ###
+    # Chargement en mémoire de la table TM_MAD_SiteID (une seule requête, rechargeable avec refresh=True)
+    def load_site_ids(self, conn, refresh=False):
+        if self.site_ids is not None and not refresh:
+            return self.site_ids
+
         try:
             cursor = conn.cursor()
-
-            # Vérifier si la table contient des données
-            query_count_categories = "SELECT COUNT(*) FROM TM_MAD_DROPFR_Categories"
-            cursor.execute(query_count_categories)
-            category_count = cursor.fetchone()[0]
-
-            deleted_rows = 0
-
-            if category_count > 0:
-                query_delete_categories = "DELETE FROM TM_MAD_DROPFR_Categories"
-                cursor.execute(query_delete_categories)
-                deleted_rows = cursor.rowcount
-                conn.commit()
-                log(f"✅ {deleted_rows} catégories supprimées de TM_MAD_DROPFR_Categories")
-            else:
-                log("ℹ️ Aucune catégorie à supprimer dans TM_MAD_DROPFR_Categories")
-
-            return deleted_rows
+            cursor.execute("SELECT ID_CDS, siteID FROM TM_MAD_SiteID (nolock)")
+            self.site_ids = {str(id_cds).strip(): site_id for id_cds, site_id in cursor.fetchall() if id_cds is not None}
+            self.site_ids_loaded_at = time.monotonic()
+            log(f"📍 {len(self.site_ids)} siteID chargés depuis TM_MAD_SiteID")
 
         except Exception as e:
-            log(f"❌ Erreur lors de la suppression des catégories : {e}")
+            log(f"❌ Erreur lors du chargement des siteID : {e}")
             conn.rollback()
-            return 0
+            if self.site_ids is None:
+                self.site_ids = {}
 
         finally:
             cursor.close()
 
-    # Insertion des informations catégories dans la table TM_MAD_DROPFR_Categories
-    def insert_categories_data(self, conn, categories, access_tk):
+        return self.site_ids
+
+    # Insérer les informations commandes dans la table TM_MAD_DROPFR_ventes (ligne à ligne, avec contrôle des doublons)
+    # replace=True (upsert) : les lignes existantes des commandes sont supprimées dans la même transaction que l'insertion
+    # Renvoie le nombre de lignes insérées, None en cas d'erreur (rien n'est supprimé ni inséré)
+    @metrics.track_rows("TM_MAD_DROPFR_ventes")
+    def insert_orders_data(self, conn, orders, replace=False):
         try:
             cursor = conn.cursor()
-
-            query_insert_categories = """
-                INSERT INTO TM_MAD_DROPFR_Categories (
-                    categoryId1, label1, categoryId2, label2, categoryId3, label3, isActive
-                )
-                VALUES (
-                    %(categoryId1)s, %(label1)s, %(categoryId2)s, %(label2)s, %(categoryId3)s, %(label3)s, %(isActive)s
-                )
+            table = self.table_names["TM_MAD_DROPFR_ventes"]
+            order_lines = list(self.build_order_rows(conn, orders))
+
+            if replace:
+                deleted_rows = self.delete_keys(cursor, table, "orderId", [order.get("orderId", None) for order in orders])
+                if deleted_rows:
+                    log(f"♻️ {deleted_rows} lignes de commandes modifiées remplacées dans TM_MAD_DROPFR_ventes")
+
+            query_check_exists = f"""
+                SELECT 1 FROM {table}
+                WHERE orderId = %s
+                AND productId = %s
+                AND siteId = %s
+            """
+            
+            # Paramètres positionnels : une OrderLine suit l'ordre de ORDERS_COLUMNS
+            query_insert_orders = f"""
+                INSERT INTO {table} ({", ".join(ORDERS_COLUMNS)})
+                VALUES ({", ".join(["%s"] * len(ORDERS_COLUMNS))})
             """
-            insert_count = 0
-
-            for category in categories:
-                if not isinstance(category, dict):
-                    log("⚠️ Donnée de catégorie invalide, insertion ignorée")
-                    continue
-
-                category_reference = category.get("categoryReference", "").strip()
-                is_active = category.get("isActive", False)
-
-                # Vérifier si la catégorie est valide
-                if not category_reference or len(category_reference) < 6:
-                    continue
 
-                # Extraction des niveaux de catégories selon la bonne hiérarchie
-                category_levels = [category_reference[:i] for i in (2, 4, 6) if len(category_reference) >= i]
+            insert_count = 0
 
-                # Vérifier qu'on a bien les 3 niveaux
-                if len(category_levels) != 3:
+            for order_line in order_lines:
+                # Vérification doublon
+                cursor.execute(query_check_exists, order_line.key)
+                if cursor.fetchone():
+                    log(f"⚠️ Doublon ignoré pour orderId={order_line.orderId}, productId={order_line.productId}, status={order_line.status}, siteId={order_line.siteId}", level="DEBUG")
                     continue
 
-                categoryId1, categoryId2, categoryId3 = category_levels
-
-                # Récupération des informations des catégories parents (N1 et N2) depuis la route /categories/{categoryReference}
-                parent_data = [api.get_categories_info(access_tk, lvl) for lvl in category_levels]
-                parent_labels = [p["label"] if p else None for p in parent_data]
-
-                data_to_insert = {
-                    "categoryId1": categoryId1, # 2 chiffres (Niveau bas)
-                    "label1": parent_labels[0],  
-                    "categoryId2": categoryId2, # 4 chiffres (Niveau intermédiaire)
-                    "label2": parent_labels[1],  
-                    "categoryId3": categoryId3, # 6 chiffres (Niveau haut)
-                    "label3": parent_labels[2],  
-                    "isActive": is_active
-                }
-
-                log(f"📝 Insertion de la catégorie hierarchisée {category_reference} dans TM_MAD_DROPFR_Categories")
-
-                cursor.execute(query_insert_categories, data_to_insert)
+                log(f"📝 Insertion de la commande {order_line.orderId} dans TM_MAD_DROPFR_ventes", level="DEBUG")
+                cursor.execute(query_insert_orders, order_line)
                 insert_count += 1
 
             conn.commit()
+
             return insert_count
 
         except Exception as e:
-            log(f"❌ Erreur lors de l'insertion des catégories : {e}")
+            log(f"❌ Erreur lors de l'insertion des commandes : {e}")
             conn.rollback()
-            return 0
+            return None
 
         finally:
             cursor.close()
 
-    ### SECTION ATTRIBUTES ###
-    # Suppression des données de la table TM_MAD_DROPFR_Categories
-    def delete_attributes_data(self, conn):
-        try:
-            cursor = conn.cursor()
-
-            # Vérifier si la table contient des données
-            query_count_atttributes = "SELECT COUNT(*) FROM TM_MAD_DROPFR_Attributes"
-            cursor.execute(query_count_atttributes)
-            attributes_count = cursor.fetchone()[0]
-
-            deleted_rows = 0
-
-            if attributes_count > 0:
-                query_delete_attributes = "DELETE FROM TM_MAD_DROPFR_Attributes"
-                cursor.execute(query_delete_attributes)
-                deleted_rows = cursor.rowcount
-                conn.commit()
-                log(f"✅ {deleted_rows} attributs supprimés de TM_MAD_DROPFR_Attributes\n")
-            else:
-                log("ℹ️ Aucun attribut à supprimer dans TM_MAD_DROPFR_Attributes\n")
-
-            return deleted_rows
-
-        except Exception as e:
-            log(f"❌ Erreur lors de la suppression des catégories : {e}")
-            conn.rollback()
+    # Insérer les informations commandes dans TM_MAD_DROPFR_ventes en masse :
+    # chargement par lots dans une table temporaire puis dédoublonnage et insertion en une seule requête
+    # replace=True (upsert) : les lignes existantes des commandes de la table temporaire sont supprimées dans la même transaction
+    @metrics.track_rows("TM_MAD_DROPFR_ventes")
+    def insert_orders_data_bulk(self, conn, orders, replace=False):
+        rows = list(self.build_order_rows(conn, orders))
+        if not rows:
             return 0
 
-        finally:
-            cursor.close()
-
-    # Insertion des données attributs depuis la route /products/{productId} dans la table TM_MAD_DROPFR_Attributes
-    def insert_attributes_data(self, conn, products):
         try:
             cursor = conn.cursor()
-
-            query_insert_attributes= """
-                INSERT INTO TM_MAD_DROPFR_Attributes (
-                    productId, code, label, value, dateUpdate
-                )
-                VALUES (
-                    %(productId)s, %(code)s, %(label)s, %(value)s, %(dateUpdate)s
+            table = self.table_names["TM_MAD_DROPFR_ventes"]
+            columns = ", ".join(ORDERS_COLUMNS)
+
+            cursor.execute(f"IF OBJECT_ID('tempdb..{ORDERS_STAGING_TABLE}') IS NOT NULL DROP TABLE {ORDERS_STAGING_TABLE}")
+            cursor.execute(f"SELECT TOP 0 {columns}, CAST(0 AS INT) AS rowSeq INTO {ORDERS_STAGING_TABLE} FROM {table}")
+
+            # Insertions multi-lignes : au plus 2100 paramètres par requête SQL Server
+            values_per_row = len(ORDERS_COLUMNS) + 1
+            rows_per_statement = max(1, min(load_config["BULK_BATCH_SIZE"], 2000 // values_per_row))
+            row_placeholders = "(" + ", ".join(["%s"] * values_per_row) + ")"
+
+            for start in range(0, len(rows), rows_per_statement):
+                batch = rows[start:start + rows_per_statement]
+                params = []
+                for row_seq, order_line in enumerate(batch, start):
+                    params.extend(order_line)
+                    params.append(row_seq)
+
+                cursor.execute(
+                    f"INSERT INTO {ORDERS_STAGING_TABLE} ({columns}, rowSeq) VALUES " + ", ".join([row_placeholders] * len(batch)),
+                    tuple(params)
                 )
-            """
-            insert_count = 0
-            log("📥 Début de l'insertion des attributs dans TM_MAD_DROPFR_Attributes")
 
-            for product in products:
-                product_id = product.get("productId", None)
-                if product_id == None:
-                    log("⚠️ ProductId manquant, insertion ignorée")
-                    continue
-                
-                attributes = product.get("attributes", [])                
-                if not attributes:
-                    continue
+            if replace:
+                cursor.execute(f"DELETE FROM {table} WHERE orderId IN (SELECT orderId FROM {ORDERS_STAGING_TABLE})")
+                if cursor.rowcount:
+                    log(f"♻️ {cursor.rowcount} lignes de commandes modifiées remplacées dans TM_MAD_DROPFR_ventes")
+
+            # Dédoublonnage (dans le lot et avec la table) et insertion en une seule requête ensembliste
+            cursor.execute(f"""
+                INSERT INTO {table} ({columns})
+                SELECT {columns}
+                FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY orderId, productId, siteId ORDER BY rowSeq) AS rowRank
+                    FROM {ORDERS_STAGING_TABLE}
+                ) s
+                WHERE (s.rowRank = 1 OR s.productId IS NULL)
+                AND NOT EXISTS (
+                    SELECT 1 FROM {table} v
+                    WHERE v.orderId = s.orderId
+                    AND v.productId = s.productId
+                    AND v.siteId = s.siteId
+                )
+            """)
+            insert_count = cursor.rowcount
 
-                common_data = {
-                    "productId": product_id
-                }
-
-                for attribute in attributes:
-                    attributes_data = {
-                        "code": attribute.get("code"),
-                        "label": attribute.get("label"),
-                        "value": attribute.get("values"),
-                        "value": ', '.join(attribute.get("values")) if isinstance(attribute.get("values"), list) else attribute.get("values"),
-                        "dateUpdate": datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
-                    }
-                    
-                    full_data = {**common_data, **attributes_data}
-                
-                    cursor.execute(query_insert_attributes, full_data)
-                    insert_count += 1
-                    
+            cursor.execute(f"DROP TABLE {ORDERS_STAGING_TABLE}")
             conn.commit()
-            log(f"✅ Fin de l'insertion des attributs : {insert_count} attributs insérés dans TM_MAD_DROPFR_Attributes")
 
+            skipped = len(rows) - insert_count
+            log(f"📝 {insert_count} lignes de commandes insérées en masse dans TM_MAD_DROPFR_ventes ({skipped} doublons ignorés)")
             return insert_count
 
         except Exception as e:
-            log(f"❌ Erreur lors de l'insertion des attributs : {e}")
+            log(f"❌ Erreur lors de l'insertion en masse des commandes : {e}")
             conn.rollback()
-            return 0
+            return None
 
         finally:
-            cursor.close()
\ No newline at end of file
+            cursor.close()
@@ -0,0 +1,76 @@
+import queue
+import threading
+import time
+
+from logger import Logger
+
+log = Logger.write_log
+
+
+class ConnectionPool:
+
+    def __init__(self, db, size, health_check_interval):
+        self.db = db
+        self.size = max(1, size)                            # Connexions ouvertes au maximum
+        self.health_check_interval = health_check_interval  # Inactivité (s) au-delà de laquelle une connexion est vérifiée avant réutilisation
+        self.idle = queue.LifoQueue()                       # [(connexion, dernière utilisation)] : la plus récente est réutilisée en premier
+        self.slots = threading.BoundedSemaphore(self.size)
+        self.opened = 0
+        self.reused = 0
+        self.lock = threading.Lock()
+
+    # Connexion inactive réutilisée (vérifiée si elle a trop attendu), sinon nouvelle connexion ; bloque si le pool est plein
+    def acquire(self):
+        self.slots.acquire()
+
+        try:
+            while True:
+                try:
+                    conn, last_used = self.idle.get_nowait()
+                except queue.Empty:
+                    break
+
+                if time.monotonic() - last_used < self.health_check_interval or self.db.check_connection(conn):
+                    with self.lock:
+                        self.reused += 1
+                    return conn
+
+                log("⚠️ Connexion inactive invalide, une nouvelle connexion est ouverte")
+                self._close(conn)
+
+            conn, connected = self.db.get_db_connection()
+            if not conn or not connected:
+                raise RuntimeError("connexion au Data Warehouse impossible")
+
+            with self.lock:
+                self.opened += 1
+            return conn
+
+        except Exception:
+            self.slots.release()
+            raise
+
+    # Remise d'une connexion dans le pool (fermée si elle est inutilisable)
+    def release(self, conn, broken=False):
+        if broken:
+            self._close(conn)
+        else:
+            self.idle.put((conn, time.monotonic()))
+        self.slots.release()
+
+    # Fermeture des connexions inactives (fin de run)
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close(conn)
+
+        log(f"🔌 Pool de connexions Data Warehouse : {self.opened} connexions ouvertes, {self.reused} réutilisations")
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -1,15 +1,46 @@
+import atexit
+import logging
 import os
-from datetime import datetime
+import queue
+import threading
+
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from config import Config
 
 # Dossier et fichier de logs
 LOGS_DIR = "Logs"
 LOG_FILE = os.path.join(LOGS_DIR, "log.txt")
+SEPARATOR = "-" * 50
+
+log_config = Config.LOG_CONFIG
+
+# Niveau déduit du préfixe du message quand il n'est pas précisé par l'appelant
+LEVEL_PREFIXES = (("❌", logging.ERROR), ("⛔️", logging.ERROR), ("⚠️", logging.WARNING), ("🟡", logging.WARNING))
+
+
+class LogFormatter(logging.Formatter):
+
+    # Les séparateurs sont écrits tels quels, les messages sont préfixés par leur timestamp
+    def format(self, record):
+        if getattr(record, "raw", False):
+            return record.getMessage()
+
+        log_message = f"[{self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}] {record.getMessage()}"
+        if getattr(record, "separator", False):
+            log_message = SEPARATOR + log_message
+        return log_message
+
 
 class Logger:
 
+    _logger = None
+    _listener = None
+    _worker_listener = None
+    _lock = threading.Lock()
+
     # Crée le dossier Logs s'il n'existe pas
     def init_logs():
-        if not os.path.exists(LOGS_DIR):  
+        if not os.path.exists(LOGS_DIR):
             try:
                 os.makedirs(LOGS_DIR)
             except OSError as e:
@@ -17,30 +48,94 @@ class Logger:
                 return False
         return True
 
-    # Écrit un message dans le fichier de logs avec timestamp
-    def write_log(message, separator=False):
-        if not os.path.exists(LOGS_DIR):
-            Logger.init_logs()
+    # Création du fichier de logs avec rotation (taille ou date) selon la configuration
+    def _build_file_handler():
+        if log_config["ROTATION"] == "time":
+            handler = TimedRotatingFileHandler(LOG_FILE, when=log_config["ROTATE_WHEN"], backupCount=log_config["BACKUP_COUNT"], encoding="utf-8")
+        else:
+            handler = RotatingFileHandler(LOG_FILE, maxBytes=log_config["MAX_BYTES"], backupCount=log_config["BACKUP_COUNT"], encoding="utf-8")
+
+        handler.setFormatter(LogFormatter())
+        return handler
 
-        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
+    # Initialisation (une seule fois) du logger : les appelants déposent les messages dans une file,
+    # un thread dédié les écrit sur disque
+    def _get_logger():
+        if Logger._logger is not None:
+            return Logger._logger
 
-        if separator:
-            log_message = "-" * 50 + log_message
+        with Logger._lock:
+            if Logger._logger is None:
+                Logger.init_logs()
 
-        try:
-            with open(LOG_FILE, "a", encoding="utf-8") as log_file:
-                log_file.write(log_message)
-        except Exception as e:
-            print(f"❌ Erreur lors de l'écriture du log : {e}")
+                logger = logging.getLogger("drop3p")
+                logger.setLevel(getattr(logging, log_config["LEVEL"].upper(), logging.INFO))
+                logger.propagate = False
+
+                log_queue = queue.Queue(-1)
+                logger.addHandler(QueueHandler(log_queue))
+
+                try:
+                    Logger._listener = QueueListener(log_queue, Logger._build_file_handler())
+                    Logger._listener.start()
+                    atexit.register(Logger.shutdown)
+                except OSError as e:
+                    print(f"❌ Erreur lors de l'ouverture du fichier de logs : {e}")
+
+                Logger._logger = logger
+
+        return Logger._logger
+
+    # Écrit un message dans le fichier de logs avec timestamp
+    # level : "DEBUG", "INFO", "WARNING" ou "ERROR" (déduit du préfixe du message si absent)
+    def write_log(message, separator=False, level=None):
+        if level is None:
+            level = next((prefix_level for prefix, prefix_level in LEVEL_PREFIXES if message.startswith(prefix)), logging.INFO)
+        elif isinstance(level, str):
+            level = getattr(logging, level.upper(), logging.INFO)
+
+        logger = Logger._get_logger()
+        if logger.isEnabledFor(level):
+            logger.log(level, message, extra={"separator": separator})
 
     # Ajoute une ligne de séparation pour distinguer chaque exécution
     def separator():
-        if not os.path.exists(LOGS_DIR):
-            Logger.init_logs()
-            
-        try:
-            with open(LOG_FILE, "a", encoding="utf-8") as log_file:
-                log_file.write("-" * 50 + "\n")
-        except Exception as e:
-            print(f"❌ Erreur lors de l'ajout du séparateur : {e}")
\ No newline at end of file
+        Logger._get_logger().log(logging.CRITICAL, SEPARATOR, extra={"raw": True})
+
+    # Processus principal d'un run réparti : file partagée dans laquelle les workers déposent leurs messages,
+    # relayés vers la file du processus principal (un seul écrivain pour le fichier de logs)
+    def start_worker_queue(context):
+        worker_queue = context.Queue(-1)
+        Logger._worker_listener = QueueListener(worker_queue, *Logger._get_logger().handlers)
+        Logger._worker_listener.start()
+        return worker_queue
+
+    def stop_worker_queue():
+        if Logger._worker_listener is not None:
+            Logger._worker_listener.stop()
+            Logger._worker_listener = None
+
+    # Processus worker : les messages partent dans la file partagée au lieu du fichier
+    def use_worker_queue(worker_queue):
+        with Logger._lock:
+            logger = logging.getLogger("drop3p")
+            logger.setLevel(getattr(logging, log_config["LEVEL"].upper(), logging.INFO))
+            logger.propagate = False
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+            logger.addHandler(QueueHandler(worker_queue))
+            Logger._logger = logger
+
+    # Vide la file et ferme le fichier de logs (appelé automatiquement en fin de programme)
+    def shutdown():
+        with Logger._lock:
+            if Logger._listener is not None:
+                Logger._listener.stop()
+                for handler in Logger._listener.handlers:
+                    handler.close()
+                Logger._listener = None
+
+            if Logger._logger is not None:
+                for handler in list(Logger._logger.handlers):
+                    Logger._logger.removeHandler(handler)
+                Logger._logger = None
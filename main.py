@@ -1,132 +1,563 @@
+import argparse
+import multiprocessing
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from config import Config
 from logger import Logger
 from database import DatabaseSQL
+from sink_base import TABLES
 from api_requests import RequestsAPI
+from sync_state import SyncState, Checkpoint, ProductHashes
+from pipeline import Pipeline
+from batch_writer import BatchWriter
+from category_tree import CategoryTree
+from db_pool import ConnectionPool
+from table_writers import TableWriters
+from replay_api import ReplayAPI
+from response_archive import ResponseArchive
+from metrics import metrics
+from sinks import SINKS, build_sink, sink_state_file
 
 db = DatabaseSQL()
 api = RequestsAPI
 log = Logger.write_log
+sync_config = Config.SYNC_CONFIG
+load_config = Config.DB_LOAD_CONFIG
+sink_config = Config.SINK_CONFIG
+pipeline_config = Config.PIPELINE_CONFIG
+metrics_config = Config.METRICS_CONFIG
+perf_config = Config.API_PERF_CONFIG
+product_hashes = ProductHashes(sync_config["PRODUCT_HASH_FILE"], sync_config["SKIP_UNCHANGED_PRODUCTS"])
+
+# Options de lancement
+def parse_args():
+    parser = argparse.ArgumentParser(description="Chargement des commandes, produits, catégories et attributs DROP3P dans le Data Warehouse")
+    parser.add_argument("--full", action="store_true", help="Rechargement complet (vidage des tables) au lieu de la synchronisation incrémentale")
+    parser.add_argument("--resume", action="store_true", help="Reprise du dernier run interrompu depuis son checkpoint (traitement séquentiel)")
+    parser.add_argument("--shards", type=int, default=sync_config["SHARD_WORKERS"], help="Rechargement complet réparti entre N processus par fenêtres de dates createdAt")
+    parser.add_argument("--pipeline", action="store_true", help="Traitement en flux : récupération API et écritures en base en parallèle")
+    parser.add_argument("--load-mode", choices=["bulk", "row"], default=load_config["ORDERS_LOAD_MODE"], help="Chargement de TM_MAD_DROPFR_ventes en masse ou ligne à ligne")
+    parser.add_argument("--replay", nargs="?", const="latest", metavar="ARCHIVE", help="Rechargement de la base depuis une archive de réponses API (la dernière par défaut), sans appel réseau")
+    parser.add_argument("--sink", choices=SINKS, default=sink_config["TYPE"], help="Destination du chargement : Data Warehouse SQL Server, base SQLite locale ou fichiers Parquet")
+    parser.add_argument("--reload-mode", choices=["swap", "truncate"], default=load_config["RELOAD_MODE"], help="Rechargement complet dans des tables fantômes échangées en fin de run, ou par vidage des tables")
+    return parser.parse_args()
+
+# Récupération des productId des commandes d'une page dont les détails ont été obtenus
+def collect_product_ids(orders, orders_details):
+    product_ids = []
+
+    for order, order_id_value in zip(orders, orders_details):
+        order_id = order.get('orderId', None)
+
+        if not order_id_value:
+            log(f"⚠️ Impossible de récupérer les détails pour la commande {order_id}")
+            continue
+
+        # Le siteId associé au customerRef est résolu par commande lors de l'insertion
+        customer_reference = order.get("customer", {}).get("reference", None)
+        if customer_reference == None:
+            log(f"⚠️ Pas de référence client pour la commande {order_id}")
+            continue
+
+        # Récupération des produit(s) de la commande
+        lines = order.get("lines", [])
+        for line in lines:
+            product_id = line.get("offer", {}).get("productId", None)
+            if product_id:
+                product_ids.append(product_id)
+            else:
+                log(f"⚠️ Aucun productId trouvé pour la commande {order_id}")
+
+    return product_ids
+
+# Insertion d'une page de commandes dans TM_MAD_DROPFR_ventes (upsert en synchro incrémentale ou en reprise :
+# les lignes existantes des commandes modifiées sont remplacées dans la même transaction). Une page non insérée
+# arrête le run : le watermark n'avance pas et le checkpoint ne la marque pas traitée
+def insert_orders_page(conn, orders, insert_orders, upsert=False):
+    inserted = insert_orders(conn, orders, replace=upsert)
+    if inserted is None:
+        raise RuntimeError("insertion d'une page de commandes dans TM_MAD_DROPFR_ventes impossible")
+    return inserted
 
-def process_orders(conn, access_tk):
-    total_inserted_orders = 0
+# Écriture confiée au writer de la table (thread et connexion dédiés), ou exécutée directement sur conn sans writers
+def submit_write(writers, conn, table, task):
+    if writers is None:
+        task(conn)
+    else:
+        writers.submit(table, task)
+
+# updated_at_min renseigné : synchro incrémentale (les lignes des commandes modifiées sont remplacées)
+# checkpoint : progression sauvegardée par page ; en reprise, les pages et commandes déjà traitées sont ignorées
+# created_at_window : fenêtre (createdAtMin, createdAtMax) traitée par un worker d'un run réparti
+# writers : les pages sont insérées par le writer de TM_MAD_DROPFR_ventes pendant la récupération des pages suivantes
+@metrics.track_stage("process_orders")
+def process_orders(conn, access_tk, updated_at_min=None, load_mode="bulk", checkpoint=None, resuming=False, created_at_window=None, writers=None):
+    totals = {"orders": 0, "duration": 0.0}
     collected_product_ids = set() # Pour éviter les doublons
-    all_orders_pages = api.get_orders_info(access_tk)
+    insert_orders = db.insert_orders_data_bulk if load_mode == "bulk" else db.insert_orders_data
+    upsert = bool(updated_at_min) or resuming
+    page_index = checkpoint.last_page if checkpoint else 0
 
     # Récupération des informations commandes paginées depuis /orders
-    all_orders_pages = api.get_orders_info(access_tk)
+    all_orders_pages = api.get_orders_info(access_tk, updated_at_min, page_index + 1, checkpoint.page_size if checkpoint else None, created_at_window=created_at_window)
 
     if all_orders_pages:
         for orders in all_orders_pages:
+            page_index += 1
             log(f"📦 {len(orders)} commandes récupérées sur cette page")
 
-            for order in orders:
-                order_id = order.get('orderId', None)
-
-                # Récupération de l'orderId par commande
-                order_id_value = api.get_order_id_cust_ref(access_tk, order_id)
-                if not order_id_value:
-                    log(f"⚠️ Impossible de récupérer les détails pour la commande {order_id}")
-                    continue
-
-                # Récupération du siteId associé au customerRef
-                customer_reference = order.get("customer", {}).get("reference", None)
-                if customer_reference != None:
-                    site_id = db.get_site_id(conn, customer_reference)
-                else:
-                    log(f"⚠️ Pas de référence client pour la commande {order_id}")
-                    continue
-
-                # Récupération des produit(s) de la commande
-                lines = order.get("lines", [])
-                for line in lines:
-                    product_id = line.get("offer", {}).get("productId", None)
-                    if product_id:
-                        collected_product_ids.add(product_id)
-                    else:
-                        log(f"⚠️ Aucun productId trouvé pour la commande {order_id}")
-
-            # Insertion des données commandes dans TM_MAD_DROPFR_ventes
-            total_inserted_orders += db.insert_orders_data(conn, orders, site_id)
+            if resuming:
+                orders = [order for order in orders if order.get('orderId', None) not in checkpoint.processed_order_ids]
+
+            # Récupération en parallèle des détails des commandes de la page (selon API_ORDER_DETAIL_POLICY)
+            orders, orders_details = api.get_orders_details_by_policy(access_tk, orders)
+            page_product_ids = collect_product_ids(orders, orders_details)
+            collected_product_ids.update(page_product_ids)
+
+            # La page n'est marquée traitée dans le checkpoint qu'une fois insérée
+            def write_page(write_conn, orders=orders, page_index=page_index, page_product_ids=page_product_ids):
+                insert_started_at = time.perf_counter()
+                totals["orders"] += insert_orders_page(write_conn, orders, insert_orders, upsert)
+                totals["duration"] += time.perf_counter() - insert_started_at
+
+                if checkpoint:
+                    checkpoint.page_done(page_index, [order.get('orderId', None) for order in orders], page_product_ids)
+
+            submit_write(writers, conn, "TM_MAD_DROPFR_ventes", write_page)
     else:
         log("❌ Aucune commande récupérée")
-        return total_inserted_orders
+        return totals["orders"], []
+
+    if writers is not None:
+        writers.wait(["TM_MAD_DROPFR_ventes"])
+
+    total_inserted_orders = totals["orders"]
+    if totals["duration"] > 0:
+        log(f"⏱️ Chargement TM_MAD_DROPFR_ventes (mode {load_mode}) : {total_inserted_orders} lignes en {totals['duration']:.1f}s ({total_inserted_orders / totals['duration']:.0f} lignes/s)")
+    
+    if checkpoint:
+        checkpoint.orders_done()
+        collected_product_ids.update(checkpoint.product_ids)
     
     return total_inserted_orders, list(collected_product_ids)
 
-def process_products_categories_attributes(conn, access_tk, product_ids):
-    total_inserted_products = 0
-    total_inserted_categories = 0
-    total_inserted_attributes = 0
+# Lot d'écriture des produits, catégories et attributs (une transaction par lot, ou par table et par lot avec writers)
+def build_batch_writer(conn, on_flush=None, writers=None):
+    return BatchWriter(db, conn, load_config["PRODUCT_BATCH_SIZE"], load_config["COMMIT_INTERVAL"], on_flush, writers)
 
-    for product_id in product_ids:
-        log(f"🔍 Récupération des informations du produit : {product_id}")
-        
-        product_info  = api.get_product_info(access_tk, product_id)
+# Récupération d'un produit et de ses attributs, mis en attente dans le lot d'écriture ; sa catégorie est ajoutée
+# à l'arbre des catégories du run (écrit une seule fois en fin de run). Renvoie la référence N3 du produit, aussi
+# notée dans product_categories avant writer.add : un flush déclenché par cet ajout la relit aussitôt pour le checkpoint
+@metrics.track_stage("process_product")
+def process_product(writer, category_tree, access_tk, product_id, incremental=False, product_categories=None):
+    deletes = []
+    inserts = {}
 
-        if not product_info:
-            log(f"⚠️ Aucune info trouvée pour le produit {product_id}")
-            continue
+    log(f"🔍 Récupération des informations du produit : {product_id}", level="DEBUG")
+    
+    product_info  = api.get_product_info(access_tk, product_id)
 
-        total_inserted_products += db.insert_products_data(conn, [product_info])
+    if not product_info:
+        log(f"⚠️ Aucune info trouvée pour le produit {product_id}")
+        writer.add(product_id, deletes, inserts)
+        return None
 
-        # Récupération de category depuis /products/{productId}
-        category_ref = product_info.get("category", None).strip()
-        if not category_ref or len(category_ref) < 6:
-            log("⚠️ Catégorie invalide ou manquante")
-            continue
+    # Synchro incrémentale : un produit dont le contenu n'a pas changé depuis sa dernière écriture n'est pas réécrit
+    if product_hashes and not product_hashes.stage(product_id, product_info) and incremental:
+        log(f"⏭️ Produit {product_id} inchangé, non réécrit", level="DEBUG")
+        writer.add(product_id, deletes, inserts)
+        return None
 
-        # Extraction des catégories N1, N2 et N3
-        category_levels = [category_ref[:i] for i in (2, 4, 6) if len(category_ref) >= i]
+    if incremental:
+        deletes.append(("TM_MAD_DROPFR_Products", "ProductId", [product_id]))
+        deletes.append(("TM_MAD_DROPFR_Attributes", "productId", [product_id]))
 
-        for level in category_levels:
-            category_data = api.get_categories_info(access_tk, level)
-            if category_data:
-                total_inserted_categories += db.insert_categories_data(conn, [category_data], access_tk)
-            else:
-                log(f"⚠️ Aucune information trouvée pour la catégorie {level}")
+    inserts["TM_MAD_DROPFR_Products"] = list(db.build_product_rows([product_info]))
+    inserts["TM_MAD_DROPFR_Attributes"] = list(db.build_attribute_rows([product_info]))
+
+    # Récupération de category depuis /products/{productId}
+    category_reference = category_tree.add(product_info.get("category", None))
+    if not category_reference:
+        log("⚠️ Catégorie invalide ou manquante")
+
+    if product_categories is not None:
+        product_categories[product_id] = category_reference
+    writer.add(product_id, deletes, inserts)
+    return category_reference
+
+# Écriture de l'arbre des catégories du run : une ligne TM_MAD_DROPFR_Categories par catégorie N3 distincte, en une opération
+# incremental=True : les lignes existantes de ces catégories sont remplacées
+@metrics.track_stage("write_category_tree")
+def write_category_tree(conn, access_tk, category_tree, incremental=False, writers=None):
+    if not category_tree.references:
+        return 0
+
+    category_tree.resolve(api, access_tk)
+    rows = list(category_tree.build_rows())
+
+    # Seules les catégories réécrites sont supprimées : une catégorie introuvable garde sa ligne publiée
+    deletes = [("TM_MAD_DROPFR_Categories", "categoryId3", [row["categoryId3"] for row in rows])] if incremental else []
+    inserts = {"TM_MAD_DROPFR_Categories": rows}
+    result = {}
+
+    def write_categories(write_conn):
+        result["inserted"] = db.write_batch(write_conn, deletes, inserts)
+
+    submit_write(writers, conn, "TM_MAD_DROPFR_Categories", write_categories)
+    if writers is not None:
+        writers.wait(["TM_MAD_DROPFR_Categories"])
 
-        total_inserted_attributes += db.insert_attributes_data(conn, [product_info])
+    # En cas d'échec, le run s'arrête avec son checkpoint (catégories comprises) pour une reprise
+    if result.get("inserted") is None:
+        raise RuntimeError("écriture de l'arbre des catégories impossible")
+
+    return result["inserted"].get("TM_MAD_DROPFR_Categories", 0)
+
+# incremental=True : les produits, catégories et attributs déjà présents sont remplacés
+# checkpoint : les produits déjà traités par un run interrompu sont ignorés, un produit n'est marqué traité (avec sa catégorie) qu'une fois son lot écrit
+# category_tree : arbre fourni par l'appelant, qui l'écrit lui-même (workers d'un run réparti) ; sinon l'arbre est écrit ici
+@metrics.track_stage("process_products_categories_attributes")
+def process_products_categories_attributes(conn, access_tk, product_ids, incremental=False, checkpoint=None, writers=None, category_tree=None):
+    product_categories = {}
+
+    # Produit écrit : empreinte retenue et progression du checkpoint
+    def on_flush(product_id):
+        if product_hashes:
+            product_hashes.confirm(product_id)
+        category_reference = product_categories.pop(product_id, None)
+        if checkpoint:
+            checkpoint.product_done(product_id, category_reference)
+
+    writer = build_batch_writer(conn, on_flush, writers)
+    tree = category_tree or CategoryTree(checkpoint.category_references if checkpoint else ())
+
+    for product_id in product_ids:
+        if checkpoint and product_id in checkpoint.processed_product_ids:
+            continue
+
+        process_product(writer, tree, access_tk, product_id, incremental, product_categories)
+
+    writer.close()
+    inserted_categories = 0 if category_tree else write_category_tree(conn, access_tk, tree, incremental, writers)
     
-    return total_inserted_products, total_inserted_categories, total_inserted_attributes
+    return writer.totals.get("TM_MAD_DROPFR_Products", 0), inserted_categories, writer.totals.get("TM_MAD_DROPFR_Attributes", 0)
+
+# Traitement en flux : pages -> détails -> insertion commandes -> découverte produits -> insertion produits/catégories/attributs
+# Chaque étage tourne dans son propre thread, reliés par des files bornées ; l'étage produits utilise sa propre connexion
+# (ou, avec writers, les écritures de chaque table passent par son writer)
+@metrics.track_stage("process_pipeline")
+def process_pipeline(conn, product_conn, access_tk, updated_at_min=None, load_mode="bulk", queue_size=None, writers=None):
+    insert_orders = db.insert_orders_data_bulk if load_mode == "bulk" else db.insert_orders_data
+    seen_product_ids = set()
+    totals = {"orders": 0}
+    writer = build_batch_writer(product_conn, product_hashes.confirm if product_hashes else None, writers)
+    category_tree = CategoryTree()
+
+    def fetch_details(orders):
+        log(f"📦 {len(orders)} commandes récupérées sur cette page")
+        return [api.get_orders_details_by_policy(access_tk, orders)]
 
-def main():
+    def insert_orders_stage(page):
+        orders, _ = page
+
+        def write_page(write_conn):
+            totals["orders"] += insert_orders_page(write_conn, orders, insert_orders, bool(updated_at_min))
+
+        submit_write(writers, conn, "TM_MAD_DROPFR_ventes", write_page)
+        return [page]
+
+    def discover_products(page):
+        new_product_ids = []
+        for product_id in collect_product_ids(*page):
+            if product_id not in seen_product_ids:
+                seen_product_ids.add(product_id)
+                new_product_ids.append(product_id)
+        return new_product_ids
+
+    def insert_product_stage(product_id):
+        process_product(writer, category_tree, access_tk, product_id, bool(updated_at_min))
+
+    pipeline = Pipeline(queue_size or pipeline_config["QUEUE_SIZE"])
+    pipeline.add_stage("détails commandes", fetch_details)
+    pipeline.add_stage("insertion commandes", insert_orders_stage)
+    pipeline.add_stage("découverte produits", discover_products)
+    pipeline.add_stage("insertion produits", insert_product_stage)
+    pipeline.run(api.get_orders_info(access_tk, updated_at_min))
+    writer.close()
+    if writers is not None:
+        writers.wait(["TM_MAD_DROPFR_ventes"])
+    inserted_categories = write_category_tree(product_conn, access_tk, category_tree, bool(updated_at_min), writers)
+
+    return totals["orders"], writer.totals.get("TM_MAD_DROPFR_Products", 0), inserted_categories, writer.totals.get("TM_MAD_DROPFR_Attributes", 0)
+
+# État d'un processus worker du rechargement réparti (connexion BDD et token propres au processus)
+shard_worker = {}
+
+# Initialisation d'un worker : logs relayés au processus principal, quotas API partagés, connexion BDD propre
+def init_shard_worker(log_queue, rate_limits, table_names, access_tk, load_mode, db_factory):
+    global db
+    Logger.use_worker_queue(log_queue)
+    api.attach_rate_limits(rate_limits)
+
+    db = db_factory()
+    db.table_names = dict(table_names)
+    conn, connected = db.get_db_connection()
+    if not conn or not connected:
+        raise RuntimeError("connexion au Data Warehouse impossible depuis un worker")
+    db.load_site_ids(conn)
+
+    shard_worker.update({"conn": conn, "access_tk": access_tk, "load_mode": load_mode})
+
+# Commandes d'une fenêtre createdAt : nombre de lignes insérées, productId découverts et métriques du worker
+def process_order_window(created_at_window):
+    metrics.reset()
+    log(f"🧩 Fenêtre {created_at_window[0]} -> {created_at_window[1]}")
+    inserted_orders, product_ids = process_orders(shard_worker["conn"], shard_worker["access_tk"], None, shard_worker["load_mode"], created_at_window=created_at_window)
+    return inserted_orders, product_ids, metrics.snapshot()
+
+# Produits d'une part de la liste : lignes insérées par table, catégories N3 vues (arbre écrit par le processus principal),
+# catégories récupérées et métriques du worker
+def process_product_shard(product_ids):
+    metrics.reset()
+    product_hashes.hashes = {}
+    category_tree = CategoryTree()
+    totals = process_products_categories_attributes(shard_worker["conn"], shard_worker["access_tk"], product_ids, category_tree=category_tree)
+    return totals, sorted(category_tree.references), product_hashes.hashes, api.export_category_cache(), metrics.snapshot()
+
+# Rechargement complet réparti : l'historique est découpé en fenêtres createdAtMin/createdAtMax traitées par un pool
+# de processus (session HTTP et connexion BDD propres, quota API commun), puis les produits découverts sont répartis de même
+@metrics.track_stage("process_sharded")
+def process_sharded(conn, access_tk, workers, load_mode, started_at):
+    context = multiprocessing.get_context("spawn")
+    windows = SyncState.created_at_windows(sync_config["CREATED_AT_MIN"], started_at, sync_config["SHARD_WINDOW_DAYS"])
+    log(f"🧩 Rechargement réparti : {len(windows)} fenêtres createdAt sur {workers} processus\n")
+
+    rate_limits = api.share_rate_limits(context)
+    log_queue = Logger.start_worker_queue(context)
+    inserted_orders = 0
+    product_ids = set()
+    inserted = [0, 0, 0]
+    category_tree = CategoryTree()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_shard_worker,
+                                 initargs=(log_queue, rate_limits, db.table_names, access_tk, load_mode, type(db))) as executor:
+            for window_inserted, window_product_ids, snapshot in executor.map(process_order_window, windows):
+                inserted_orders += window_inserted
+                product_ids.update(window_product_ids)
+                metrics.merge(snapshot)
+
+            log(f"🧩 {inserted_orders} lignes de commandes insérées, {len(product_ids)} produits à charger\n")
+
+            product_ids = sorted(product_ids)
+            shard_size = max(1, -(-len(product_ids) // (workers * 4)))
+            product_shards = [product_ids[start:start + shard_size] for start in range(0, len(product_ids), shard_size)]
+            for totals, category_references, hashes, categories, snapshot in executor.map(process_product_shard, product_shards):
+                inserted = [total + shard_total for total, shard_total in zip(inserted, totals)]
+                category_tree.update(category_references)
+                if product_hashes:
+                    product_hashes.merge(hashes)
+                api.merge_category_cache(categories)
+                metrics.merge(snapshot)
+    finally:
+        Logger.stop_worker_queue()
+
+    # Catégories de toutes les parts écrites une seule fois (libellés déjà dans le cache fusionné)
+    inserted[1] = write_category_tree(conn, access_tk, category_tree)
+
+    return inserted_orders, *inserted
+
+def main(args=None):
+    global api, db, product_hashes
+    args = args or parse_args()
+
+    # Sink SQLite ou Parquet : watermark, checkpoint et empreintes produits suivis à part du Data Warehouse
+    if args.sink != "mssql":
+        db = build_sink(args.sink)
+        product_hashes = ProductHashes(sink_state_file(sync_config["PRODUCT_HASH_FILE"], args.sink), sync_config["SKIP_UNCHANGED_PRODUCTS"])
+    sync_state = SyncState(sink_state_file(sync_config["STATE_FILE"], args.sink))
+    checkpoint = Checkpoint(sink_state_file(sync_config["CHECKPOINT_FILE"], args.sink), sync_config["CHECKPOINT_EVERY_PAGES"], sync_config["CHECKPOINT_EVERY_PRODUCTS"])
+    started_at = datetime.now(timezone.utc)
+    metrics.reset()
+    run_info = {"mode": "full" if args.full else "incremental", "sink": args.sink, "pipeline": args.pipeline, "loadMode": args.load_mode}
+    resuming = False
+    pool = ConnectionPool(db, load_config["POOL_SIZE"], load_config["POOL_HEALTH_CHECK_INTERVAL"])
+    writers = None
 
     try:
         Logger.separator()
         log("🚀 Démarrage du processus...\n")
 
-        # Connexion à la base de données
-        conn, connected = db.get_db_connection()
-        if not conn and connected:
-            return
+        # Rejeu d'une archive : mêmes écritures que le run archivé (upsert s'il était incrémental), sans checkpoint ni watermark
+        if args.replay:
+            archive_file = ResponseArchive(Config.ARCHIVE_CONFIG["DIR"]).latest() if args.replay == "latest" else args.replay
+            if not archive_file:
+                log("❌ Aucune archive à rejouer")
+                return
+
+            header = ReplayAPI.load(archive_file)
+            unreplayable_reason = ReplayAPI.unreplayable_reason()
+            if unreplayable_reason:
+                raise RuntimeError(f"archive {archive_file} non rejouable : {unreplayable_reason}")
+            api = ReplayAPI
+            checkpoint = None
+            product_hashes = None
+            watermark = header.get("watermark")
+            run_watermark = None
+            run_info["replay"] = archive_file
+
+        # Reprise d'un run interrompu : même filtre /orders et même watermark final que le run d'origine
+        elif args.resume and db.durable_writes and checkpoint.load():
+            resuming = True
+            watermark = checkpoint.state["watermark"]
+            run_watermark = checkpoint.state["runWatermark"]
+            log(f"⏯️ Reprise du run interrompu après la page {checkpoint.last_page} : {len(checkpoint.processed_order_ids)} commandes et {len(checkpoint.processed_product_ids)} produits déjà traités\n")
+        else:
+            if args.resume and not db.durable_writes:
+                log(f"ℹ️ Pas de reprise avec --sink {args.sink} (rien n'est écrit avant la fin du run), démarrage d'un nouveau run")
+            elif args.resume:
+                log("ℹ️ Aucun checkpoint trouvé, démarrage d'un nouveau run")
+
+            # Mode de chargement : incrémental depuis le dernier watermark, sinon rechargement complet
+            watermark = None if args.full else sync_state.get_watermark()
+            run_watermark = SyncState.compute_watermark(started_at, sync_config["OVERLAP_MINUTES"])
+            if watermark:
+                log(f"🔄 Synchronisation incrémentale des commandes modifiées depuis {watermark}\n")
+            else:
+                log("🔄 Rechargement complet des données\n")
+        run_info["mode"] = "incremental" if watermark else "full"
+        run_info["resumed"] = resuming
+        reload_mode = None if watermark else (checkpoint.reload_mode if resuming else args.reload_mode)
+        run_info["reloadMode"] = reload_mode
+
+        # Rechargement complet réparti entre plusieurs processus
+        sharded = args.shards > 1 and not watermark and not resuming and not args.replay and db.durable_writes
+        if args.shards > 1 and not db.durable_writes:
+            log(f"ℹ️ --shards ignoré avec --sink {args.sink} : tables tenues en mémoire par un seul processus")
+        run_info["shards"] = args.shards if sharded else 1
+
+        # Archivage des réponses brutes du run, rejouables avec --replay si le run aboutit sans reprise ni répartition
+        api.open_archive(started_at.strftime("%Y%m%dT%H%M%S%f"), {"mode": run_info["mode"], "watermark": watermark, "resumed": resuming, "sharded": sharded})
+
+        # Connexion à la base de données (pool partagé avec les writers de tables)
+        conn = pool.acquire()
+
+        # Chargement de l'index des siteID (TM_MAD_SiteID)
+        db.load_site_ids(conn)
 
         # Récupération du token API
         access_tk = api.get_access_token()
         if not access_tk:
             return
         
+        # Le checkpoint est créé avant le vidage des tables : une reprise ne les videra pas une seconde fois
+        if checkpoint and not resuming:
+            checkpoint.start(run_info["mode"], watermark, run_watermark, reload_mode, perf_config["ORDERS_PAGE_SIZE"])
+
+        # Empreintes produits : oubliées au début d'un rechargement complet (tables vidées), relues sinon
+        if product_hashes:
+            if watermark or resuming:
+                product_hashes.load()
+            else:
+                product_hashes.reset()
+
+        # Rechargement par échange : chargement dans les tables fantômes (conservées telles quelles en reprise)
+        if reload_mode == "swap":
+            if not db.prepare_shadow_tables(conn, truncate=not resuming):
+                raise RuntimeError("préparation des tables fantômes impossible")
+
         # Suppression des données des tables TM_MAD_DROPFR_ventes / TM_MAD_DROPFR_Products / TM_MAD_DROPFR_Categories / TM_MAD_DROPFR_Attributes
-        db.delete_orders_data(conn)
-        db.delete_products_data(conn)
-        db.delete_categories_data(conn)
-        db.delete_attributes_data(conn)
+        elif reload_mode == "truncate" and not resuming:
+            db.delete_orders_data(conn)
+            db.delete_products_data(conn)
+            db.delete_categories_data(conn)
+            db.delete_attributes_data(conn)
         
         # Traitement des données
-        inserted_orders, product_ids = process_orders(conn, access_tk)
-        inserted_products, inserted_categories, inserted_attributes = process_products_categories_attributes(conn, access_tk, product_ids)
+        # Un writer (thread et connexion du pool) par table : une insertion lente n'en bloque pas une autre
+        if load_config["TABLE_WRITERS"] and not sharded:
+            if pool.size > len(TABLES):
+                writers = TableWriters(pool, TABLES, load_config["WRITER_QUEUE_SIZE"])
+            else:
+                log(f"⚠️ DB_POOL_SIZE={pool.size} insuffisant pour un writer par table, écritures sur la connexion principale")
+
+        if sharded:
+            inserted_orders, inserted_products, inserted_categories, inserted_attributes = process_sharded(conn, access_tk, args.shards, args.load_mode, started_at)
+        elif args.pipeline and not resuming:
+            product_conn = conn if writers else pool.acquire()
+            inserted_orders, inserted_products, inserted_categories, inserted_attributes = process_pipeline(conn, product_conn, access_tk, watermark, args.load_mode, writers=writers)
+            if product_conn is not conn:
+                pool.release(product_conn)
+        else:
+            if resuming and checkpoint.orders_completed:
+                inserted_orders, product_ids = 0, checkpoint.product_ids
+            else:
+                inserted_orders, product_ids = process_orders(conn, access_tk, watermark, args.load_mode, checkpoint, resuming, writers=writers)
+            inserted_products, inserted_categories, inserted_attributes = process_products_categories_attributes(conn, access_tk, product_ids, bool(watermark) or resuming, checkpoint, writers)
+
+        # Fin des writers avant la publication : toutes les écritures sont validées
+        if writers:
+            writers.close()
+            writers = None
+
+        # Publication des tables fantômes ; en cas d'échec le checkpoint est conservé pour une reprise
+        if reload_mode == "swap" and not db.swap_shadow_tables(conn):
+            raise RuntimeError("échange des tables fantômes impossible")
+
+        # Publication propre au sink (écriture des fichiers Parquet) ; en cas d'échec le watermark n'avance pas
+        if not db.finalize_load(conn):
+            raise RuntimeError(f"publication du chargement impossible (--sink {args.sink})")
             
-        # Fermeture de la connexion
-        conn.close()
+        # Fermeture des connexions
+        pool.release(conn)
+        pool.close_all()
         log("\n")
         log(f"✅ {inserted_orders} commandes insérées dans TM_MAD_DROPFR_ventes")
         log(f"✅ {inserted_products} produits insérés dans TM_MAD_DROPFR_Products")
         log(f"✅ {inserted_categories} catégories insérées dans TM_MAD_DROPFR_Categories")
         log(f"✅ {inserted_attributes} attributs insérés dans TM_MAD_DROPFR_Attributes\n")
+
+        api.save_category_cache()
+        api.close_archive(completed=True)
+
+        # Le watermark n'avance qu'après un run complet (un rejeu ne le modifie pas)
+        if product_hashes:
+            product_hashes.save()
+        if checkpoint:
+            sync_state.set_watermark(run_watermark)
+            checkpoint.clear()
+
+        connection_stats = api.get_connection_stats()
+        log(f"🔌 {connection_stats['requests']} requêtes HTTP sur {connection_stats['connections']} connexions ({connection_stats['reused']} réutilisations)\n")
+
+        metrics.write_report(metrics_config["REPORT_DIR"], {
+            **run_info,
+            "status": "success",
+            "inserted": {
+                "TM_MAD_DROPFR_ventes": inserted_orders,
+                "TM_MAD_DROPFR_Products": inserted_products,
+                "TM_MAD_DROPFR_Categories": inserted_categories,
+                "TM_MAD_DROPFR_Attributes": inserted_attributes
+            },
+            "connections": connection_stats
+        }, metrics_config["PROMETHEUS_FILE"])
         
         log("🔚 Fin du processus.")
         Logger.separator()
 
     except Exception as e:
+        api.save_category_cache()
+        api.close_archive()
+        if writers:
+            try:
+                writers.close()
+            except Exception:
+                pass
+        pool.close_all()
         log(f"❌ Erreur inattendue : {e}")
+        metrics.write_report(metrics_config["REPORT_DIR"], {**run_info, "status": "error", "error": str(e)}, metrics_config["PROMETHEUS_FILE"])
         Logger.separator()
 
 if __name__ == "__main__":
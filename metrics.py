@@ -0,0 +1,206 @@
+import copy
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+from datetime import datetime
+from logger import Logger
+
+log = Logger.write_log
+
+# Bornes (secondes) de l'histogramme des latences API
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Metrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    # Remise à zéro des compteurs (début de run)
+    def reset(self):
+        with self.lock:
+            self.started_at = time.time()
+            self.api = {}       # {route: {"count", "sum", "max", "buckets"}}
+            self.statuses = {}  # {route: {status: nombre}}
+            self.tables = {}    # {table: {"rows", "seconds", "calls"}}
+            self.stages = {}    # {étape: {"seconds", "calls"}}
+
+    # Latence et code HTTP d'un appel API (status "error" si la requête n'a pas abouti)
+    def observe_api(self, route, status, seconds):
+        with self.lock:
+            latency = self.api.setdefault(route, {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS) + 1)})
+            latency["count"] += 1
+            latency["sum"] += seconds
+            latency["max"] = max(latency["max"], seconds)
+            bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+            latency["buckets"][bucket] += 1
+
+            route_statuses = self.statuses.setdefault(route, {})
+            route_statuses[str(status)] = route_statuses.get(str(status), 0) + 1
+
+    # Lignes écrites dans une table et temps passé en base
+    def observe_rows(self, table, rows, seconds):
+        with self.lock:
+            table_stats = self.tables.setdefault(table, {"rows": 0, "seconds": 0.0, "calls": 0})
+            table_stats["rows"] += rows or 0
+            table_stats["seconds"] += seconds
+            table_stats["calls"] += 1
+
+    def observe_stage(self, name, seconds):
+        with self.lock:
+            stage_stats = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            stage_stats["seconds"] += seconds
+            stage_stats["calls"] += 1
+
+    # Décorateur : le nombre renvoyé par la méthode d'insertion est compté comme lignes écrites dans `table`
+    def track_rows(self, table):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started_at = time.perf_counter()
+                inserted = func(*args, **kwargs)
+                self.observe_rows(table, inserted if isinstance(inserted, int) else 0, time.perf_counter() - started_at)
+                return inserted
+            return wrapper
+        return decorator
+
+    # Décorateur : temps passé dans une fonction d'étape
+    def track_stage(self, name):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started_at = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe_stage(name, time.perf_counter() - started_at)
+            return wrapper
+        return decorator
+
+    # Compteurs bruts, à regrouper dans le processus principal (merge) quand le run est réparti entre processus
+    def snapshot(self):
+        with self.lock:
+            return copy.deepcopy({"api": self.api, "statuses": self.statuses, "tables": self.tables, "stages": self.stages})
+
+    def merge(self, snapshot):
+        with self.lock:
+            for route, latency in snapshot["api"].items():
+                target = self.api.setdefault(route, {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS) + 1)})
+                target["count"] += latency["count"]
+                target["sum"] += latency["sum"]
+                target["max"] = max(target["max"], latency["max"])
+                target["buckets"] = [a + b for a, b in zip(target["buckets"], latency["buckets"])]
+
+            for route, route_statuses in snapshot["statuses"].items():
+                target = self.statuses.setdefault(route, {})
+                for status, count in route_statuses.items():
+                    target[status] = target.get(status, 0) + count
+
+            for table, stats in snapshot["tables"].items():
+                target = self.tables.setdefault(table, {"rows": 0, "seconds": 0.0, "calls": 0})
+                for field in ("rows", "seconds", "calls"):
+                    target[field] += stats[field]
+
+            for name, stats in snapshot["stages"].items():
+                target = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+                target["seconds"] += stats["seconds"]
+                target["calls"] += stats["calls"]
+
+    # Rapport du run sous forme de dictionnaire sérialisable en JSON
+    def report(self, extra=None):
+        with self.lock:
+            duration = time.time() - self.started_at
+            api = {}
+            for route, latency in self.api.items():
+                api[route] = {
+                    "count": latency["count"],
+                    "avgSeconds": round(latency["sum"] / latency["count"], 4) if latency["count"] else 0.0,
+                    "maxSeconds": round(latency["max"], 4),
+                    "histogram": dict(zip([f"le_{bound}" for bound in LATENCY_BUCKETS] + ["le_inf"], itertools.accumulate(latency["buckets"]))),
+                    "statusCodes": dict(self.statuses.get(route, {}))
+                }
+
+            tables = {
+                table: {**stats, "seconds": round(stats["seconds"], 3), "rowsPerSecond": round(stats["rows"] / stats["seconds"], 1) if stats["seconds"] else 0.0}
+                for table, stats in self.tables.items()
+            }
+            stages = {name: {**stats, "seconds": round(stats["seconds"], 3)} for name, stats in self.stages.items()}
+
+        return {
+            "startedAt": datetime.fromtimestamp(self.started_at).strftime("%Y-%m-%dT%H:%M:%S"),
+            "durationSeconds": round(duration, 3),
+            "api": api,
+            "tables": tables,
+            "stages": stages,
+            **(extra or {})
+        }
+
+    # Écriture du rapport JSON du run (et du fichier texte Prometheus si configuré)
+    def write_report(self, report_dir, extra=None, prometheus_file=None):
+        report = self.report(extra)
+
+        try:
+            os.makedirs(report_dir, exist_ok=True)
+            report_file = os.path.join(report_dir, f"run_{datetime.fromtimestamp(self.started_at).strftime('%Y%m%dT%H%M%S')}.json")
+            with open(report_file, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            log(f"📊 Rapport de performance écrit dans {report_file}")
+        except OSError as e:
+            log(f"⚠️ Erreur lors de l'écriture du rapport de performance : {e}")
+
+        if prometheus_file:
+            self.write_prometheus(prometheus_file)
+
+        return report
+
+    # Export au format texte Prometheus (node_exporter textfile collector), écriture atomique
+    def write_prometheus(self, prometheus_file):
+        lines = []
+        with self.lock:
+            lines.append("# TYPE drop3p_api_request_duration_seconds histogram")
+            for route, latency in self.api.items():
+                cumulative = 0
+                for bound, count in zip(list(LATENCY_BUCKETS) + ["+Inf"], latency["buckets"]):
+                    cumulative += count
+                    lines.append(f'drop3p_api_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {cumulative}')
+                lines.append(f'drop3p_api_request_duration_seconds_sum{{route="{route}"}} {latency["sum"]:.6f}')
+                lines.append(f'drop3p_api_request_duration_seconds_count{{route="{route}"}} {latency["count"]}')
+
+            lines.append("# TYPE drop3p_api_responses_total counter")
+            for route, route_statuses in self.statuses.items():
+                for status, count in route_statuses.items():
+                    lines.append(f'drop3p_api_responses_total{{route="{route}",status="{status}"}} {count}')
+
+            lines.append("# TYPE drop3p_db_rows_total counter")
+            for table, stats in self.tables.items():
+                lines.append(f'drop3p_db_rows_total{{table="{table}"}} {stats["rows"]}')
+            lines.append("# TYPE drop3p_db_write_seconds_total counter")
+            for table, stats in self.tables.items():
+                lines.append(f'drop3p_db_write_seconds_total{{table="{table}"}} {stats["seconds"]:.6f}')
+
+            lines.append("# TYPE drop3p_stage_seconds_total counter")
+            for name, stats in self.stages.items():
+                lines.append(f'drop3p_stage_seconds_total{{stage="{name}"}} {stats["seconds"]:.6f}')
+
+            lines.append("# TYPE drop3p_run_duration_seconds gauge")
+            lines.append(f"drop3p_run_duration_seconds {time.time() - self.started_at:.3f}")
+
+        try:
+            prometheus_dir = os.path.dirname(prometheus_file)
+            if prometheus_dir:
+                os.makedirs(prometheus_dir, exist_ok=True)
+            tmp_file = f"{prometheus_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp_file, prometheus_file)
+        except OSError as e:
+            log(f"⚠️ Erreur lors de l'écriture des métriques Prometheus : {e}")
+
+
+# Instance partagée par les appels API, les écritures en base et les étapes de main
+metrics = Metrics()
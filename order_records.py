@@ -0,0 +1,78 @@
+from collections import namedtuple
+from logger import Logger
+
+log = Logger.write_log
+
+# Champs d'une ligne TM_MAD_DROPFR_ventes, dans l'ordre des colonnes de la table (ORDERS_COLUMNS)
+ORDER_LINE_FIELDS = (
+    "orderId", "reference", "sellerid", "customerReference", "siteId", "companyName", "purchasedAt", "updatedAt", "createdAt", "shippedAtMax", "status",
+    "offerid", "productId", "unitSalesPrice", "shippingCost", "comm_amountWithoutVat", "comm_rate", "promisedAtMin", "promisedAtMax",
+    "parcelNumber", "carrierName", "trackingUrl"
+)
+
+# Valeurs par défaut partagées : aucun dictionnaire créé pour un champ absent
+EMPTY = {}
+EMPTY_LIST = (EMPTY,)
+
+
+# Ligne de commande compacte (tuple sans __dict__) : sert directement de paramètres SQL positionnels
+class OrderLine(namedtuple("OrderLine", ORDER_LINE_FIELDS)):
+
+    __slots__ = ()
+
+    # Clé du contrôle de doublon (orderId, productId, siteId)
+    @property
+    def key(self):
+        return (self.orderId, self.productId, self.siteId)
+
+
+# Mise à plat en une passe : une OrderLine par ligne de commande (les colis multiples sont concaténés par ";")
+# resolve_site_id : résolution du siteId à partir de la référence client, une fois par commande
+# Chaque ligne est construite d'un seul tuple, sans dictionnaire ni tuple intermédiaire
+def flatten_orders(orders, resolve_site_id):
+    new_line = tuple.__new__
+
+    for order in orders:
+        order_id = order.get("orderId")
+        if not order_id:
+            log("⚠️ orderId manquant, insertion ignorée")
+            continue
+
+        customer_reference = (order.get("customer") or EMPTY).get("reference")
+        reference = order.get("reference")
+        seller_id = (order.get("seller") or EMPTY).get("id")
+        site_id = resolve_site_id(customer_reference)
+        company_name = (order.get("billingAddress") or EMPTY).get("companyName")
+        purchased_at = order.get("purchasedAt")
+        updated_at = order.get("updatedAt")
+        created_at = order.get("createdAt")
+        shipped_at_max = order.get("shippedAtMax")
+        status = order.get("status")
+
+        for line in order.get("lines") or EMPTY_LIST:
+            offer = line.get("offer") or EMPTY
+            offer_price = line.get("offerPrice") or EMPTY
+            commission = offer_price.get("commission") or EMPTY
+            delivery = line.get("delivery") or EMPTY
+
+            # Colis multiples : un champ absent d'un colis laisse une valeur vide entre les séparateurs
+            parcels = line.get("parcels") or EMPTY_LIST
+            if len(parcels) > 1:
+                parcel_number = ";".join(parcel.get("parcelNumber") or "" for parcel in parcels)
+                carrier_name = ";".join(parcel.get("carrierName") or "" for parcel in parcels)
+                tracking_url = ";".join(parcel.get("trackingUrl") or "" for parcel in parcels)
+            else:
+                parcel = parcels[0]
+                parcel_number = parcel.get("parcelNumber")
+                carrier_name = parcel.get("carrierName")
+                tracking_url = parcel.get("trackingUrl")
+
+            yield new_line(OrderLine, (
+                order_id, reference, seller_id, customer_reference, site_id, company_name,
+                purchased_at, updated_at, created_at, shipped_at_max, status,
+                offer.get("id"), offer.get("productId"),
+                offer_price.get("unitSalesPrice", 0.0), offer_price.get("shippingCost", 0.0),
+                commission.get("amountWithoutVat", 0.0), commission.get("rate", 0.0),
+                delivery.get("promisedAtMin"), delivery.get("promisedAtMax"),
+                parcel_number, carrier_name, tracking_url
+            ))
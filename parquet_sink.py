@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+
+from config import Config
+from sink_base import OutputSink, ORDERS_COLUMNS, TABLES, TABLE_COLUMNS
+from logger import Logger
+from metrics import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+sink_config = Config.SINK_CONFIG
+log = Logger.write_log
+
+
+class ParquetConnection:
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# Chargement dans des fichiers Parquet (--sink parquet), un fichier <table>.parquet par table, pour l'analyse.
+# Les tables sont tenues en mémoire pendant le run (relues depuis les fichiers existants en synchro incrémentale)
+# et écrites en colonnes en une fois par finalize_load : un run en échec ne publie rien, pas de reprise possible
+class ParquetSink(OutputSink):
+
+    durable_writes = False
+
+    def __init__(self, output_dir=None):
+        if pa is None:
+            raise RuntimeError("pyarrow est requis pour --sink parquet (pip install pyarrow)")
+
+        super().__init__()
+        self.output_dir = output_dir or sink_config["PARQUET_DIR"]
+        self.tables = {}            # {table: lignes (dictionnaires)}, chargées à la première utilisation
+        self.order_keys = set()     # Clés (orderId, productId, siteId) de TM_MAD_DROPFR_ventes
+        self.lock = threading.Lock()
+
+    def table_file(self, table):
+        return os.path.join(self.output_dir, f"{table}.parquet")
+
+    def get_db_connection(self):
+        return ParquetConnection(), True
+
+    def check_connection(self, conn):
+        return True
+
+    # Lignes d'une table, relues depuis son fichier au premier accès (appel sous self.lock)
+    def _rows(self, table):
+        if table not in self.tables:
+            table_file = self.table_file(table)
+            self.tables[table] = pq.read_table(table_file).to_pylist() if os.path.exists(table_file) else []
+            if table == "TM_MAD_DROPFR_ventes":
+                self._index_order_keys()
+        return self.tables[table]
+
+    def _index_order_keys(self):
+        self.order_keys = {(row["orderId"], row["productId"], row["siteId"]) for row in self.tables["TM_MAD_DROPFR_ventes"]}
+
+    def _delete(self, table, column, keys):
+        keys = set(k for k in keys if k is not None)
+        rows = self._rows(table)
+        if not keys:
+            return 0
+
+        kept = [row for row in rows if row.get(column) not in keys]
+        self.tables[table] = kept
+        if table == "TM_MAD_DROPFR_ventes":
+            self._index_order_keys()
+        return len(rows) - len(kept)
+
+    # siteID lus depuis TM_MAD_SiteID.parquet (colonnes ID_CDS, siteID) s'il existe dans le dossier de sortie
+    def load_site_ids(self, conn, refresh=False):
+        if self.site_ids is not None and not refresh:
+            return self.site_ids
+
+        site_id_file = self.table_file("TM_MAD_SiteID")
+        try:
+            rows = pq.read_table(site_id_file, columns=["ID_CDS", "siteID"]).to_pylist() if os.path.exists(site_id_file) else []
+            self.site_ids = {str(row["ID_CDS"]).strip(): row["siteID"] for row in rows if row["ID_CDS"] is not None}
+            self.site_ids_loaded_at = time.monotonic()
+            log(f"📍 {len(self.site_ids)} siteID chargés depuis {site_id_file}")
+
+        except Exception as e:
+            log(f"❌ Erreur lors du chargement des siteID : {e}")
+            if self.site_ids is None:
+                self.site_ids = {}
+
+        return self.site_ids
+
+    def truncate_table(self, conn, table):
+        with self.lock:
+            deleted_rows = len(self._rows(table))
+            self.tables[table] = []
+            if table == "TM_MAD_DROPFR_ventes":
+                self.order_keys = set()
+            return deleted_rows
+
+    # Rien n'est publié avant finalize_load : les tables fantômes se réduisent au vidage des tables en mémoire
+    def prepare_shadow_tables(self, conn, truncate=True):
+        if truncate:
+            for table in TABLES:
+                self.truncate_table(conn, table)
+        return True
+
+    def swap_shadow_tables(self, conn):
+        return True
+
+    # Dédoublonnage sur (orderId, productId, siteId) avec les lignes déjà chargées et dans le lot
+    # (replace=True : lignes existantes des commandes remplacées)
+    @metrics.track_rows("TM_MAD_DROPFR_ventes")
+    def insert_orders_data_bulk(self, conn, orders, replace=False):
+        rows = list(self.build_order_rows(conn, orders))
+        insert_count = 0
+
+        with self.lock:
+            if replace:
+                self._delete("TM_MAD_DROPFR_ventes", "orderId", [order_line.orderId for order_line in rows])
+            table_rows = self._rows("TM_MAD_DROPFR_ventes")
+            for order_line in rows:
+                key = order_line.key
+                if order_line.productId is not None and key in self.order_keys:
+                    continue
+                self.order_keys.add(key)
+                table_rows.append(dict(zip(ORDERS_COLUMNS, order_line)))
+                insert_count += 1
+
+        if rows:
+            log(f"📝 {insert_count} lignes de commandes ajoutées à TM_MAD_DROPFR_ventes ({len(rows) - insert_count} doublons ignorés)")
+        return insert_count
+
+    insert_orders_data = insert_orders_data_bulk
+
+    def write_batch(self, conn, deletes, inserts):
+        inserted = {}
+        with self.lock:
+            for table, column, keys in deletes:
+                self._delete(table, column, keys)
+
+            for table, rows in inserts.items():
+                started_at = time.perf_counter()
+                self._rows(table).extend(rows)
+                inserted[table] = len(rows)
+                metrics.observe_rows(table, len(rows), time.perf_counter() - started_at)
+
+        return inserted
+
+    # Colonne Arrow typée par inférence ; texte si ses valeurs mélangent plusieurs types
+    @staticmethod
+    def build_column(values):
+        try:
+            return pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+    # Écriture des tables chargées, une colonne Arrow par colonne de table ; chaque fichier est remplacé atomiquement
+    def finalize_load(self, conn):
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+
+            with self.lock:
+                for table, rows in self.tables.items():
+                    columns = TABLE_COLUMNS[table]
+                    arrow_table = pa.table({column: self.build_column([row.get(column) for row in rows]) for column in columns})
+
+                    table_file = self.table_file(table)
+                    tmp_file = f"{table_file}.tmp"
+                    pq.write_table(arrow_table, tmp_file)
+                    os.replace(tmp_file, table_file)
+                    log(f"💾 {len(rows)} lignes écrites dans {table_file}")
+
+            return True
+
+        except Exception as e:
+            log(f"❌ Erreur lors de l'écriture des fichiers Parquet : {e}")
+            return False
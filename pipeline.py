@@ -0,0 +1,89 @@
+import queue
+import threading
+
+from logger import Logger
+
+log = Logger.write_log
+
+# Marqueur de fin de flux transmis d'un étage à l'autre
+END_OF_STREAM = object()
+
+
+class Pipeline:
+
+    def __init__(self, queue_size):
+        self.queue_size = queue_size    # Taille maximale de chaque file entre deux étages (borne la mémoire)
+        self.stages = []                # [(nom, fonction)] : la fonction reçoit un élément et renvoie les éléments de l'étage suivant
+        self.errors = []
+        self.stop_event = threading.Event()
+
+    def add_stage(self, name, handler):
+        self.stages.append((name, handler))
+        return self
+
+    # Dépose un élément dans une file pleine en attendant, sauf si le pipeline est arrêté sur erreur
+    def _put(self, target_queue, item):
+        while not self.stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source_queue):
+        while not self.stop_event.is_set():
+            try:
+                return source_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return END_OF_STREAM
+
+    # Boucle d'un étage : consomme sa file d'entrée et alimente la file de l'étage suivant
+    def _run_stage(self, name, handler, input_queue, output_queue):
+        try:
+            while True:
+                item = self._get(input_queue)
+                if item is END_OF_STREAM:
+                    break
+
+                for output in handler(item) or ():
+                    if output_queue is not None and not self._put(output_queue, output):
+                        return
+
+        except Exception as e:
+            log(f"❌ Erreur dans l'étage '{name}' du pipeline : {e}")
+            self.errors.append(e)
+            self.stop_event.set()
+
+        finally:
+            if output_queue is not None:
+                self._put(output_queue, END_OF_STREAM)
+
+    # Exécute le pipeline : la source (générateur) est consommée dans le thread appelant
+    def run(self, source):
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = []
+
+        for index, (name, handler) in enumerate(self.stages):
+            output_queue = queues[index + 1] if index + 1 < len(queues) else None
+            thread = threading.Thread(target=self._run_stage, args=(name, handler, queues[index], output_queue), name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        try:
+            for item in source:
+                if not self._put(queues[0], item):
+                    break
+        except Exception as e:
+            log(f"❌ Erreur dans la source du pipeline : {e}")
+            self.errors.append(e)
+            self.stop_event.set()
+        finally:
+            self._put(queues[0], END_OF_STREAM)
+
+        for thread in threads:
+            thread.join()
+
+        if self.errors:
+            raise self.errors[0]
@@ -0,0 +1,116 @@
+import threading
+import time
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)                                   # Jetons ajoutés par seconde
+        self.capacity = float(capacity or max(1.0, self.rate))    # Nombre maximum d'appels en rafale
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    # Recharge le seau en fonction du temps écoulé depuis la dernière mise à jour
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    # Bloque jusqu'à ce qu'un jeton soit disponible (et que la pause imposée par l'API soit terminée)
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    # Suspend les appels pendant `delay` secondes (réponse 429/503) et vide le seau
+    def penalize(self, delay):
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.tokens = 0.0
+            self.updated_at = now
+
+
+# Seau partagé entre processus : même algorithme, état (jetons, dernière recharge, fin de pause) en mémoire partagée
+class SharedTokenBucket(TokenBucket):
+
+    def __init__(self, rate, capacity, context):
+        self.state = context.RawArray("d", 3)
+        super().__init__(rate, capacity)
+        self.lock = context.Lock()
+
+    tokens = property(lambda self: self.state[0], lambda self, value: self.state.__setitem__(0, value))
+    updated_at = property(lambda self: self.state[1], lambda self, value: self.state.__setitem__(1, value))
+    blocked_until = property(lambda self: self.state[2], lambda self, value: self.state.__setitem__(2, value))
+
+
+class RateLimiter:
+
+    def __init__(self, rates, default_rate=1.0, burst=None):
+        self.default_rate = default_rate
+        self.burst = burst
+        self.buckets = {route: TokenBucket(rate, burst) for route, rate in rates.items()}
+        self.lock = threading.Lock()
+
+    # Récupère (ou crée) le seau associé à une route
+    def get_bucket(self, route):
+        with self.lock:
+            if route not in self.buckets:
+                self.buckets[route] = TokenBucket(self.default_rate, self.burst)
+            return self.buckets[route]
+
+    # Passage en seaux partagés (routes connues et extra_routes) : le quota devient commun au processus courant
+    # et aux workers auxquels les seaux renvoyés sont transmis (attach)
+    def share(self, context, extra_routes=()):
+        with self.lock:
+            for route in list(self.buckets) + [route for route in extra_routes if route not in self.buckets]:
+                bucket = self.buckets.get(route) or TokenBucket(self.default_rate, self.burst)
+                if not isinstance(bucket, SharedTokenBucket):
+                    self.buckets[route] = SharedTokenBucket(bucket.rate, bucket.capacity, context)
+            return dict(self.buckets)
+
+    def attach(self, buckets):
+        with self.lock:
+            self.buckets.update(buckets)
+
+    def acquire(self, route):
+        self.get_bucket(route).acquire()
+
+    def penalize(self, route, delay):
+        self.get_bucket(route).penalize(delay)
+
+    # Convertit l'en-tête Retry-After (secondes ou date HTTP) en délai en secondes
+    @staticmethod
+    def parse_retry_after(value, default):
+        if not value:
+            return default
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            retry_at = parsedate_to_datetime(value)
+            if retry_at.tzinfo is None:
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return default
@@ -0,0 +1,84 @@
+from logger import Logger
+from response_archive import ResponseArchive
+
+log = Logger.write_log
+
+# Réponses de l'archive rejouée, indexées par type puis par clé (les pages de commandes sont relues en flux)
+replay_state = {"archive_file": None, "header": {}, "order": {}, "product": {}, "category": {}, "pages": 0, "runs": 0, "completed": False}
+
+
+# Remplaçant hors ligne de RequestsAPI pour --replay : mêmes méthodes que celles utilisées par main,
+# les réponses viennent d'une archive ResponseArchive, sans appel réseau ni quota
+class ReplayAPI:
+
+    # Premier passage sur l'archive : en-tête du run et index des détails, produits et catégories
+    def load(archive_file):
+        replay_state.update({"archive_file": archive_file, "header": {}, "order": {}, "product": {}, "category": {}, "pages": 0, "runs": 0, "completed": False})
+
+        for record in ResponseArchive.read(archive_file):
+            record_type = record.get("type")
+            if record_type == "run":
+                replay_state["header"] = record.get("data") or {}
+                replay_state["runs"] += 1
+            elif record_type == "orders_page":
+                replay_state["pages"] += 1
+            elif record_type in ("order", "product", "category"):
+                replay_state[record_type][record.get("key")] = record.get("data")
+            elif record_type == "end":
+                replay_state["completed"] = True
+
+        log(f"📼 Rejeu de {archive_file} : {replay_state['pages']} pages de commandes, {len(replay_state['order'])} détails, {len(replay_state['product'])} produits, {len(replay_state['category'])} catégories\n")
+        return replay_state["header"]
+
+    # Motif du refus de rejouer l'archive chargée, None si elle est rejouable : seule l'archive d'un run réussi,
+    # ni repris ni réparti, contient toutes les réponses du chargement (sinon le rejeu publierait des tables partielles)
+    def unreplayable_reason():
+        header = replay_state["header"]
+        if replay_state["runs"] != 1:
+            return f"{replay_state['runs']} en-têtes de run, une archive ne doit contenir qu'un seul run"
+        if not replay_state["completed"]:
+            return "run interrompu ou en erreur (pas d'enregistrement de fin), archive partielle"
+        if header.get("resumed"):
+            return "run repris depuis un checkpoint, l'archive ne contient que la fin du chargement"
+        if header.get("sharded"):
+            return "run réparti, les réponses des processus workers ne sont pas archivées"
+        return None
+
+    def get_access_token():
+        return "replay"
+
+    # Second passage : pages de commandes dans l'ordre de l'archive
+    def get_orders_info(access_token, updated_at_min=None, start_page=1, page_size=None, page_workers=None, created_at_window=None):
+        for record in ResponseArchive.read(replay_state["archive_file"]):
+            if record.get("type") == "orders_page" and record.get("key", 0) >= start_page:
+                log(f"📜 Rejeu des commandes - Page {record['key']}")
+                yield record["data"]
+
+        log("🔚 Fin du rejeu des commandes.\n")
+
+    # Les détails archivés complètent les commandes de la liste ; sans détail, la commande de la liste sert de détail
+    def get_orders_details_by_policy(access_token, orders, policy=None):
+        orders = [{**order, **replay_state["order"][order.get("orderId")]} if order.get("orderId") in replay_state["order"] else order for order in orders]
+        return orders, list(orders)
+
+    def get_product_info(access_token, product_id):
+        product = replay_state["product"].get(product_id)
+        if product is None:
+            log(f"⚠️ Produit {product_id} absent de l'archive")
+        return product
+
+    def get_categories_info(access_token, category_reference):
+        return replay_state["category"].get(category_reference)
+
+    # Rien à sauvegarder ni à archiver pendant un rejeu
+    def save_category_cache():
+        pass
+
+    def open_archive(run_id, header):
+        pass
+
+    def close_archive(completed=False):
+        pass
+
+    def get_connection_stats():
+        return {"requests": 0, "connections": 0, "reused": 0}
@@ -0,0 +1,88 @@
+import glob
+import gzip
+import json
+import os
+import threading
+import zlib
+
+from logger import Logger
+
+log = Logger.write_log
+
+
+class ResponseArchive:
+
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        self.archive_file = None
+        self.writer = None
+        self.lock = threading.Lock()
+        self.records = 0
+        self.seen = set()       # (type, clé) déjà archivés pendant le run (catégories lues en cache)
+
+    # Ouverture de l'archive du run (gzip JSONL, fichier créé en exclusivité : un run n'écrit jamais dans l'archive
+    # d'un autre) ; l'en-tête décrit le run pour le rejeu
+    def open(self, run_id, header):
+        try:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            self.archive_file = os.path.join(self.archive_dir, f"run_{run_id}.jsonl.gz")
+            self.writer = gzip.open(self.archive_file, "xt", encoding="utf-8", compresslevel=6)
+            self.records = 0
+            self.seen = set()
+            self.record("run", run_id, header)
+            log(f"🗜️ Archivage des réponses API dans {self.archive_file}")
+        except OSError as e:
+            log(f"⚠️ Archivage des réponses API impossible : {e}")
+            self.writer = None
+
+    # Ajout d'une réponse : type ("orders_page", "order", "product", "category"), clé et contenu JSON
+    def record(self, record_type, key, data, once=False):
+        if self.writer is None:
+            return
+
+        line = json.dumps({"type": record_type, "key": key, "data": data}, ensure_ascii=False)
+        with self.lock:
+            if once:
+                if (record_type, key) in self.seen:
+                    return
+                self.seen.add((record_type, key))
+
+            try:
+                self.writer.write(line + "\n")
+                self.records += 1
+            except (OSError, ValueError) as e:
+                log(f"⚠️ Erreur d'écriture dans l'archive, archivage arrêté : {e}")
+                self.writer = None
+
+    # Fermeture de l'archive ; completed=True (run réussi) ajoute l'enregistrement de fin qui rend l'archive rejouable
+    def close(self, completed=False):
+        if completed:
+            self.record("end", None, {"status": "success", "records": self.records})
+
+        with self.lock:
+            if self.writer is None:
+                return
+            try:
+                self.writer.close()
+                log(f"🗜️ Archive fermée : {self.records} réponses dans {self.archive_file}")
+            except OSError as e:
+                log(f"⚠️ Erreur lors de la fermeture de l'archive : {e}")
+            self.writer = None
+
+    # Dernière archive écrite (None si aucune)
+    def latest(self):
+        archive_files = sorted(glob.glob(os.path.join(self.archive_dir, "run_*.jsonl.gz")))
+        return archive_files[-1] if archive_files else None
+
+    # Lecture des enregistrements d'une archive ; une fin tronquée (run interrompu) arrête la lecture sans erreur
+    @staticmethod
+    def read(archive_file):
+        try:
+            with gzip.open(archive_file, "rt", encoding="utf-8") as reader:
+                for line in reader:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        log(f"⚠️ Enregistrement illisible ignoré dans {archive_file}")
+        except (EOFError, zlib.error, gzip.BadGzipFile) as e:
+            log(f"⚠️ Archive tronquée, lecture arrêtée : {e}")
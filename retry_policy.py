@@ -0,0 +1,65 @@
+import random
+import threading
+import time
+
+from logger import Logger
+
+log = Logger.write_log
+
+# Réponses considérées comme des pannes passagères (429 et 503 avec Retry-After relèvent du quota)
+TRANSIENT_STATUSES = (500, 502, 503, 504)
+
+
+class RetryPolicy:
+
+    def __init__(self, max_retries, base_delay, max_delay):
+        self.max_retries = max_retries      # Nouvelles tentatives après une panne passagère
+        self.base_delay = base_delay        # Attente (s) avant la première nouvelle tentative, doublée ensuite
+        self.max_delay = max_delay          # Attente maximale (s) entre deux tentatives
+
+    # Attente avant la tentative suivante : backoff exponentiel avec gigue complète (tirage entre 0 et le plafond)
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+# Disjoncteur par route : après `failure_threshold` pannes consécutives, les appels de la route sont suspendus
+# (pause du seau du limiteur de débit) ; un échec à la reprise rouvre le circuit pour une durée doublée
+class CircuitBreaker:
+
+    def __init__(self, rate_limiter, failure_threshold, reset_timeout, max_reset_timeout):
+        self.rate_limiter = rate_limiter
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout          # Première suspension (s)
+        self.max_reset_timeout = max_reset_timeout  # Suspension maximale (s)
+        self.failures = {}                          # {route: pannes consécutives}
+        self.timeouts = {}                          # {route: durée de la dernière suspension}
+        self.open_until = {}                        # {route: fin de la suspension en cours}
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def record_success(self, route):
+        with self.lock:
+            was_open = route in self.timeouts
+            self.failures[route] = 0
+            self.timeouts.pop(route, None)
+
+        if was_open:
+            log(f"🟢 Circuit refermé sur {route}, reprise normale des appels")
+
+    def record_failure(self, route):
+        with self.lock:
+            failures = self.failures.get(route, 0) + 1
+            self.failures[route] = failures
+            now = time.monotonic()
+
+            # Les réponses des appels partis avant l'ouverture ne rouvrent pas le circuit
+            if failures < self.failure_threshold or now < self.open_until.get(route, 0):
+                return
+
+            timeout = min(self.max_reset_timeout, self.timeouts[route] * 2) if route in self.timeouts else self.reset_timeout
+            self.timeouts[route] = timeout
+            self.open_until[route] = now + timeout
+            self.opened += 1
+
+        log(f"🔌 Circuit ouvert sur {route} après {failures} échecs consécutifs : appels suspendus {timeout:.1f}s")
+        self.rate_limiter.penalize(route, timeout)
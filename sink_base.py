@@ -0,0 +1,245 @@
+import time
+
+from config import Config
+from logger import Logger
+from metrics import metrics
+from order_records import flatten_orders
+from datetime import datetime
+
+load_config = Config.DB_LOAD_CONFIG
+log = Logger.write_log
+
+# Colonnes de TM_MAD_DROPFR_ventes, dans l'ordre des champs des OrderLine construites par build_order_rows
+ORDERS_COLUMNS = [
+    "orderId", "reference", "sellerid", "customerReference", "siteId", "companyName", "purchasedAt", "updatedAt", "createdAt", "shippedAtMax", "Status",
+    "offerid", "productId", "unitSalesPrice", "shippingCost", "comm_amountWithoutVat", "comm_rate", "promisedAtMin", "promisedAtMax",
+    "parcelNumber", "carrierName", "trackingUrl"
+]
+
+# Colonnes des tables produits, catégories et attributs (clés des lignes construites par build_*_rows)
+BATCH_COLUMNS = {
+    "TM_MAD_DROPFR_Products": [
+        "ProductId", "GENCOD", "title", "description", "brand",
+        "image1", "image2", "image3", "image4", "image5", "image6",
+        "dateCreation", "dateUpdate", "category"
+    ],
+    "TM_MAD_DROPFR_Categories": ["categoryId1", "label1", "categoryId2", "label2", "categoryId3", "label3", "isActive"],
+    "TM_MAD_DROPFR_Attributes": ["productId", "code", "label", "value", "dateUpdate"]
+}
+
+# Tables alimentées par le chargement et suffixe de leurs tables fantômes (rechargement par échange)
+TABLES = ["TM_MAD_DROPFR_ventes", "TM_MAD_DROPFR_Products", "TM_MAD_DROPFR_Categories", "TM_MAD_DROPFR_Attributes"]
+SHADOW_SUFFIX = "_shadow"
+
+# Colonnes de chaque table alimentée, dans l'ordre des tables créées par les sinks SQLite et Parquet
+TABLE_COLUMNS = {"TM_MAD_DROPFR_ventes": ORDERS_COLUMNS, **BATCH_COLUMNS}
+
+
+# Base des sinks (--sink) sans pilote de base de données : index des siteID, mise à plat des commandes, produits
+# et attributs en lignes, vidage des tables. Chaque sink fournit ses connexions, load_site_ids, truncate_table,
+# write_batch, l'insertion des commandes et les tables fantômes
+class OutputSink:
+
+    durable_writes = True       # Écritures validées au fil du run : reprise (--resume) et rechargement réparti possibles
+
+    def __init__(self):
+        self.site_ids = None            # Index {ID_CDS: siteID} chargé depuis TM_MAD_SiteID
+        self.site_ids_loaded_at = 0.0
+        self.table_names = {table: table for table in TABLES}  # Table physique visée par les écritures (publiée ou fantôme)
+
+    # Fin d'un chargement réussi : rien à publier quand les écritures sont validées au fil du run
+    def finalize_load(self, conn):
+        return True
+
+    ### SECTION ORDERS ###
+    # Suppression des données de la table TM_MAD_DROPFR_ventes
+    def delete_orders_data(self, conn):
+        table = self.table_names["TM_MAD_DROPFR_ventes"]
+        deleted_rows = self.truncate_table(conn, table)
+        if deleted_rows is None:
+            return 0
+
+        if deleted_rows > 0:
+            log(f"✅ {deleted_rows} commandes supprimées de {table}")
+        else:
+            log(f"ℹ️ Aucune commande à supprimer dans {table}")
+
+        return deleted_rows
+
+    # Récupération du siteId pour l'insérer dans la table TM_MAD_DROPFR_ventes (depuis l'index en mémoire)
+    def get_site_id(self, conn, customer_reference):
+        if customer_reference is None:
+            return 0
+
+        self.load_site_ids(conn)
+        key = str(customer_reference).strip()
+        site_id = self.site_ids.get(key)
+
+        # Référence inconnue : rechargement de l'index si l'intervalle de rafraîchissement est écoulé
+        refresh_interval = load_config["SITE_ID_REFRESH_INTERVAL"]
+        if site_id is None and refresh_interval > 0 and time.monotonic() - self.site_ids_loaded_at >= refresh_interval:
+            site_id = self.load_site_ids(conn, refresh=True).get(key)
+
+        if not site_id:
+            log(f"⚠️ Aucun siteID trouvé pour le client {customer_reference}")
+            return 0
+
+        return site_id
+
+    # Mise à plat des commandes en OrderLine : une ligne TM_MAD_DROPFR_ventes par ligne de commande
+    # Le siteId est résolu pour chaque commande depuis l'index TM_MAD_SiteID
+    def build_order_rows(self, conn, orders):
+        return flatten_orders(orders, lambda customer_reference: self.get_site_id(conn, customer_reference))
+
+    ### SECTION PRODUCTS ###
+    # Suppression des données de la table TM_MAD_DROPFR_Products
+    def delete_products_data(self, conn):
+        table = self.table_names["TM_MAD_DROPFR_Products"]
+        deleted_rows = self.truncate_table(conn, table)
+        if deleted_rows is None:
+            return 0
+
+        if deleted_rows > 0:
+            log(f"✅ {deleted_rows} produits supprimés de {table}")
+        else:
+            log(f"ℹ️ Aucun produit à supprimer dans {table}")
+
+        return deleted_rows
+
+    # Mise à plat des produits : une ligne TM_MAD_DROPFR_Products par produit (6 images au plus)
+    def build_product_rows(self, products):
+        for product in products:
+            product_id = product.get("productId", None)
+            if product_id == None:
+                log("⚠️ ProductId manquant, insertion ignorée")
+                continue
+            
+            common_data = {
+                "ProductId": product_id,
+                "GENCOD": product.get("gtin", None),
+                "title": product.get("title", None),
+                "description": product.get("description", None),
+                "brand": product.get("brand", {}).get("label", None),
+                "dateCreation": product.get("createdAt", None),
+                "dateUpdate": product.get("updatedAt", None),
+                "category": product.get("category", None)
+            }
+
+             # Récupération des images (max 6, compléter avec None si besoin)
+            images = [img.get("url", None) for img in product.get("images", [])][:6]
+            images += [None] * (6 - len(images))  # Remplissage avec None si moins de 6 images
+
+            yield {**common_data, **dict(zip(["image1", "image2", "image3", "image4", "image5", "image6"], images))}
+
+    ### SECTION CATEGORIES ###
+    # Suppression des données de la table TM_MAD_DROPFR_Categories
+    def delete_categories_data(self, conn):
+        table = self.table_names["TM_MAD_DROPFR_Categories"]
+        deleted_rows = self.truncate_table(conn, table)
+        if deleted_rows is None:
+            return 0
+
+        if deleted_rows > 0:
+            log(f"✅ {deleted_rows} catégories supprimées de {table}")
+        else:
+            log(f"ℹ️ Aucune catégorie à supprimer dans {table}")
+
+        return deleted_rows
+
+    ### SECTION ATTRIBUTES ###
+    # Suppression des données de la table TM_MAD_DROPFR_Categories
+    def delete_attributes_data(self, conn):
+        table = self.table_names["TM_MAD_DROPFR_Attributes"]
+        deleted_rows = self.truncate_table(conn, table)
+        if deleted_rows is None:
+            return 0
+
+        if deleted_rows > 0:
+            log(f"✅ {deleted_rows} attributs supprimés de {table}\n")
+        else:
+            log(f"ℹ️ Aucun attribut à supprimer dans {table}\n")
+
+        return deleted_rows
+
+    # Mise à plat des attributs : une ligne TM_MAD_DROPFR_Attributes par attribut de produit
+    def build_attribute_rows(self, products):
+        for product in products:
+            product_id = product.get("productId", None)
+            if product_id == None:
+                log("⚠️ ProductId manquant, insertion ignorée")
+                continue
+            
+            attributes = product.get("attributes", [])                
+            if not attributes:
+                continue
+
+            common_data = {
+                "productId": product_id
+            }
+
+            for attribute in attributes:
+                attributes_data = {
+                    "code": attribute.get("code"),
+                    "label": attribute.get("label"),
+                    "value": ', '.join(attribute.get("values")) if isinstance(attribute.get("values"), list) else attribute.get("values"),
+                    "dateUpdate": datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+                }
+                
+                yield {**common_data, **attributes_data}
+
+
+# Sinks SQL (pilote DB-API) : suppressions par clés et écriture des lots en requêtes multi-lignes, avec le marqueur
+# de paramètre du pilote
+class SQLOutputSink(OutputSink):
+
+    placeholder = "%s"          # Marqueur de paramètre du pilote (pymssql)
+
+    # Suppressions par clés dans la transaction en cours (par lots, limite de 2100 paramètres SQL Server), sans commit
+    def delete_keys(self, cursor, table, column, keys, chunk_size=1000):
+        keys = list(dict.fromkeys(k for k in keys if k is not None))
+        deleted_rows = 0
+
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            placeholders = ", ".join([self.placeholder] * len(chunk))
+            cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", tuple(chunk))
+            deleted_rows += cursor.rowcount
+
+        return deleted_rows
+
+    # Écriture d'un lot dans une seule transaction : suppressions [(table, colonne, clés)] puis insertions {table: lignes}
+    # en requêtes multi-lignes ; renvoie le nombre de lignes insérées par table, None en cas d'erreur (lot annulé)
+    def write_batch(self, conn, deletes, inserts):
+        try:
+            cursor = conn.cursor()
+            inserted = {}
+
+            for table, column, keys in deletes:
+                self.delete_keys(cursor, self.table_names[table], column, keys)
+
+            for table, rows in inserts.items():
+                started_at = time.perf_counter()
+                columns = BATCH_COLUMNS[table]
+                rows_per_statement = max(1, min(load_config["BULK_BATCH_SIZE"], 2000 // len(columns)))
+                row_placeholders = "(" + ", ".join([self.placeholder] * len(columns)) + ")"
+
+                for start in range(0, len(rows), rows_per_statement):
+                    batch = rows[start:start + rows_per_statement]
+                    cursor.execute(
+                        f"INSERT INTO {self.table_names[table]} ({', '.join(columns)}) VALUES " + ", ".join([row_placeholders] * len(batch)),
+                        tuple(row[column] for row in batch for column in columns)
+                    )
+
+                inserted[table] = len(rows)
+                metrics.observe_rows(table, len(rows), time.perf_counter() - started_at)
+
+            conn.commit()
+            return inserted
+
+        except Exception as e:
+            log(f"❌ Erreur lors de l'écriture du lot : {e}")
+            conn.rollback()
+            return None
+
+        finally:
+            cursor.close()
@@ -0,0 +1,33 @@
+import os
+
+# Destinations du chargement (--sink). Un sink (OutputSink, sink_base.py) expose la surface utilisée par main.py :
+#   get_db_connection / check_connection       connexions du pool
+#   load_site_ids / build_order_rows           index TM_MAD_SiteID et mise à plat des commandes
+#   insert_orders_data(_bulk) / write_batch    insertions (commandes, lots produits / catégories / attributs)
+#   truncate_table                             vidages (delete_*_data)
+#   prepare_shadow_tables / swap_shadow_tables rechargement complet par échange
+#   finalize_load                              publication en fin de run réussi (fichiers Parquet)
+# durable_writes=False : rien n'est écrit avant finalize_load, pas de reprise (--resume) ni de run réparti (--shards)
+SINKS = ("mssql", "sqlite", "parquet")
+
+
+def build_sink(name):
+    if name == "sqlite":
+        from sqlite_sink import SQLiteSink
+        return SQLiteSink()
+    if name == "parquet":
+        from parquet_sink import ParquetSink
+        return ParquetSink()
+    if name == "mssql":
+        from database import DatabaseSQL
+        return DatabaseSQL()
+    raise ValueError(f"sink inconnu : {name} (attendu : {', '.join(SINKS)})")
+
+
+# Fichiers d'état (watermark, checkpoint, empreintes) propres à chaque sink : State/sync_state_sqlite.json, ...
+# Le Data Warehouse garde les fichiers d'origine
+def sink_state_file(state_file, name):
+    if name == "mssql":
+        return state_file
+    root, ext = os.path.splitext(state_file)
+    return f"{root}_{name}{ext}"
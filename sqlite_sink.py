@@ -0,0 +1,246 @@
+import os
+import sqlite3
+import time
+
+from config import Config
+from sink_base import SQLOutputSink, ORDERS_COLUMNS, TABLES, TABLE_COLUMNS, SHADOW_SUFFIX
+from logger import Logger
+from metrics import metrics
+
+sink_config = Config.SINK_CONFIG
+log = Logger.write_log
+
+ORDERS_STAGING_TABLE = "temp.TM_MAD_DROPFR_ventes_staging"
+
+# Colonnes indexées de chaque table : clés des suppressions incrémentales et du contrôle de doublon
+TABLE_KEYS = {
+    "TM_MAD_DROPFR_ventes": ["orderId", "productId", "siteId"],
+    "TM_MAD_DROPFR_Products": ["ProductId"],
+    "TM_MAD_DROPFR_Categories": ["categoryId3"],
+    "TM_MAD_DROPFR_Attributes": ["productId"]
+}
+
+
+# Chargement dans une base SQLite locale (--sink sqlite) : mêmes tables et mêmes requêtes ensemblistes que le
+# Data Warehouse, write_batch et les suppressions par clés sont ceux de SQLOutputSink avec le marqueur "?".
+# Journal WAL : plusieurs connexions (writers, processus d'un run réparti) écrivent tour à tour, en attendant le verrou
+class SQLiteSink(SQLOutputSink):
+
+    placeholder = "?"
+
+    def __init__(self, db_file=None):
+        super().__init__()
+        self.db_file = db_file or sink_config["SQLITE_FILE"]
+        self.tables_created = False
+
+    # Ouverture de la base (créée avec ses tables si besoin) ; connexion partagée entre threads par le pool
+    def get_db_connection(self):
+        conn = None
+        connected = False
+        try:
+            db_dir = os.path.dirname(self.db_file)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+
+            conn = sqlite3.connect(self.db_file, timeout=sink_config["SQLITE_BUSY_TIMEOUT"], check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+
+            if not self.tables_created:
+                self.create_tables(conn)
+                self.tables_created = True
+                log(f"✅ Base SQLite ouverte : {self.db_file} (SQLite {sqlite3.sqlite_version})")
+            connected = True
+
+        except sqlite3.Error as e:
+            log(f"⛔️ Échec d'ouverture de la base SQLite {self.db_file} : {e}")
+            if conn:
+                conn.close()
+                conn = None
+
+        return conn, connected
+
+    # Tables publiées, TM_MAD_SiteID (à alimenter avec les siteID) et index des clés
+    def create_tables(self, conn):
+        cursor = conn.cursor()
+        try:
+            for table in TABLES:
+                self.create_table(cursor, table, table)
+            cursor.execute("CREATE TABLE IF NOT EXISTS TM_MAD_SiteID (ID_CDS, siteID)")
+            conn.commit()
+        finally:
+            cursor.close()
+
+    def create_table(self, cursor, table, physical_table):
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {physical_table} ({', '.join(TABLE_COLUMNS[table])})")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS ix_{physical_table}_key ON {physical_table} ({', '.join(TABLE_KEYS[table])})")
+
+    def check_connection(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+
+        except sqlite3.Error as e:
+            log(f"⚠️ Connexion SQLite invalide : {e}")
+            return False
+
+    # Vidage d'une table (DELETE sans clause WHERE : SQLite le traite comme un TRUNCATE)
+    def truncate_table(self, conn, table):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            row_count = cursor.fetchone()[0]
+
+            if row_count > 0:
+                cursor.execute(f"DELETE FROM {table}")
+                conn.commit()
+
+            return row_count
+
+        except Exception as e:
+            log(f"❌ Erreur lors du vidage de {table} : {e}")
+            conn.rollback()
+            return None
+
+        finally:
+            cursor.close()
+
+    # Tables fantômes créées avec les mêmes colonnes et index que les tables publiées
+    def prepare_shadow_tables(self, conn, truncate=True):
+        try:
+            cursor = conn.cursor()
+
+            for table in TABLES:
+                shadow_table = f"{table}{SHADOW_SUFFIX}"
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (shadow_table,))
+                if cursor.fetchone() is None:
+                    self.create_table(cursor, table, shadow_table)
+                    log(f"🆕 Table fantôme {shadow_table} créée")
+                elif truncate:
+                    cursor.execute(f"DELETE FROM {shadow_table}")
+
+                self.table_names[table] = shadow_table
+
+            conn.commit()
+            log("🪞 Chargement dans les tables fantômes, échange avec les tables publiées en fin de run\n")
+            return True
+
+        except Exception as e:
+            log(f"❌ Erreur lors de la préparation des tables fantômes : {e}")
+            conn.rollback()
+            self.table_names = {table: table for table in TABLES}
+            return False
+
+        finally:
+            cursor.close()
+
+    # Échange par ALTER TABLE ... RENAME dans une seule transaction explicite (le DDL n'en ouvre pas implicitement)
+    def swap_shadow_tables(self, conn):
+        try:
+            cursor = conn.cursor()
+            conn.commit()
+            cursor.execute("BEGIN")
+
+            for table in TABLES:
+                shadow_table = f"{table}{SHADOW_SUFFIX}"
+                swap_table = f"{table}_swap"
+                cursor.execute(f"ALTER TABLE {table} RENAME TO {swap_table}")
+                cursor.execute(f"ALTER TABLE {shadow_table} RENAME TO {table}")
+                cursor.execute(f"ALTER TABLE {swap_table} RENAME TO {shadow_table}")
+
+            conn.commit()
+            self.table_names = {table: table for table in TABLES}
+            log("🔀 Tables fantômes publiées : TM_MAD_DROPFR_ventes / Products / Categories / Attributes")
+            return True
+
+        except Exception as e:
+            log(f"❌ Erreur lors de l'échange des tables fantômes, les tables publiées sont inchangées : {e}")
+            conn.rollback()
+            return False
+
+        finally:
+            cursor.close()
+
+    # Chargement en mémoire de la table TM_MAD_SiteID
+    def load_site_ids(self, conn, refresh=False):
+        if self.site_ids is not None and not refresh:
+            return self.site_ids
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT ID_CDS, siteID FROM TM_MAD_SiteID")
+            self.site_ids = {str(id_cds).strip(): site_id for id_cds, site_id in cursor.fetchall() if id_cds is not None}
+            self.site_ids_loaded_at = time.monotonic()
+            log(f"📍 {len(self.site_ids)} siteID chargés depuis TM_MAD_SiteID")
+
+        except Exception as e:
+            log(f"❌ Erreur lors du chargement des siteID : {e}")
+            conn.rollback()
+            if self.site_ids is None:
+                self.site_ids = {}
+
+        finally:
+            cursor.close()
+
+        return self.site_ids
+
+    # Insertion en masse dans TM_MAD_DROPFR_ventes : table temporaire chargée en une passe (executemany)
+    # puis dédoublonnage et insertion en une seule requête ensembliste, comme sur le Data Warehouse
+    # (replace=True : lignes existantes des commandes remplacées dans la même transaction)
+    @metrics.track_rows("TM_MAD_DROPFR_ventes")
+    def insert_orders_data_bulk(self, conn, orders, replace=False):
+        rows = list(self.build_order_rows(conn, orders))
+        if not rows:
+            return 0
+
+        try:
+            cursor = conn.cursor()
+            table = self.table_names["TM_MAD_DROPFR_ventes"]
+            columns = ", ".join(ORDERS_COLUMNS)
+
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {ORDERS_STAGING_TABLE} ({columns}, rowSeq)")
+            cursor.execute(f"DELETE FROM {ORDERS_STAGING_TABLE}")
+            cursor.executemany(
+                f"INSERT INTO {ORDERS_STAGING_TABLE} ({columns}, rowSeq) VALUES ({', '.join(['?'] * (len(ORDERS_COLUMNS) + 1))})",
+                ((*order_line, row_seq) for row_seq, order_line in enumerate(rows))
+            )
+
+            if replace:
+                cursor.execute(f"DELETE FROM {table} WHERE orderId IN (SELECT orderId FROM {ORDERS_STAGING_TABLE})")
+                if cursor.rowcount:
+                    log(f"♻️ {cursor.rowcount} lignes de commandes modifiées remplacées dans TM_MAD_DROPFR_ventes")
+
+            cursor.execute(f"""
+                INSERT INTO {table} ({columns})
+                SELECT {columns}
+                FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY orderId, productId, siteId ORDER BY rowSeq) AS rowRank
+                    FROM {ORDERS_STAGING_TABLE}
+                ) s
+                WHERE (s.rowRank = 1 OR s.productId IS NULL)
+                AND NOT EXISTS (
+                    SELECT 1 FROM {table} v
+                    WHERE v.orderId = s.orderId
+                    AND v.productId = s.productId
+                    AND v.siteId = s.siteId
+                )
+            """)
+            insert_count = cursor.rowcount
+
+            cursor.execute(f"DELETE FROM {ORDERS_STAGING_TABLE}")
+            conn.commit()
+
+            skipped = len(rows) - insert_count
+            log(f"📝 {insert_count} lignes de commandes insérées en masse dans TM_MAD_DROPFR_ventes ({skipped} doublons ignorés)")
+            return insert_count
+
+        except Exception as e:
+            log(f"❌ Erreur lors de l'insertion en masse des commandes : {e}")
+            conn.rollback()
+            return None
+
+        finally:
+            cursor.close()
+
+    # Base locale sans aller-retour réseau : le mode ligne à ligne passe par la même insertion ensembliste
+    insert_orders_data = insert_orders_data_bulk
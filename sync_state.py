@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import threading
+
+from datetime import datetime, timedelta, timezone
+from logger import Logger
+
+log = Logger.write_log
+
+WATERMARK_FORMAT = "%Y-%m-%dT%H:%M:%S.00"
+
+
+class SyncState:
+
+    def __init__(self, state_file):
+        self.state_file = state_file
+
+    # Lecture de l'état de synchronisation sauvegardé (dictionnaire vide si absent ou illisible)
+    def load(self):
+        if not os.path.exists(self.state_file):
+            return {}
+
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError) as e:
+            log(f"⚠️ Fichier d'état illisible ({self.state_file}) : {e}")
+            return {}
+
+    # Écriture atomique de l'état de synchronisation
+    def save(self, state):
+        state_dir = os.path.dirname(self.state_file)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as state_file:
+            json.dump(state, state_file, ensure_ascii=False)
+        os.replace(tmp_file, self.state_file)
+
+    # Dernier watermark updatedAt d'un run réussi (None si aucun run réussi)
+    def get_watermark(self):
+        return self.load().get("watermark")
+
+    def set_watermark(self, watermark):
+        state = self.load()
+        state["watermark"] = watermark
+        state["savedAt"] = datetime.now(timezone.utc).strftime(WATERMARK_FORMAT)
+        self.save(state)
+        log(f"💾 Watermark de synchronisation enregistré : {watermark}")
+
+    # Watermark du run courant : heure de démarrage (UTC) moins une marge de recouvrement
+    @staticmethod
+    def compute_watermark(started_at, overlap_minutes):
+        return (started_at - timedelta(minutes=overlap_minutes)).strftime(WATERMARK_FORMAT)
+
+    # Découpage de [created_at_min, created_at_max[ en fenêtres (createdAtMin, createdAtMax) de window_days jours
+    @staticmethod
+    def created_at_windows(created_at_min, created_at_max, window_days):
+        window_start = datetime.strptime(created_at_min, WATERMARK_FORMAT).replace(tzinfo=timezone.utc)
+        window_size = timedelta(days=window_days)
+        windows = []
+
+        while window_start < created_at_max:
+            window_end = min(window_start + window_size, created_at_max)
+            windows.append((window_start.strftime(WATERMARK_FORMAT), window_end.strftime(WATERMARK_FORMAT)))
+            window_start = window_end
+
+        return windows
+
+
+class Checkpoint:
+
+    def __init__(self, checkpoint_file, every_pages=1, every_products=25):
+        self.store = SyncState(checkpoint_file)
+        self.every_pages = max(1, every_pages)          # Sauvegarde toutes les N pages de commandes
+        self.every_products = max(1, every_products)    # Sauvegarde tous les N produits
+        self.state = None
+        self.pending = 0
+
+    # Dernier checkpoint d'un run interrompu (None si aucun)
+    def load(self):
+        state = self.store.load()
+        if not state:
+            return None
+
+        self.state = state
+        self.processed_order_ids = set(state.get("processedOrderIds", []))
+        self.product_ids = list(dict.fromkeys(state.get("productIds", [])))
+        self.known_product_ids = set(self.product_ids)
+        self.processed_product_ids = set(state.get("processedProductIds", []))
+        self.category_references = set(state.get("categoryReferences", []))
+        return state
+
+    # Nouveau checkpoint au démarrage d'un run : filtre /orders utilisé, watermark à enregistrer en fin de run
+    # mode de rechargement complet (les tables fantômes d'un run "swap" sont reprises sans être vidées)
+    # et taille des pages /orders (lastPage n'a de sens qu'avec la même taille de page)
+    def start(self, mode, watermark, run_watermark, reload_mode=None, page_size=None):
+        self.state = {"mode": mode, "watermark": watermark, "runWatermark": run_watermark, "reloadMode": reload_mode, "pageSize": page_size, "lastPage": 0, "ordersCompleted": False}
+        self.processed_order_ids = set()
+        self.product_ids = []
+        self.known_product_ids = set()
+        self.processed_product_ids = set()
+        self.category_references = set()
+        self.save()
+
+    @property
+    def last_page(self):
+        return self.state.get("lastPage", 0)
+
+    @property
+    def page_size(self):
+        return self.state.get("pageSize")
+
+    @property
+    def reload_mode(self):
+        return self.state.get("reloadMode")
+
+    @property
+    def orders_completed(self):
+        return self.state.get("ordersCompleted", False)
+
+    def save(self):
+        self.state["processedOrderIds"] = sorted(self.processed_order_ids)
+        self.state["productIds"] = self.product_ids
+        self.state["processedProductIds"] = sorted(self.processed_product_ids)
+        self.state["categoryReferences"] = sorted(self.category_references)
+        self.store.save(self.state)
+        self.pending = 0
+
+    # Page de commandes insérée : commandes traitées et productId découverts
+    def page_done(self, page_index, order_ids, product_ids):
+        self.state["lastPage"] = page_index
+        self.processed_order_ids.update(order_id for order_id in order_ids if order_id)
+        for product_id in product_ids:
+            if product_id not in self.known_product_ids:
+                self.known_product_ids.add(product_id)
+                self.product_ids.append(product_id)
+
+        self.pending += 1
+        if self.pending >= self.every_pages:
+            self.save()
+
+    def orders_done(self):
+        self.state["ordersCompleted"] = True
+        self.save()
+
+    # Produit écrit ; sa catégorie N3 est conservée pour l'arbre des catégories écrit en fin de run
+    def product_done(self, product_id, category_reference=None):
+        self.processed_product_ids.add(product_id)
+        if category_reference:
+            self.category_references.add(category_reference)
+
+        self.pending += 1
+        if self.pending >= self.every_products:
+            self.save()
+
+    # Run terminé : le checkpoint est supprimé
+    def clear(self):
+        try:
+            os.remove(self.store.state_file)
+        except FileNotFoundError:
+            pass
+
+
+# Empreintes (SHA-256 du contenu /products/{id}) des produits écrits : un produit dont l'empreinte n'a pas changé
+# n'est pas réécrit en synchro incrémentale. Une empreinte n'est retenue qu'une fois le produit écrit (confirm)
+# et le fichier n'est enregistré qu'en fin de run réussi
+class ProductHashes:
+
+    def __init__(self, hash_file, skip_unchanged=True):
+        self.store = SyncState(hash_file)
+        self.skip_unchanged = skip_unchanged    # False : les empreintes sont tenues à jour sans ignorer de produit
+        self.hashes = {}                        # {productId: empreinte}
+        self.staged = {}                        # Empreintes des produits en attente d'écriture
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        self.hashes = self.store.load()
+        log(f"🧮 {len(self.hashes)} empreintes produits chargées")
+
+    # Rechargement complet : les tables sont vidées, toutes les empreintes sont oubliées (fichier compris)
+    def reset(self):
+        self.hashes = {}
+        try:
+            os.remove(self.store.state_file)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def compute(product):
+        content = json.dumps(product, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    # Mise en attente de l'empreinte d'un produit avant son écriture ; False si le produit est inchangé et peut être ignoré
+    def stage(self, product_id, product):
+        product_hash = self.compute(product)
+        with self.lock:
+            self.staged[str(product_id)] = product_hash
+            if self.skip_unchanged and self.hashes.get(str(product_id)) == product_hash:
+                self.skipped += 1
+                return False
+            return True
+
+    # Produit écrit : son empreinte est retenue
+    def confirm(self, product_id):
+        with self.lock:
+            product_hash = self.staged.pop(str(product_id), None)
+            if product_hash:
+                self.hashes[str(product_id)] = product_hash
+
+    # Empreintes écrites par un worker d'un run réparti
+    def merge(self, hashes):
+        with self.lock:
+            self.hashes.update(hashes)
+
+    def save(self):
+        with self.lock:
+            self.store.save(self.hashes)
+        log(f"💾 {len(self.hashes)} empreintes produits enregistrées ({self.skipped} produits inchangés non réécrits)")
@@ -0,0 +1,87 @@
+import queue
+import threading
+
+from logger import Logger
+
+log = Logger.write_log
+
+# Marqueur de fin des écritures d'un writer
+END_OF_TASKS = object()
+
+
+# Thread d'écriture dédié à une table : exécute dans l'ordre les écritures reçues, sur sa propre connexion du pool
+class TableWriter(threading.Thread):
+
+    def __init__(self, table, pool, queue_size):
+        super().__init__(name=f"writer-{table}", daemon=True)
+        self.table = table
+        self.pool = pool
+        self.conn = pool.acquire()              # Connexion prise dès la création : une erreur de connexion remonte à l'appelant
+        self.tasks = queue.Queue(queue_size)    # File bornée : un writer lent ralentit ses producteurs sans bloquer les autres tables
+        self.errors = []
+
+    # Écriture à exécuter : fonction appelée avec la connexion du writer. Après une erreur, les écritures suivantes
+    # sont ignorées (l'ordre des écritures de la table et la progression du checkpoint restent cohérents) et la
+    # soumission suivante relance l'erreur : le run s'arrête sans récupérer les pages restantes
+    def submit(self, task):
+        if self.errors:
+            raise self.errors[0]
+        self.tasks.put(task)
+
+    def run(self):
+        broken = False
+
+        try:
+            while True:
+                task = self.tasks.get()
+                try:
+                    if task is END_OF_TASKS:
+                        return
+                    if not self.errors:
+                        task(self.conn)
+                except Exception as e:
+                    log(f"❌ Erreur d'écriture dans {self.table} : {e}")
+                    self.errors.append(e)
+                    broken = True
+                finally:
+                    self.tasks.task_done()
+
+        finally:
+            self.pool.release(self.conn, broken)
+
+
+class TableWriters:
+
+    def __init__(self, pool, tables, queue_size):
+        self.writers = {}
+        try:
+            for table in tables:
+                self.writers[table] = TableWriter(table, pool, queue_size)
+        except Exception:
+            for writer in self.writers.values():
+                pool.release(writer.conn)
+            raise
+
+        for writer in self.writers.values():
+            writer.start()
+
+    def submit(self, table, task):
+        self.writers[table].submit(task)
+
+    # Attente de la fin des écritures déjà soumises (toutes les tables ou celles indiquées) ; une erreur est relancée
+    def wait(self, tables=None):
+        for table in tables or self.writers:
+            self.writers[table].tasks.join()
+            if self.writers[table].errors:
+                raise self.writers[table].errors[0]
+
+    # Fin des écritures : les connexions retournent au pool, la première erreur est relancée
+    def close(self):
+        for writer in self.writers.values():
+            writer.submit(END_OF_TASKS)
+        for writer in self.writers.values():
+            writer.join()
+
+        errors = [error for writer in self.writers.values() for error in writer.errors]
+        if errors:
+            raise errors[0]
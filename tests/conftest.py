@@ -0,0 +1,11 @@
+import logging
+import os
+import sys
+
+# Modules du projet importés depuis la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logger import Logger
+
+# Messages des modules testés remontés au logging standard (caplog) au lieu d'être écrits dans Logs/log.txt
+Logger._logger = logging.getLogger("drop3p.tests")
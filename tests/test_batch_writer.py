@@ -0,0 +1,73 @@
+from batch_writer import BatchWriter
+
+
+def product(product_id, title):
+    return {"ProductId": product_id, "title": title}
+
+
+def attribute(product_id, code):
+    return {"productId": product_id, "code": code}
+
+
+# Unité d'un produit réécrit en synchro incrémentale : suppression de ses lignes puis réinsertion
+def product_unit(product_id, title, codes=()):
+    deletes = [("TM_MAD_DROPFR_Products", "ProductId", [product_id]), ("TM_MAD_DROPFR_Attributes", "productId", [product_id])]
+    inserts = {"TM_MAD_DROPFR_Products": [product(product_id, title)]}
+    if codes:
+        inserts["TM_MAD_DROPFR_Attributes"] = [attribute(product_id, code) for code in codes]
+    return (product_id, deletes, inserts)
+
+
+def apply(tables, deletes, inserts):
+    for table, column, keys in deletes:
+        tables[table] = [row for row in tables.get(table, []) if row[column] not in set(keys)]
+    for table, rows in inserts.items():
+        tables.setdefault(table, []).extend(rows)
+    return tables
+
+
+def initial_tables():
+    return {
+        "TM_MAD_DROPFR_Products": [product("P1", "ancien"), product("P9", "autre")],
+        "TM_MAD_DROPFR_Attributes": [attribute("P1", "old"), attribute("P9", "color")]
+    }
+
+
+def test_merge_matches_units_written_one_by_one():
+    units = [
+        product_unit("P1", "v1", ["size"]),
+        product_unit("P2", "v1", ["color", "size"]),
+        product_unit("P1", "v2"),
+        ("P3", [], {"TM_MAD_DROPFR_Products": [product("P3", "nouveau")]}),
+        product_unit("P2", "v2", ["weight"])
+    ]
+
+    one_by_one = initial_tables()
+    for _, deletes, inserts in units:
+        apply(one_by_one, deletes, inserts)
+
+    merged = apply(initial_tables(), *BatchWriter.merge(units))
+
+    assert merged == one_by_one
+
+
+def test_merge_drops_rows_deleted_by_a_later_unit():
+    deletes, inserts = BatchWriter.merge([product_unit("P1", "v1", ["size"]), product_unit("P1", "v2")])
+
+    assert inserts["TM_MAD_DROPFR_Products"] == [product("P1", "v2")]
+    assert inserts["TM_MAD_DROPFR_Attributes"] == []
+    assert len(deletes) == 4
+
+
+def test_merge_keeps_insert_order_across_units():
+    units = [("P1", [], {"TM_MAD_DROPFR_Products": [product("P1", "a")]}),
+             ("P2", [], {"TM_MAD_DROPFR_Products": [product("P2", "b")]})]
+
+    deletes, inserts = BatchWriter.merge(units)
+
+    assert deletes == []
+    assert [row["ProductId"] for row in inserts["TM_MAD_DROPFR_Products"]] == ["P1", "P2"]
+
+
+def test_merge_of_no_units():
+    assert BatchWriter.merge([]) == ([], {})
@@ -0,0 +1,171 @@
+from order_records import ORDER_LINE_FIELDS, OrderLine, flatten_orders
+
+SITE_IDS = {"CUST-1": 101, "CUST-2": 102}
+
+
+# Mise à plat d'origine (dictionnaires construits par insert_orders_data avant OrderLine), référence de l'équivalence
+def flatten_orders_dicts(orders, resolve_site_id):
+    for order in orders:
+        order_id = order.get("orderId", None)
+        if not order_id:
+            continue
+
+        common_data = {
+            "orderId": order_id,
+            "reference": order.get("reference", None),
+            "sellerid": order.get("seller", {}).get("id", None),
+            "customerReference": order.get("customer", {}).get("reference", None),
+            "siteId": resolve_site_id(order.get("customer", {}).get("reference", None)),
+            "companyName": order.get("billingAddress", {}).get("companyName", None),
+            "purchasedAt": order.get("purchasedAt", None),
+            "updatedAt": order.get("updatedAt", None),
+            "createdAt": order.get("createdAt", None),
+            "shippedAtMax": order.get("shippedAtMax", None),
+            "status": order.get("status", None)
+        }
+
+        for line in order.get("lines", []) or [{}]:
+            line_data = {
+                "offerid": line.get("offer", {}).get("id", None),
+                "productId": line.get("offer", {}).get("productId", None),
+                "unitSalesPrice": line.get("offerPrice", {}).get("unitSalesPrice", 0.0),
+                "shippingCost": line.get("offerPrice", {}).get("shippingCost", 0.0),
+                "comm_amountWithoutVat": line.get("offerPrice", {}).get("commission", {}).get("amountWithoutVat", 0.0),
+                "comm_rate": line.get("offerPrice", {}).get("commission", {}).get("rate", 0.0),
+                "promisedAtMin": line.get("delivery", {}).get("promisedAtMin", None),
+                "promisedAtMax": line.get("delivery", {}).get("promisedAtMax", None),
+            }
+
+            parcels = line.get("parcels", []) or [{}]
+            if len(parcels) > 1:
+                parcel_data = {
+                    "parcelNumber": ";".join(p.get("parcelNumber", None) for p in parcels),
+                    "carrierName": ";".join(p.get("carrierName", None) for p in parcels),
+                    "trackingUrl": ";".join(p.get("trackingUrl", None) for p in parcels)
+                }
+                yield {**common_data, **line_data, **parcel_data}
+            else:
+                for parcel in parcels:
+                    parcel_data = {
+                        "parcelNumber": parcel.get("parcelNumber", None),
+                        "carrierName": parcel.get("carrierName", None),
+                        "trackingUrl": parcel.get("trackingUrl", None),
+                    }
+                    yield {**common_data, **line_data, **parcel_data}
+
+
+def build_order(order_id, lines, customer="CUST-1"):
+    return {
+        "orderId": order_id,
+        "reference": f"REF-{order_id}",
+        "seller": {"id": 42},
+        "customer": {"reference": customer},
+        "billingAddress": {"companyName": "ACME"},
+        "purchasedAt": "2025-06-01T10:00:00Z",
+        "updatedAt": "2025-06-02T10:00:00Z",
+        "createdAt": "2025-06-01T09:00:00Z",
+        "shippedAtMax": "2025-06-05T00:00:00Z",
+        "status": "Shipped",
+        "lines": lines
+    }
+
+
+def build_line(product_id, parcels=None, offer_price=True):
+    line = {
+        "offer": {"id": f"OFFER-{product_id}", "productId": product_id},
+        "delivery": {"promisedAtMin": "2025-06-03", "promisedAtMax": "2025-06-04"}
+    }
+    if offer_price:
+        line["offerPrice"] = {"unitSalesPrice": 19.9, "shippingCost": 4.5, "commission": {"amountWithoutVat": 2.1, "rate": 0.12}}
+    if parcels is not None:
+        line["parcels"] = parcels
+    return line
+
+
+def parcel(number):
+    return {"parcelNumber": f"P{number}", "carrierName": f"Carrier{number}", "trackingUrl": f"https://track/{number}"}
+
+
+def flatten(orders):
+    return [dict(zip(ORDER_LINE_FIELDS, order_line)) for order_line in flatten_orders(orders, SITE_IDS.get)]
+
+
+def test_flatten_orders_matches_dict_flattening():
+    orders = [
+        build_order("O1", [build_line("A", [parcel(1)]), build_line("B", [parcel(2), parcel(3)])]),
+        build_order("O2", [build_line("C")], customer="CUST-2"),
+        build_order("O3", [build_line("D", [], offer_price=False)]),
+        build_order("O4", [{"offer": {"id": "OFFER-E", "productId": "E"}, "offerPrice": {"unitSalesPrice": 5.0}}]),
+        build_order("O5", []),
+        build_order("O6", [build_line("F", [parcel(4)])], customer="UNKNOWN"),
+        {"reference": "sans orderId", "lines": [build_line("G")]}
+    ]
+
+    assert flatten(orders) == list(flatten_orders_dicts(orders, SITE_IDS.get))
+
+
+def test_line_without_parcels():
+    [row] = flatten([build_order("O1", [build_line("A")])])
+
+    assert row["parcelNumber"] is None
+    assert row["carrierName"] is None
+    assert row["trackingUrl"] is None
+
+
+def test_multi_parcel_line_is_concatenated():
+    [row] = flatten([build_order("O1", [build_line("A", [parcel(1), parcel(2), parcel(3)])])])
+
+    assert row["parcelNumber"] == "P1;P2;P3"
+    assert row["carrierName"] == "Carrier1;Carrier2;Carrier3"
+    assert row["trackingUrl"] == "https://track/1;https://track/2;https://track/3"
+
+
+def test_multi_parcel_line_with_missing_fields():
+    parcels = [{"parcelNumber": "P1", "carrierName": "Carrier1"}, {"parcelNumber": "P2", "carrierName": None}]
+
+    [row] = flatten([build_order("O1", [build_line("A", parcels)])])
+
+    assert row["parcelNumber"] == "P1;P2"
+    assert row["carrierName"] == "Carrier1;"
+    assert row["trackingUrl"] == ";"
+
+
+def test_missing_price_blocks_default_to_zero():
+    [row] = flatten([build_order("O1", [build_line("A", offer_price=False)])])
+
+    assert (row["unitSalesPrice"], row["shippingCost"], row["comm_amountWithoutVat"], row["comm_rate"]) == (0.0, 0.0, 0.0, 0.0)
+
+
+def test_null_blocks_are_treated_as_missing():
+    order = build_order("O1", [{"offer": None, "offerPrice": {"commission": None}, "delivery": None, "parcels": None}])
+    order.update({"seller": None, "customer": None, "billingAddress": None})
+
+    [row] = flatten([order])
+
+    assert (row["sellerid"], row["customerReference"], row["siteId"], row["companyName"]) == (None, None, None, None)
+    assert (row["offerid"], row["productId"], row["comm_rate"], row["parcelNumber"]) == (None, None, 0.0, None)
+
+
+def test_order_without_lines_gives_one_empty_line():
+    [row] = flatten([build_order("O1", [])])
+
+    assert row["orderId"] == "O1"
+    assert row["productId"] is None
+    assert row["siteId"] == 101
+
+
+def test_order_line_key_and_positional_order():
+    [order_line] = flatten_orders([build_order("O1", [build_line("A")], customer="CUST-2")], SITE_IDS.get)
+
+    assert isinstance(order_line, OrderLine)
+    assert order_line.key == ("O1", "A", 102)
+    assert order_line[0] == "O1" and order_line[len(ORDER_LINE_FIELDS) - 1] is None
+
+
+def test_site_id_resolved_once_per_order():
+    resolved = []
+    orders = [build_order("O1", [build_line("A"), build_line("B"), build_line("C")])]
+
+    list(flatten_orders(orders, lambda customer_reference: resolved.append(customer_reference) or 7))
+
+    assert resolved == ["CUST-1"]
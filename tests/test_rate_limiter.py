@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from rate_limiter import RateLimiter
+
+
+@pytest.mark.parametrize("value", [None, ""])
+def test_missing_header_gives_default(value):
+    assert RateLimiter.parse_retry_after(value, 7.5) == 7.5
+
+
+@pytest.mark.parametrize("value, expected", [("5", 5.0), ("0.25", 0.25), ("0", 0.0), ("-3", 0.0)])
+def test_delay_in_seconds(value, expected):
+    assert RateLimiter.parse_retry_after(value, 7.5) == expected
+
+
+def test_http_date_in_the_future():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+    delay = RateLimiter.parse_retry_after(format_datetime(retry_at, usegmt=True), 7.5)
+
+    assert 28 <= delay <= 30
+
+
+def test_http_date_in_the_past_gives_no_delay():
+    retry_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+
+    assert RateLimiter.parse_retry_after(format_datetime(retry_at, usegmt=True), 7.5) == 0.0
+
+
+def test_http_date_without_timezone_is_utc():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=60)
+
+    delay = RateLimiter.parse_retry_after(retry_at.strftime("%a, %d %b %Y %H:%M:%S -0000"), 7.5)
+
+    assert 58 <= delay <= 60
+
+
+@pytest.mark.parametrize("value", ["soon", "12s", "Mon, 99 Foo 2025"])
+def test_unparsable_header_gives_default(value):
+    assert RateLimiter.parse_retry_after(value, 7.5) == 7.5
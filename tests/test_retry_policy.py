@@ -0,0 +1,119 @@
+import pytest
+
+import retry_policy
+from retry_policy import CircuitBreaker
+
+ROUTE = "/orders"
+
+
+# Limiteur de débit réduit aux suspensions demandées par le disjoncteur
+class FakeRateLimiter:
+
+    def __init__(self):
+        self.penalties = []
+
+    def penalize(self, route, delay):
+        self.penalties.append((route, delay))
+
+
+# Horloge monotone pilotée par le test
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(retry_policy.time, "monotonic", fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def limiter():
+    return FakeRateLimiter()
+
+
+def build_breaker(limiter, threshold=3):
+    return CircuitBreaker(limiter, failure_threshold=threshold, reset_timeout=5, max_reset_timeout=12)
+
+
+def fail(breaker, count, route=ROUTE):
+    for _ in range(count):
+        breaker.record_failure(route)
+
+
+def test_opens_after_threshold_consecutive_failures(clock, limiter):
+    breaker = build_breaker(limiter)
+
+    fail(breaker, 2)
+    assert limiter.penalties == []
+
+    fail(breaker, 1)
+    assert limiter.penalties == [(ROUTE, 5)]
+    assert breaker.opened == 1
+
+
+def test_success_resets_the_failure_count(clock, limiter):
+    breaker = build_breaker(limiter)
+
+    fail(breaker, 2)
+    breaker.record_success(ROUTE)
+    fail(breaker, 2)
+
+    assert limiter.penalties == []
+
+
+def test_failures_while_open_do_not_reopen(clock, limiter):
+    breaker = build_breaker(limiter)
+
+    fail(breaker, 3)
+    clock.now += 4
+    fail(breaker, 3)
+
+    assert limiter.penalties == [(ROUTE, 5)]
+
+
+def test_failure_after_reopening_doubles_the_timeout_up_to_the_maximum(clock, limiter):
+    breaker = build_breaker(limiter)
+
+    fail(breaker, 3)
+    for _ in range(3):
+        clock.now += 20
+        fail(breaker, 1)
+
+    assert limiter.penalties == [(ROUTE, 5), (ROUTE, 10), (ROUTE, 12), (ROUTE, 12)]
+    assert breaker.opened == 4
+
+
+def test_success_after_reopening_closes_the_circuit(clock, limiter):
+    breaker = build_breaker(limiter)
+
+    fail(breaker, 3)
+    clock.now += 10
+    breaker.record_success(ROUTE)
+    fail(breaker, 3)
+
+    assert limiter.penalties == [(ROUTE, 5), (ROUTE, 5)]
+
+
+def test_routes_are_independent(clock, limiter):
+    breaker = build_breaker(limiter)
+
+    fail(breaker, 2)
+    fail(breaker, 2, route="/products")
+    fail(breaker, 1, route="/products")
+
+    assert limiter.penalties == [("/products", 5)]
+
+
+def test_threshold_is_at_least_one(clock, limiter):
+    breaker = build_breaker(limiter, threshold=0)
+
+    fail(breaker, 1)
+
+    assert limiter.penalties == [(ROUTE, 5)]
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+from sync_state import SyncState
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_windows_of_window_days():
+    windows = SyncState.created_at_windows("2025-01-01T00:00:00.00", utc(2025, 1, 31), 10)
+
+    assert windows == [
+        ("2025-01-01T00:00:00.00", "2025-01-11T00:00:00.00"),
+        ("2025-01-11T00:00:00.00", "2025-01-21T00:00:00.00"),
+        ("2025-01-21T00:00:00.00", "2025-01-31T00:00:00.00")
+    ]
+
+
+def test_last_window_ends_at_created_at_max():
+    windows = SyncState.created_at_windows("2025-01-01T00:00:00.00", utc(2025, 1, 15, 12, 30, 5), 10)
+
+    assert windows[-1] == ("2025-01-11T00:00:00.00", "2025-01-15T12:30:05.00")
+
+
+def test_windows_are_contiguous():
+    windows = SyncState.created_at_windows("2024-02-20T06:00:00.00", utc(2024, 3, 20), 7)
+
+    assert windows[0][0] == "2024-02-20T06:00:00.00"
+    assert windows[-1][1] == "2024-03-20T00:00:00.00"
+    assert all(previous[1] == following[0] for previous, following in zip(windows, windows[1:]))
+
+
+def test_single_window_when_range_is_shorter():
+    assert SyncState.created_at_windows("2025-01-01T00:00:00.00", utc(2025, 1, 2), 30) == [
+        ("2025-01-01T00:00:00.00", "2025-01-02T00:00:00.00")
+    ]
+
+
+def test_empty_range_gives_no_window():
+    assert SyncState.created_at_windows("2025-01-01T00:00:00.00", utc(2025, 1, 1), 10) == []
+    assert SyncState.created_at_windows("2025-01-02T00:00:00.00", utc(2025, 1, 1), 10) == []
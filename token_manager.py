@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from logger import Logger
+
+log = Logger.write_log
+
+
+# Cycle de vie du token API : expiration suivie, renouvellement avant échéance ou après un 401,
+# et token encore valide relu depuis un fichier cache (0600) par les runs suivants
+class TokenManager:
+
+    def __init__(self, fetch, cache_file, refresh_margin, cache_key):
+        self.fetch = fetch                      # Appel à /token : renvoie (token, expires_in en secondes) ou (None, None)
+        self.cache_file = cache_file            # None : pas de cache sur disque
+        self.refresh_margin = refresh_margin    # Renouvellement anticipé (s) avant l'expiration
+        self.cache_key = cache_key              # Empreinte de l'URL et du client : un token n'est relu que pour les mêmes identifiants
+        self.token = None
+        self.expires_at = 0.0                   # Horodatage (epoch) d'expiration, inf si la réponse n'en donne pas
+        self.margin = refresh_margin            # Marge appliquée au token courant, au plus la moitié de sa durée de vie
+        self.cache_loaded = False
+        self.refreshes = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def build_cache_key(*values):
+        return hashlib.sha256("|".join(str(value) for value in values).encode("utf-8")).hexdigest()
+
+    def _valid(self):
+        return self.token is not None and time.time() < self.expires_at - self.margin
+
+    # Token valide : celui en mémoire, sinon celui du cache, sinon un nouveau token
+    def get(self):
+        with self.lock:
+            if not self.cache_loaded:
+                self.cache_loaded = True
+                self._load_cache()
+
+            if not self._valid():
+                self._refresh()
+            return self.token
+
+    # Renouvellement après un 401 obtenu avec `rejected_token` ; un autre thread a pu le renouveler entre-temps
+    def refresh(self, rejected_token):
+        with self.lock:
+            if self.token == rejected_token or not self._valid():
+                self._refresh()
+            return self.token
+
+    def _refresh(self):
+        if self.token is not None:
+            log("🔑 Renouvellement du token API")
+
+        self.token, expires_in = self.fetch()
+        self.refreshes += 1
+        if self.token is None:
+            self.expires_at = 0.0
+            return
+
+        # Token de courte durée (expires_in <= marge) : marge réduite, sinon il serait renouvelé à chaque appel
+        self.margin = min(self.refresh_margin, float(expires_in) / 2) if expires_in else self.refresh_margin
+        self.expires_at = time.time() + float(expires_in) if expires_in else float("inf")
+        self._save_cache()
+
+    def _load_cache(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as cache_file:
+                cached = json.load(cache_file)
+        except (OSError, ValueError) as e:
+            log(f"⚠️ Cache du token illisible, un nouveau token sera demandé : {e}")
+            return
+
+        if cached.get("key") != self.cache_key:
+            return
+
+        self.token = cached.get("access_token")
+        self.expires_at = float(cached.get("expires_at", 0))
+        self.margin = min(self.refresh_margin, float(cached.get("margin", self.refresh_margin)))
+        if self._valid():
+            log(f"🔑 Token API relu depuis le cache (expire dans {self.expires_at - time.time():.0f}s)\n")
+
+    # Écriture atomique, fichier lisible par le seul utilisateur du processus
+    def _save_cache(self):
+        if not self.cache_file or self.expires_at == float("inf"):
+            return
+
+        try:
+            cache_dir = os.path.dirname(self.cache_file)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+
+            tmp_file = f"{self.cache_file}.tmp"
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+                json.dump({"key": self.cache_key, "access_token": self.token, "expires_at": self.expires_at, "margin": self.margin}, cache_file)
+            os.chmod(tmp_file, 0o600)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            log(f"⚠️ Sauvegarde du cache du token impossible : {e}")